@@ -1,20 +1,46 @@
+import logging
 from flask import Flask, jsonify
 from flask_migrate import Migrate
 from werkzeug import exceptions
 from routes import register_bp
-from db import init_db, db_session, DB
+from shared.json_provider import FastJSONProvider
+from shared.compression import init_compression
+from cache import init_cache
+from shared.degradation import init_degradation
+from shared.admission import init_admission
+from shared.deadlines import init_deadlines
+from db import init_db, db_session, DB, circuit_breaker
+from db.seed import seed_command
+from monitoring import init_query_counter, init_slow_query_log, init_metrics, init_tracing, init_profiler, init_logging, init_server_timing
+
+logger = logging.getLogger(__name__)
 
 def create_app():
     """Create and configure the Flask application"""
     try:
         app = Flask(__name__)
+        # first, so that the shed requests are logged with their id and don't run the other hooks
+        init_logging(app)
+        init_admission(app)
+        app.json = FastJSONProvider(app)
         init_db()
+        init_cache()
         register_bp(app)
+        init_compression(app)
+        init_degradation(app)
+        init_deadlines(app, DB.get_engine())
+        init_query_counter(app, DB.get_engine())
+        init_server_timing(app, DB.get_engine())
+        init_slow_query_log(DB.get_engine())
+        init_metrics(app, DB.get_engine())
+        init_tracing(app)
+        init_profiler(app)
         migrate = Migrate(app=app, db=DB)
+        app.cli.add_command(seed_command)
 
         @app.route("/")
         def ping():
-            return jsonify({"status": "OK"}), 200
+            return jsonify({"status": "OK", "database": circuit_breaker.state}), 200
 
         @app.teardown_appcontext
         def shutdown_session(exception=None):
@@ -36,8 +62,8 @@ def create_app():
             return jsonify({"error": "Forbidden"}), 401
             
         return app
-    except Exception as e:
-        print(f"Error creating app: {e}")
-        raise e
+    except Exception:
+        logger.exception("failed to create the app")
+        raise
 
     
\ No newline at end of file
@@ -1,8 +1,13 @@
+import logging
 from functools import wraps
 from flask import request, jsonify
 from .tokens import is_valid_token
 from .blacklist import is_blacklisted
 from typing import Optional
+from monitoring import span, phase
+
+# one record per rejected request, `LOG_SAMPLE_RATES=auth_jwt=0.01` keeps a sample of them
+logger = logging.getLogger(__name__)
 
 def get_jwt_identity() -> Optional[str]:
     token = get_token()
@@ -22,18 +27,20 @@ def get_jwt_identity() -> Optional[str]:
 def jwt_required(f):
     @wraps(f)
     def decorator(*args, **kwargs):
-        token = get_token()
-        if token is None:
-            print("none token")
-            return jsonify({"error": "Unauthorized"}), 401
+        with span("jwt_required"), phase("auth"):
+            token = get_token()
+            if token is None:
+                logger.info("rejected a request without a token", extra={"path": request.path})
+                return jsonify({"error": "Unauthorized"}), 401
 
-        if is_blacklisted(token):
-            print("blacklisted token")
-            return jsonify({"error": "Unauthorized"}), 401
-        
-        is_valid, payload = is_valid_token(token)
-        if not is_valid:
-            return jsonify({"error": str(payload)}), 401
+            if is_blacklisted(token):
+                logger.info("rejected a blacklisted token", extra={"path": request.path})
+                return jsonify({"error": "Unauthorized"}), 401
+            
+            is_valid, payload = is_valid_token(token)
+            if not is_valid:
+                logger.info("rejected an invalid token", extra={"path": request.path, "reason": str(payload)})
+                return jsonify({"error": str(payload)}), 401
         
         return f(*args, **kwargs)
     return decorator
@@ -27,7 +27,7 @@ def create_access_token(identity:int | str, expires_delta=None) -> str:
 
 def create_refresh_token(identity: str) -> str:
     payload = {
-        'sub': identity,
+        'sub': str(identity),
         'exp': datetime.now(timezone.utc) + timedelta(days=7), # refresh token usually expires at much longer time duration.
         'iat': datetime.now(timezone.utc),  # created at
         'type': 'refresh', # OAuth 2.0 common custom claim, indicates refresh token. 
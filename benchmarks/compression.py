@@ -0,0 +1,79 @@
+"""Compares the CPU cost and the bandwidth savings of the response encodings on a large listing.
+
+Run with `uv run python -m benchmarks.compression [--items 10000] [--repeat 10]`. brotli and
+zstd are only measured when their packages are installed.
+"""
+import argparse
+import os
+import statistics
+import time
+import zlib
+from typing import Callable, Dict, List
+
+os.environ.setdefault("DB_CONN", "sqlite:///")
+os.environ.setdefault("JWT_SECRET", "benchmark")
+
+from pydantic import TypeAdapter
+from models import Transaction
+from shared.compression import brotli, zstandard, compressor, encodings
+from shared.json_provider import json_list_response
+from benchmarks.serialization import make_transactions
+
+# link speeds the transfer time is estimated for, in Mbit/s
+LINKS = [10, 100, 1000]
+# rows per chunk of the streamed listings, see db/json_listings.py
+STREAM_CHUNK = 500
+
+def levels() -> Dict[str, Callable[[bytes], bytes]]:
+    cases = {f"gzip -{level}": (lambda level: lambda data: zlib.compress(data, level, wbits=31))(level) for level in (1, 6, 9)}
+    if brotli is not None:
+        cases.update({f"br q{quality}": (lambda quality: lambda data: brotli.compress(data, quality=quality))(quality) for quality in (1, 4, 11)})
+    if zstandard is not None:
+        cases.update({f"zstd -{level}": (lambda level: lambda data: zstandard.ZstdCompressor(level=level).compress(data))(level) for level in (1, 3, 10)})
+    return cases
+
+def streamed(encoding: str, chunks: List[bytes]) -> bytes:
+    # the middleware's streaming path, which flushes after every chunk
+    stream = compressor(encoding)
+    return b"".join(stream.compress(chunk) + stream.flush() for chunk in chunks) + stream.finish()
+
+def measure(fn: Callable[[], bytes], repeat: int):
+    output = fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), len(output)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    from flask import Flask
+    app = Flask("benchmark")
+    transactions = make_transactions(args.items)
+    with app.app_context():
+        body = json_list_response("transactions", TypeAdapter(List[Transaction]), transactions).get_data()
+    separator = b"},{"
+    items = body.split(separator)
+    chunks = [separator.join(items[i:i + STREAM_CHUNK]) for i in range(0, len(items), STREAM_CHUNK)]
+
+    cases = {name: (lambda fn: lambda: fn(body))(fn) for name, fn in levels().items()}
+    cases.update({f"{encoding} streamed": (lambda encoding: lambda: streamed(encoding, chunks))(encoding) for encoding in encodings()})
+
+    print(f"\n{args.items} transactions, {len(body) / 1024:.0f} KiB of JSON, {args.repeat} runs")
+    print("total = compression + transfer time at the given link speed\n")
+    header = f"{'encoding':<16}{'ms':>8}{'KiB':>8}{'ratio':>8}{'MiB/s':>8}" + "".join(f"{f'{link}Mbit ms':>13}" for link in LINKS)
+    print(header)
+    print(f"{'identity':<16}{0:>8.1f}{len(body) / 1024:>8.0f}{1:>8.1f}{'-':>8}" + "".join(f"{len(body) * 8 / (link * 1000):>13.1f}" for link in LINKS))
+    for name, fn in cases.items():
+        ms, size = measure(fn, args.repeat)
+        throughput = len(body) / 2**20 / (ms / 1000)
+        totals = "".join(f"{ms + size * 8 / (link * 1000):>13.1f}" for link in LINKS)
+        print(f"{name:<16}{ms:>8.1f}{size / 1024:>8.0f}{len(body) / size:>8.1f}{throughput:>8.0f}{totals}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Throughput of concurrent postings to a single hot account, and the consistency of its balance.
+
+Run with `uv run python -m benchmarks.contention [--concurrency 1,2,4,8] [--postings 400]`, against
+PostgreSQL with DB_CONN set, or a temporary SQLite file otherwise (SQLite serializes the writers
+of the whole database, and fails them with "database is locked" past its busy timeout). Real
+traffic concentrates the deposits on a few payroll and merchant accounts, every posting to one of
+them updates the same `accounts` row.
+
+For each concurrency, `--postings` deposits into a fresh hot account, and transfers from the
+workers' own accounts to it, are sent by that many threads at once, through the HTTP layer
+(the test client, with the authentication, the validation and the serialization) and directly
+through `db/transactions.py`. The report has the postings per second and the p50/p95 latencies of
+each. After each run, the balance of every account involved must equal the sum of its ledger
+entries, credits minus debits, and the process exits with status 1 when one doesn't, e.g. when
+concurrent postings overwrote each other's balance update.
+
+The SQLAlchemy pool opens up to 15 connections (5 and 10 of overflow), above that the threads
+wait for a connection, and fail after `DB_POOL_TIMEOUT`.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List
+
+os.environ.setdefault("DB_CONN", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='contention-'), 'contention.db')}")
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["DEBUG"] = "0"
+# the postings are meant to queue on the account, not to be shed
+os.environ["ADMISSION_MAX_IN_FLIGHT"] = "0"
+
+from flask import Flask
+from sqlalchemy import text
+from app import create_app
+from db import DB, db_session
+from db.seed import SeedPlan, seed
+from db.transactions import deposit, transfer
+from models import DepositRequest, TransferRequest
+
+KINDS = ("deposit", "transfer")
+PATHS = ("http", "db")
+
+@dataclass
+class Hot:
+    """The accounts of one run: the hot one, and one source account per worker for the transfers."""
+    account_id: str
+    owner_token: str
+    source_ids: List[str]
+    source_tokens: List[str]
+
+    @property
+    def account_ids(self) -> List[str]:
+        return [self.account_id, *self.source_ids]
+
+def prepare(app: Flask, workers: int, seed_value: int) -> Hot:
+    """Seeds a user owning the hot account and one user per worker, without any transaction."""
+    first_user = _scalar("SELECT COALESCE(MAX(id), 0) FROM users") + 1
+    plan = SeedPlan(users=workers + 1, accounts_per_user=1, transactions=0, budgets_per_user=0, bills_per_user=0, seed=seed_value)
+    seed(plan)
+
+    client = app.test_client()
+    accounts, tokens = [], []
+    for user_id in range(first_user, first_user + workers + 1):
+        response = client.post("/auth/login", json={"email": f"seed{user_id}@example.com", "password": plan.password})
+        tokens.append(response.get_json()["access_token"])
+        accounts.append(str(_scalar(f"SELECT default_account_id FROM users WHERE id = {user_id}")))
+    return Hot(account_id=accounts[0], owner_token=tokens[0], source_ids=accounts[1:], source_tokens=tokens[1:])
+
+def _scalar(statement: str):
+    with DB.get_engine().connect() as connection:
+        return connection.execute(text(statement)).scalar()
+
+def http_posting(app: Flask, hot: Hot, kind: str, worker: int, amount: int) -> Callable[[], bool]:
+    client = app.test_client()
+    if kind == "deposit":
+        path = "/transactions/deposit"
+        body = {"account_id": hot.account_id, "amount": amount, "category": "payroll"}
+        headers = {"Authorization": f"Bearer {hot.owner_token}"}
+    else:
+        path = "/transactions/transfer"
+        body = {"account_id": hot.source_ids[worker], "recipient_account_id": hot.account_id, "amount": amount, "category": "payment"}
+        headers = {"Authorization": f"Bearer {hot.source_tokens[worker]}"}
+    return lambda: client.post(path, json=body, headers=headers).status_code == 200
+
+def db_posting(app: Flask, hot: Hot, kind: str, worker: int, amount: int) -> Callable[[], bool]:
+    def post():
+        if kind == "deposit":
+            deposit(DepositRequest(account_id=hot.account_id, amount=amount, category="payroll"))
+        else:
+            transfer(TransferRequest(account_id=hot.source_ids[worker], recipient_account_id=hot.account_id, amount=amount, category="payment"))
+
+    def posting() -> bool:
+        try:
+            post()
+            return True
+        except Exception:
+            db_session.rollback()
+            return False
+        finally:
+            # like at the end of a request
+            db_session.remove()
+    return posting
+
+POSTINGS = {"http": http_posting, "db": db_posting}
+
+def run(app: Flask, hot: Hot, path: str, kind: str, workers: int, postings: int, amount: int) -> dict:
+    """Sends `postings` postings from `workers` threads started at once."""
+    latencies: List[List[float]] = [[] for _ in range(workers)]
+    failures = [0] * workers
+    barrier = threading.Barrier(workers + 1)
+
+    def worker(n: int):
+        posting = POSTINGS[path](app, hot, kind, n, amount)
+        count = postings // workers + (n < postings % workers)
+        barrier.wait()
+        for _ in range(count):
+            started = time.perf_counter()
+            try:
+                ok = posting()
+            except Exception:
+                ok = False
+            latencies[n].append(time.perf_counter() - started)
+            failures[n] += not ok
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(workers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    measured = sorted(latency * 1000 for worker_latencies in latencies for latency in worker_latencies)
+    quantiles = statistics.quantiles(measured, n=100, method="inclusive") if len(measured) > 1 else measured * 99
+    return {
+        "postings": len(measured),
+        "failed": sum(failures),
+        "throughput": (len(measured) - sum(failures)) / elapsed,
+        "p50": quantiles[49],
+        "p95": quantiles[94],
+    }
+
+def inconsistencies(account_ids: List[str]) -> List[str]:
+    """The accounts whose balance isn't the sum of their ledger entries, as printable lines."""
+    ids = ", ".join(str(int(account_id)) for account_id in account_ids)
+    with DB.get_engine().connect() as connection:
+        rows = connection.execute(text(f"""
+            SELECT accounts.id, accounts.balance,
+                COALESCE(SUM(CASE WHEN entries.entry_type = 'credit' THEN entries.amount ELSE -entries.amount END), 0),
+                COUNT(entries.account_id)
+            FROM accounts LEFT JOIN transaction_entries AS entries ON entries.account_id = accounts.id
+            WHERE accounts.id IN ({ids})
+            GROUP BY accounts.id, accounts.balance
+        """)).all()
+    return [
+        f"account {account_id}: balance {balance}, entries sum to {total} over {entries} entries"
+        for account_id, balance, total, entries in rows
+        if balance != total
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="1,2,4,8", help="comma-separated threads of each run")
+    parser.add_argument("--postings", type=int, default=400, help="postings of each run")
+    parser.add_argument("--kinds", default=",".join(KINDS), help="comma-separated postings to run, deposit and/or transfer")
+    parser.add_argument("--paths", default=",".join(PATHS), help="comma-separated layers to post through, http and/or db")
+    parser.add_argument("--amount", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    levels = sorted(int(level) for level in args.concurrency.split(","))
+    kinds = [kind for kind in args.kinds.split(",") if kind]
+    paths = [path for path in args.paths.split(",") if path]
+    if set(kinds) - set(KINDS) or set(paths) - set(PATHS):
+        parser.error(f"the kinds are {', '.join(KINDS)} and the paths {', '.join(PATHS)}")
+
+    app = create_app()
+    print(f"{args.postings} postings per run on {DB.get_engine().url.get_backend_name()}")
+    print(f"{'path':<6}{'kind':<10}{'threads':>8}{'postings/s':>12}{'failed':>8}{'p50 ms':>10}{'p95 ms':>10}  balances")
+    inconsistent = 0
+    for path in paths:
+        for kind in kinds:
+            for workers in levels:
+                # a fresh hot account per run, its entries are only the ones of the run
+                hot = prepare(app, workers, args.seed)
+                result = run(app, hot, path, kind, workers, args.postings, args.amount)
+                problems = inconsistencies(hot.account_ids)
+                inconsistent += len(problems)
+                print(f"{path:<6}{kind:<10}{workers:>8}{result['throughput']:>12.1f}{result['failed']:>8}"
+                      f"{result['p50']:>10.2f}{result['p95']:>10.2f}  {'ok' if not problems else f'{len(problems)} inconsistent'}")
+                for problem in problems:
+                    print(f"    {problem}")
+
+    if inconsistent:
+        print(f"\n{inconsistent} balances don't match their ledger entries")
+        sys.exit(1)
+    print("\nevery balance matches its ledger entries")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Latency and query counts of the API's endpoints on seeded datasets of increasing size.
+
+Run with `uv run python -m benchmarks.endpoints [--sizes 1000,10000,100000] [--requests 50]`,
+it uses an in-memory SQLite database unless DB_CONN is set. Each size adds a dataset of that
+many transactions with the generator of `flask seed` (db/seed.py), and the requests of every
+case are sent, through the test client, as the busiest user of that dataset. The report has the
+p50, p95 and p99 latencies and the statements per request of each case.
+
+`--save-baseline` stores the results in `--baseline`, later runs are compared to it and exit
+with status 1 when a case runs more statements, or got slower than the baseline by more than
+`--threshold` at p50 or `--tail-threshold` at p95, and by more than `--min-delta-ms` to ignore
+the noise of the fast cases. The tail of a few dozen requests is noisy, hence its looser
+threshold, and the p99 is only reported. The latencies depend on the machine, save the baseline on the machine that
+runs the comparison.
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+os.environ.setdefault("DB_CONN", "sqlite:///")
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["DEBUG"] = "0"
+# the cases measure the application, not the load shedding
+os.environ["ADMISSION_MAX_IN_FLIGHT"] = "0"
+
+from flask.testing import FlaskClient
+from sqlalchemy import text
+from app import create_app
+from db import DB
+from db.seed import SeedPlan, seed
+from monitoring import track_queries
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "endpoints.json")
+PERCENTILES = ("p50", "p95", "p99")
+
+@dataclass
+class Context:
+    """The data the cases send requests about, the busiest user of the current dataset."""
+    client: FlaskClient
+    email: str
+    password: str
+    headers: Dict[str, str]
+    refresh_token: str
+    account_id: str
+    other_account_id: str
+    bill_id: str
+    budget_id: str
+    transaction_id: str
+    first_day: datetime
+    # the accounts created by `accounts.create`, deleted by `accounts.delete`
+    created_accounts: List[str] = field(default_factory=list)
+
+# (method, path, keyword arguments of the test client's request)
+Request = Tuple[str, str, dict]
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    request: Callable[[Context], Request]
+    # at most this many requests, for the cases dominated by bcrypt
+    max_requests: Optional[int] = None
+    after: Optional[Callable[[Context, dict], None]] = None
+
+def _authorized(method: str, path: str, **kwargs) -> Callable[[Context], Request]:
+    def request(ctx: Context) -> Request:
+        return method, path.format(ctx=ctx), {"headers": ctx.headers, **kwargs}
+    return request
+
+def _keep_created_account(ctx: Context, body: dict):
+    ctx.created_accounts.append(body["account"]["id"])
+
+CASES = [
+    Case("auth.login", lambda ctx: ("POST", "/auth/login", {"json": {"email": ctx.email, "password": ctx.password}}), max_requests=10),
+    Case("auth.refresh", lambda ctx: ("POST", "/auth/refresh", {"json": {"refresh_token": ctx.refresh_token}})),
+    Case("users.me", _authorized("GET", "/users/me")),
+    Case("accounts.list", _authorized("GET", "/accounts/")),
+    Case("accounts.create", _authorized("POST", "/accounts/", json={"balance": 0}), after=_keep_created_account),
+    Case("accounts.get", _authorized("GET", "/accounts/{ctx.account_id}")),
+    Case("accounts.update", _authorized("PUT", "/accounts/{ctx.account_id}", json={"balance": 1})),
+    Case("accounts.delete", lambda ctx: ("DELETE", f"/accounts/{ctx.created_accounts.pop()}", {"headers": ctx.headers})),
+    Case("transactions.deposit", lambda ctx: ("POST", "/transactions/deposit", {"headers": ctx.headers, "json": {
+        "account_id": ctx.account_id, "amount": 100, "category": "groceries"}})),
+    Case("transactions.withdraw", lambda ctx: ("POST", "/transactions/withdraw", {"headers": ctx.headers, "json": {
+        "account_id": ctx.account_id, "amount": 10, "category": "dining"}})),
+    Case("transactions.transfer", lambda ctx: ("POST", "/transactions/transfer", {"headers": ctx.headers, "json": {
+        "account_id": ctx.account_id, "recipient_account_id": ctx.other_account_id, "amount": 10}})),
+    Case("transactions.list", _authorized("GET", "/transactions/")),
+    Case("transactions.list_by_account", _authorized("GET", "/transactions/?account_id={ctx.account_id}")),
+    Case("transactions.list_by_type", _authorized("GET", "/transactions/?transaction_type=withdraw,transfer")),
+    Case("transactions.list_by_range", lambda ctx: ("GET", "/transactions/", {"headers": ctx.headers, "query_string": {
+        "range_from": ctx.first_day.isoformat(), "range_to": (ctx.first_day + timedelta(days=30)).isoformat()}})),
+    Case("transactions.get", _authorized("GET", "/transactions/{ctx.transaction_id}")),
+    Case("transactions.categories", _authorized("GET", "/transactions/categories")),
+    Case("budgets.create", lambda ctx: ("POST", "/budgets/", {"headers": ctx.headers, "json": {
+        "name": "groceries", "amount": 50000, "start_date": ctx.first_day.isoformat(), "end_date": (ctx.first_day + timedelta(days=30)).isoformat()}})),
+    Case("budgets.list", _authorized("GET", "/budgets/")),
+    Case("budgets.get", _authorized("GET", "/budgets/{ctx.budget_id}")),
+    Case("bills.create", lambda ctx: ("POST", "/bills/", {"headers": ctx.headers, "json": {
+        "account_id": ctx.account_id, "biller_name": "water", "due_date": ctx.first_day.isoformat(), "amount": 3000}})),
+    # the route reads the filters from a JSON body
+    Case("bills.list", _authorized("GET", "/bills/", json={})),
+    Case("bills.list_filtered", _authorized("GET", "/bills/", json={"biller_name": "water", "amount_min": 1000})),
+    Case("bills.get", _authorized("GET", "/bills/{ctx.bill_id}")),
+]
+
+def percentile(timings: List[float], p: int) -> float:
+    if len(timings) == 1:
+        return timings[0]
+    return statistics.quantiles(timings, n=100, method="inclusive")[p - 1]
+
+def run_case(ctx: Context, case: Case, requests: int, warmup: int) -> dict:
+    requests = min(requests, case.max_requests or requests)
+    timings, statements = [], []
+    # like timeit, the collections would land on random requests
+    gc.collect()
+    gc.disable()
+    try:
+        for i in range(warmup + requests):
+            method, path, kwargs = case.request(ctx)
+            with track_queries() as stats:
+                start = time.perf_counter()
+                response = ctx.client.open(path, method=method, **kwargs)
+                elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code >= 400:
+                raise RuntimeError(f"{case.name}: {method} {path} answered {response.status_code} {response.get_data(as_text=True)}")
+            if case.after is not None:
+                case.after(ctx, response.get_json())
+            if i >= warmup:
+                timings.append(elapsed)
+                statements.append(stats.count)
+    finally:
+        gc.enable()
+    return {
+        **{name: round(percentile(timings, int(name[1:])), 3) for name in PERCENTILES},
+        "queries": round(statistics.mean(statements), 2),
+        "requests": requests,
+    }
+
+def prepare(client: FlaskClient, size: int, seed_value: int) -> Context:
+    plan = SeedPlan(users=max(10, size // 100), transactions=size, seed=seed_value)
+    first_user = _scalar("SELECT COALESCE(MAX(id), 0) FROM users") + 1
+    seed(plan)
+
+    user_id = _scalar(f"""
+        SELECT accounts.user_id FROM transaction_entries JOIN accounts ON accounts.id = transaction_entries.account_id
+        WHERE accounts.user_id >= {first_user} GROUP BY accounts.user_id ORDER BY COUNT(*) DESC, accounts.user_id LIMIT 1
+    """)
+    email = f"seed{user_id}@example.com"
+    tokens = client.post("/auth/login", json={"email": email, "password": plan.password}).get_json()
+    account_id = _scalar(f"SELECT default_account_id FROM users WHERE id = {user_id}")
+    return Context(
+        client=client,
+        email=email,
+        password=plan.password,
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+        refresh_token=tokens["refresh_token"],
+        account_id=str(account_id),
+        other_account_id=str(_scalar(f"SELECT MIN(id) FROM accounts WHERE user_id != {user_id} AND user_id >= {first_user}")),
+        bill_id=str(_scalar(f"SELECT MIN(id) FROM bills WHERE user_id = {user_id}")),
+        budget_id=str(_scalar(f"SELECT MIN(id) FROM budgets WHERE user_id = {user_id}")),
+        transaction_id=str(_scalar(f"SELECT MIN(transaction_id) FROM transaction_entries WHERE account_id = {account_id}")),
+        first_day=plan.start,
+    )
+
+def _scalar(statement: str):
+    with DB.get_engine().connect() as connection:
+        return connection.execute(text(statement)).scalar()
+
+def compare(results: Dict[str, Dict[str, dict]], baseline: Dict[str, Dict[str, dict]], thresholds: Dict[str, float], min_delta_ms: float) -> List[str]:
+    """The regressions of `results` against `baseline`, as printable lines.
+
+    `thresholds` is the allowed slowdown of each compared percentile, e.g. `{"p50": 0.25}`.
+    """
+    regressions = []
+    for size, cases in results.items():
+        for name, result in cases.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            for p, threshold in thresholds.items():
+                if result[p] > base[p] * (1 + threshold) and result[p] - base[p] > min_delta_ms:
+                    regressions.append(f"{size} {name} {p}: {base[p]:.2f} -> {result[p]:.2f} ms")
+            if result["queries"] > base["queries"]:
+                regressions.append(f"{size} {name} queries: {base['queries']} -> {result['queries']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000", help="comma-separated transactions of each dataset")
+    parser.add_argument("--requests", type=int, default=50, help="measured requests per case")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cases", help="comma-separated prefixes of the cases to run, e.g. transactions,bills")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown of the p50, 0.25 is 25%%")
+    parser.add_argument("--tail-threshold", type=float, default=1.0, help="allowed slowdown of the p95")
+    # a request preempted by another thread or process loses up to the 5ms switch interval
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="slowdowns under this many ms are ignored")
+    args = parser.parse_args()
+
+    cases = [case for case in CASES if not args.cases or case.name.startswith(tuple(args.cases.split(",")))]
+    client = create_app().test_client()
+    results: Dict[str, Dict[str, dict]] = {}
+    for size in sorted(int(size) for size in args.sizes.split(",")):
+        started = time.perf_counter()
+        ctx = prepare(client, size, args.seed)
+        print(f"\n{size} transactions (seeded in {time.perf_counter() - started:.1f}s), {args.requests} requests per case")
+        print(f"{'case':<32}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}")
+        results[str(size)] = {}
+        for case in cases:
+            result = run_case(ctx, case, args.requests, args.warmup)
+            results[str(size)][case.name] = result
+            print(f"{case.name:<32}{result['p50']:>10.2f}{result['p95']:>10.2f}{result['p99']:>10.2f}{result['queries']:>10}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nbaseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nno baseline at {args.baseline}, run with --save-baseline to create it")
+        return
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), {"p50": args.threshold, "p95": args.tail_threshold}, args.min_delta_ms)
+    if regressions:
+        print(f"\n{len(regressions)} regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nno regression against the baseline")
+
+if __name__ == "__main__":
+    main()
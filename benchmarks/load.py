@@ -0,0 +1,393 @@
+"""Load driver replaying the Postman collection, and recorded requests, against a running instance.
+
+Run with `uv run python -m benchmarks.load --base-url http://localhost:5000 [--concurrency 16]
+[--duration 30] [--rate 200]`. Every request of `revobank.postman.json`, and of the
+`--recording` files, is a scenario, picked at random in proportion to its weight. The default
+weights (`WEIGHTS`) favor the reads, like the traffic of a bank's app, and leave out the requests
+that would break the other scenarios (deleting the session's data, logging it out); `--weights`
+changes them, e.g. `--weights "Deposit=5,Delete Bill=1"`.
+
+The requests are sent by `--users` sessions. Each registers its own user, and creates the
+accounts, transaction, bill and budget that the `{{...}}` variables of the requests refer to, so
+a fresh database is enough. In the request bodies, the fields named like a variable of the
+session (`email`, `password`, `refresh_token`, `account_id`...) and the `your_<variable>`
+placeholders are replaced by the session's values.
+
+Without `--rate` the load is closed-loop: `--concurrency` workers send their next request as
+soon as the previous one is answered, the throughput is what the server sustains. With `--rate`
+it's open-loop: the requests arrive at that average rate (Poisson arrivals) whatever the
+response times, and are sent by up to `--concurrency` workers. The latencies are measured from
+the arrival time, so the queueing behind a slow server counts too.
+
+A recording is a JSON lines file with one request per line:
+`{"method": "GET", "path": "/accounts/{{account_id}}", "body": ..., "headers": {...}, "weight": 2, "name": "..."}`,
+`body`, `headers`, `weight` and `name` are optional, and the session's token is sent unless the
+headers have an `Authorization`.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+COLLECTION = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "revobank.postman.json")
+VARIABLE = re.compile(r"\{\{(\w+)\}\}")
+PLACEHOLDER = re.compile(r"^your_(\w+)$")
+
+# the weight of the collection's requests, the others weigh 1
+WEIGHTS = {
+    "Get Current User": 10,
+    "Get Accounts": 10,
+    "Get Account": 5,
+    "Get Transaction Categories": 2,
+    "Get Transactions": 10,
+    "Get Transaction": 3,
+    "Create Withdrawal": 3,
+    "Create Deposit": 3,
+    "Create Transfer": 3,
+    "Get Bills": 4,
+    "Get Bill": 2,
+    "Get Budgets": 4,
+    "Get Budget": 2,
+    # they'd remove the data of the session, or its token
+    "Logout": 0,
+    "Delete Account": 0,
+    "Delete Bill": 0,
+    "Delete Budget": 0,
+    # it'd set the balance the withdrawals and transfers draw from to 200
+    "Update Account": 0,
+    # bcrypt bound, and they send `email` where the users' routes expect `email_address`
+    "Create User": 0,
+    "Update Current User": 0,
+}
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    method: str
+    path: str
+    headers: Dict[str, str]
+    body: Any = None
+    weight: float = 1.0
+
+def load_collection(path: str) -> List[Scenario]:
+    with open(path) as f:
+        collection = json.load(f)
+
+    scenarios = []
+    def walk(items: List[dict]):
+        for item in items:
+            if "item" in item:
+                walk(item["item"])
+                continue
+            request = item["request"]
+            url = request["url"] if isinstance(request["url"], str) else request["url"]["raw"]
+            raw = request.get("body", {}).get("raw") or None
+            scenarios.append(Scenario(
+                name=item["name"],
+                method=request["method"],
+                path=url.replace("{{base_url}}", ""),
+                headers={header["key"]: header["value"] for header in request.get("header", []) if not header.get("disabled")},
+                body=json.loads(raw) if raw else None,
+                weight=WEIGHTS.get(item["name"], 1),
+            ))
+    walk(collection["item"])
+    return scenarios
+
+def load_recording(path: str) -> List[Scenario]:
+    scenarios = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "method" not in entry or "path" not in entry:
+                raise ValueError(f"{path}:{number}: a recorded request needs a method and a path")
+            headers = entry.get("headers", {})
+            if "Authorization" not in headers:
+                headers = {**headers, "Authorization": "Bearer {{bearerToken}}"}
+            scenarios.append(Scenario(
+                name=entry.get("name", f"{entry['method']} {entry['path']}"),
+                method=entry["method"].upper(),
+                path=entry["path"],
+                headers=headers,
+                body=entry.get("body"),
+                weight=entry.get("weight", 1),
+            ))
+    return scenarios
+
+def substitute(value: Any, variables: Dict[str, str]) -> Any:
+    """Replaces the `{{variable}}`s, the `your_<variable>` placeholders and the fields named like a variable."""
+    if isinstance(value, str):
+        placeholder = PLACEHOLDER.match(value)
+        if placeholder and placeholder.group(1) in variables:
+            return variables[placeholder.group(1)]
+        return VARIABLE.sub(lambda m: str(variables.get(m.group(1), m.group(0))), value)
+    if isinstance(value, dict):
+        return {key: variables[key] if key in variables else substitute(item, variables) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute(item, variables) for item in value]
+    return value
+
+@dataclass
+class Response:
+    status: int
+    body: bytes
+    location: str = ""
+
+class Client:
+    """Keep-alive HTTP connections, one per thread, following the redirects like Postman."""
+    def __init__(self, base_url: str, timeout: float):
+        url = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        self.netloc = url.netloc
+        self.prefix = url.path.rstrip("/")
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if getattr(self.local, "connection", None) is None:
+            self.local.connection = self.connection_class(self.netloc, timeout=self.timeout)
+        return self.local.connection
+
+    def request(self, method: str, path: str, headers: Dict[str, str], body: Any = None) -> Response:
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {**headers, "Content-Type": "application/json"} if payload is not None else headers
+        path = self.prefix + path
+        for _ in range(5):
+            response = self._send(method, path, headers, payload)
+            if response.status not in (301, 302, 303, 307, 308):
+                return response
+            path = urlsplit(response.location).path or path
+            if response.status == 303:
+                method, payload = "GET", None
+        return response
+
+    def _send(self, method: str, path: str, headers: Dict[str, str], payload: Optional[bytes]) -> Response:
+        # a kept-alive connection closed by the server is reopened once
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(method, path, body=payload, headers=headers)
+                raw = connection.getresponse()
+                response = Response(raw.status, raw.read(), raw.getheader("Location", ""))
+                if raw.will_close:
+                    self.close()
+                return response
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError, http.client.CannotSendRequest):
+                self.close()
+                if attempt == 1:
+                    raise
+
+    def close(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
+
+    def json(self, method: str, path: str, body: Any = None, token: Optional[str] = None) -> dict:
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        response = self.request(method, path, headers, body)
+        if response.status >= 400:
+            raise RuntimeError(f"{method} {path} answered {response.status}: {response.body[:200]!r}")
+        return json.loads(response.body)
+
+def create_session(client: Client, password: str) -> Dict[str, str]:
+    """Registers a user and the data the requests refer to, returns the variables of the session."""
+    email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+    client.json("POST", "/users/", {"name": "load", "email_address": email, "password": password})
+    tokens = client.json("POST", "/auth/login", {"email": email, "password": password})
+    token = tokens["access_token"]
+    account_id = client.json("GET", "/users/me", token=token)["default_account"]["id"]
+    recipient_id = client.json("POST", "/accounts/", {"balance": 0}, token=token)["account"]["id"]
+    # enough for the withdrawals and transfers of a long run
+    deposit = client.json("POST", "/transactions/deposit", {"account_id": account_id, "amount": 10 ** 12}, token=token)
+    bill = client.json("POST", "/bills/", {"account_id": account_id, "biller_name": "Electric Company", "due_date": "2024-03-15T00:00:00Z", "amount": 100}, token=token)
+    budget = client.json("POST", "/budgets/", {"name": "Monthly Groceries", "amount": 500, "start_date": "2024-03-01T00:00:00Z", "end_date": "2024-03-31T00:00:00Z"}, token=token)
+    return {
+        "email": email,
+        "password": password,
+        "bearerToken": token,
+        "refresh_token": tokens["refresh_token"],
+        "account_id": str(account_id),
+        "recipient_account_id": str(recipient_id),
+        "transaction_id": str(deposit["transaction"]["id"]),
+        "bill_id": str(bill["bill"]["id"]),
+        "budget_id": str(budget["budget"]["id"]),
+    }
+
+@dataclass
+class Result:
+    scenario: str
+    latency: float
+    status: int  # 0 when the request failed without a response
+    error: Optional[str] = None
+
+@dataclass
+class Recorder:
+    results: List[Result] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add(self, result: Result):
+        with self.lock:
+            self.results.append(result)
+
+def send(client: Client, scenario: Scenario, variables: Dict[str, str], arrived: float, recorder: Recorder):
+    """Sends the request of `scenario`, its latency counts from `arrived`, a `time.perf_counter()`."""
+    try:
+        response = client.request(
+            scenario.method,
+            substitute(scenario.path, variables),
+            substitute(scenario.headers, variables),
+            substitute(scenario.body, variables),
+        )
+        recorder.add(Result(scenario.name, time.perf_counter() - arrived, response.status))
+    except (OSError, http.client.HTTPException) as e:
+        recorder.add(Result(scenario.name, time.perf_counter() - arrived, 0, type(e).__name__))
+
+def run_closed_loop(client: Client, scenarios: List[Scenario], sessions: List[Dict[str, str]], concurrency: int, duration: float, seed: int) -> Recorder:
+    recorder = Recorder()
+    weights = [scenario.weight for scenario in scenarios]
+    deadline = time.perf_counter() + duration
+
+    def worker(n: int):
+        rng = random.Random(seed + n)
+        variables = sessions[n % len(sessions)]
+        while time.perf_counter() < deadline:
+            send(client, rng.choices(scenarios, weights)[0], variables, time.perf_counter(), recorder)
+        client.close()
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder
+
+def run_open_loop(client: Client, scenarios: List[Scenario], sessions: List[Dict[str, str]], concurrency: int, duration: float, rate: float, seed: int) -> Recorder:
+    recorder = Recorder()
+    rng = random.Random(seed)
+    weights = [scenario.weight for scenario in scenarios]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        arrival = start
+        while True:
+            arrival += rng.expovariate(rate)
+            if arrival - start >= duration:
+                break
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, client, rng.choices(scenarios, weights)[0], rng.choice(sessions), arrival, recorder)
+    return recorder
+
+def percentile(latencies: List[float], p: int) -> float:
+    if len(latencies) == 1:
+        return latencies[0]
+    return statistics.quantiles(latencies, n=100, method="inclusive")[p - 1]
+
+def summarize(results: List[Result], elapsed: float) -> Dict[str, dict]:
+    """Throughput, error rate and latency percentiles, in ms, of each scenario and of all of them."""
+    groups: Dict[str, List[Result]] = {}
+    for result in results:
+        groups.setdefault(result.scenario, []).append(result)
+    groups["all"] = results
+
+    summary = {}
+    for name, group in groups.items():
+        latencies = [result.latency * 1000 for result in group]
+        errors = [result for result in group if result.status == 0 or result.status >= 400]
+        summary[name] = {
+            "requests": len(group),
+            "throughput": round(len(group) / elapsed, 2),
+            "error_rate": round(len(errors) / len(group), 4),
+            "statuses": dict(Counter(str(result.status or result.error) for result in group)),
+            **{f"p{p}": round(percentile(latencies, p), 2) for p in (50, 95, 99)},
+            "max": round(max(latencies), 2),
+        }
+    return summary
+
+def print_summary(summary: Dict[str, dict], elapsed: float):
+    print(f"\n{summary['all']['requests']} requests in {elapsed:.1f}s")
+    print(f"{'scenario':<30}{'requests':>10}{'req/s':>9}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}  statuses")
+    for name, row in sorted(summary.items(), key=lambda item: (item[0] == "all", -item[1]["requests"])):
+        statuses = " ".join(f"{status}:{count}" for status, count in sorted(row["statuses"].items()))
+        print(f"{name:<30}{row['requests']:>10}{row['throughput']:>9.1f}{row['error_rate']:>9.1%}"
+              f"{row['p50']:>10.1f}{row['p95']:>10.1f}{row['p99']:>10.1f}{row['max']:>10.1f}  {statuses}")
+
+def parse_weights(value: str) -> Dict[str, float]:
+    weights = {}
+    for entry in value.split(","):
+        if entry.strip():
+            name, _, weight = entry.rpartition("=")
+            weights[name.strip()] = float(weight)
+    return weights
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:5000")
+    parser.add_argument("--collection", default=COLLECTION, help="Postman collection, '' to replay the recordings only")
+    parser.add_argument("--recording", action="append", default=[], help="JSON lines file of recorded requests, repeatable")
+    parser.add_argument("--weights", default="", help="scenario=weight pairs separated by commas")
+    parser.add_argument("--concurrency", type=int, default=8, help="workers sending requests")
+    parser.add_argument("--rate", type=float, help="open-loop arrivals per second, closed-loop without it")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--users", type=int, help="sessions, one user each, default to min(concurrency, 10)")
+    parser.add_argument("--password", default="load-password")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args()
+
+    scenarios = (load_collection(args.collection) if args.collection else [])
+    for recording in args.recording:
+        scenarios += load_recording(recording)
+    overrides = parse_weights(args.weights)
+    unknown = set(overrides) - {scenario.name for scenario in scenarios}
+    if unknown:
+        parser.error(f"unknown scenarios in --weights: {', '.join(sorted(unknown))}")
+    scenarios = [Scenario(**{**scenario.__dict__, "weight": overrides.get(scenario.name, scenario.weight)}) for scenario in scenarios]
+    scenarios = [scenario for scenario in scenarios if scenario.weight > 0]
+    if not scenarios:
+        parser.error("no scenario has a positive weight")
+
+    client = Client(args.base_url, args.timeout)
+    users = args.users or min(args.concurrency, 10)
+    print(f"creating {users} sessions on {args.base_url}")
+    sessions = [create_session(client, args.password) for _ in range(users)]
+    client.close()
+
+    mode = f"open loop at {args.rate}/s" if args.rate else "closed loop"
+    total = sum(scenario.weight for scenario in scenarios)
+    print(f"{len(scenarios)} scenarios, {mode}, {args.concurrency} workers, {args.duration:.0f}s")
+    for scenario in sorted(scenarios, key=lambda scenario: -scenario.weight):
+        print(f"  {scenario.weight / total:>6.1%}  {scenario.name}: {scenario.method} {scenario.path}")
+
+    start = time.perf_counter()
+    if args.rate:
+        recorder = run_open_loop(client, scenarios, sessions, args.concurrency, args.duration, args.rate, args.seed)
+    else:
+        recorder = run_closed_loop(client, scenarios, sessions, args.concurrency, args.duration, args.seed)
+    elapsed = time.perf_counter() - start
+    if not recorder.results:
+        print("no request was sent")
+        return
+
+    summary = summarize(recorder.results, elapsed)
+    print_summary(summary, elapsed)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"mode": mode, "concurrency": args.concurrency, "rate": args.rate, "duration": elapsed, "scenarios": summary}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Compares ORM hydration with the column projections of db/projections.py for large listings.
+
+Run with `uv run python -m benchmarks.projections [--rows 20000]`, it uses an in-memory SQLite
+database unless DB_CONN is set.
+"""
+import argparse
+import os
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timezone, timedelta
+
+os.environ.setdefault("DB_CONN", "sqlite:///")
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ["DEBUG"] = "0"
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import joinedload
+from db import init_db, db_session, Users, Accounts, Transactions, TransactionEntries, TransactionCategories
+from db.transactions import get_transactions, TransactionQuery, _parse_transaction_record
+
+def seed(rows: int) -> str:
+    user = Users(username="bench", email="bench@example.com")
+    db_session.add(user)
+    db_session.flush()
+    account = Accounts(user_id=user.id, balance=0)
+    db_session.add(account)
+    db_session.flush()
+
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    db_session.execute(insert(Transactions), [
+        {"id": i, "transaction_type": "deposit", "timestamp": start + timedelta(minutes=i)} for i in range(1, rows + 1)
+    ])
+    db_session.execute(insert(TransactionEntries), [
+        {"transaction_id": i, "account_id": account.id, "entry_type": "credit", "amount": i % 1000} for i in range(1, rows + 1)
+    ])
+    db_session.execute(insert(TransactionCategories), [
+        {"transaction_id": i, "name": "groceries"} for i in range(1, rows + 1)
+    ])
+    db_session.commit()
+    return str(user.id)
+
+def hydrated(user_id: str):
+    # the ORM path that get_transactions used before the projections
+    statement = (
+        select(Transactions)
+        .select_from(TransactionEntries)
+        .join(Accounts)
+        .join(Transactions)
+        .where(Accounts.user_id == user_id)
+        .options(joinedload(Transactions.entries), joinedload(Transactions.category))
+    )
+    return [_parse_transaction_record(t) for t in db_session.scalars(statement).unique().all()]
+
+def projected(user_id: str):
+    return get_transactions(TransactionQuery(), current_user=user_id)
+
+def measure(fn, user_id: str, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        db_session.expunge_all()
+        start = time.perf_counter()
+        fn(user_id)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    db_session.expunge_all()
+    tracemalloc.start()
+    fn(user_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak / 1024 / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    init_db()
+    user_id = seed(args.rows)
+    assert len(hydrated(user_id)) == len(projected(user_id)) == args.rows
+
+    print(f"{args.rows} transactions, median of {args.repeat} runs")
+    print(f"{'approach':<20}{'median ms':>12}{'peak MiB':>10}")
+    for name, fn in [("ORM hydration", hydrated), ("projection", projected)]:
+        median, peak = measure(fn, user_id, args.repeat)
+        print(f"{name:<20}{median:>12.1f}{peak:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compares building pydantic models with building the slotted records of db/records.py.
+
+Run with `uv run python -m benchmarks.records [--objects 100000] [--repeat 5]`.
+"""
+import argparse
+import gc
+import os
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timezone, timedelta
+from typing import Callable, List
+
+os.environ.setdefault("DB_CONN", "sqlite:///")
+os.environ.setdefault("JWT_SECRET", "benchmark")
+
+from db.records import AccountRecord, UserRecord, TransactionRecord
+from models import Account, Transaction, UserInformation
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+def transaction_models(n: int) -> List[Transaction]:
+    return [
+        Transaction(
+            id=str(i), account_id=str(i % 50), transaction_type="deposit", amount=i % 10_000,
+            timestamp=START + timedelta(minutes=i), category="groceries",
+        )
+        for i in range(n)
+    ]
+
+def transaction_records(n: int) -> List[TransactionRecord]:
+    return [
+        TransactionRecord(
+            id=str(i), account_id=str(i % 50), transaction_type="deposit", amount=i % 10_000,
+            timestamp=START + timedelta(minutes=i), category="groceries",
+        )
+        for i in range(n)
+    ]
+
+def user_models(n: int) -> List[UserInformation]:
+    # the current user as `load_current_user` used to build it, with three accounts
+    def user(i: int) -> UserInformation:
+        accounts = [Account(id=str(i * 3 + j), user_id=str(i), balance=j, created_at=START, updated_at=START) for j in range(3)]
+        return UserInformation(name=f"user{i}", fullname=None, email_address=f"user{i}@example.com", default_account=accounts[0], roles=["customer"], accounts=accounts)
+    return [user(i) for i in range(n)]
+
+def user_records(n: int) -> List[UserRecord]:
+    def user(i: int) -> UserRecord:
+        accounts = tuple(AccountRecord(id=str(i * 3 + j), user_id=str(i), balance=j, created_at=START, updated_at=START) for j in range(3))
+        return UserRecord(name=f"user{i}", fullname=None, email_address=f"user{i}@example.com", default_account=accounts[0], roles=("customer",), accounts=accounts)
+    return [user(i) for i in range(n)]
+
+def measure(fn: Callable[[int], list], n: int, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn(n)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    objects = fn(n)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return timings, size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--objects", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for kind, cases in [
+        ("transactions", {"pydantic Transaction": transaction_models, "TransactionRecord": transaction_records}),
+        ("users with 3 accounts", {"pydantic UserInformation": user_models, "UserRecord": user_records}),
+    ]:
+        print(f"\n{args.objects} {kind}, {args.repeat} runs")
+        print(f"{'approach':<28}{'median ms':>12}{'min ms':>10}{'retained MiB':>14}")
+        for name, fn in cases.items():
+            timings, size = measure(fn, args.objects, args.repeat)
+            print(f"{name:<28}{statistics.median(timings):>12.1f}{min(timings):>10.1f}{size / 2**20:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compares the ways a large listing can be serialized into a JSON response.
+
+Run with `uv run python -m benchmarks.serialization [--items 10000] [--repeat 20]`.
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Callable, List
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+from pydantic import TypeAdapter
+from models import Transaction, Bill
+from shared.json_provider import FastJSONProvider, json_list_response
+
+def make_transactions(n: int) -> List[Transaction]:
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        Transaction(
+            id=str(i),
+            account_id=str(i % 50),
+            transaction_type="transfer" if i % 3 == 0 else "deposit",
+            amount=i * 7 % 10_000,
+            timestamp=start + timedelta(minutes=i),
+            recipient_id=str((i + 1) % 50) if i % 3 == 0 else None,
+            category="groceries",
+        )
+        for i in range(n)
+    ]
+
+def make_bills(n: int) -> List[Bill]:
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        Bill(id=str(i), account_id=str(i % 50), biller_name="electricity", due_date=start + timedelta(days=i % 365), amount=i % 1000)
+        for i in range(n)
+    ]
+
+def measure(fn: Callable[[], object], repeat: int) -> List[float]:
+    fn()  # warm up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    default_app, fast_app = Flask("default"), Flask("fast")
+    default_app.json = DefaultJSONProvider(default_app)
+    fast_app.json = FastJSONProvider(fast_app)
+
+    for key, items, adapter in [
+        ("transactions", make_transactions(args.items), TypeAdapter(List[Transaction])),
+        ("bills", make_bills(args.items), TypeAdapter(List[Bill])),
+    ]:
+        cases = {
+            "model_dump + stdlib json": (default_app, lambda: jsonify({key: [item.model_dump() for item in items]})),
+            "model_dump + orjson provider": (fast_app, lambda: jsonify({key: [item.model_dump() for item in items]})),
+            "json_list_response": (fast_app, lambda: json_list_response(key, adapter, items)),
+        }
+
+        print(f"\n{args.items} {key}, {args.repeat} runs")
+        print(f"{'approach':<32}{'median ms':>12}{'min ms':>10}{'size KiB':>10}")
+        for name, (app, fn) in cases.items():
+            with app.app_context():
+                timings = measure(fn, args.repeat)
+                size = len(fn().get_data()) / 1024
+            print(f"{name:<32}{statistics.median(timings):>12.2f}{min(timings):>10.2f}{size:>10.0f}")
+
+if __name__ == "__main__":
+    main()
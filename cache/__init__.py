@@ -0,0 +1,3 @@
+from .backends import *
+from .read_cache import *
+from .single_flight import *
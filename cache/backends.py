@@ -0,0 +1,166 @@
+"""Storage for the read cache.
+
+`MemoryBackend` keeps the values in the process, in an LRU with a TTL. It's only correct with a
+single process: a write handled by another gunicorn worker doesn't invalidate this one's copies.
+`RedisBackend` shares the cache between processes, it talks the Redis protocol (RESP) over a
+plain socket, so it works with Redis and with the servers compatible with it (Valkey, KeyDB,
+Dragonfly) without a client library.
+"""
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+__all__ = ["CacheBackend", "MemoryBackend", "RedisBackend", "CacheBackendError", "backend_from_url"]
+
+class CacheBackendError(Exception):
+    pass
+
+class CacheBackend(ABC):
+    # whether the values leave the process, and have to be encoded to bytes
+    shared = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float, *, only_if_missing: bool = False) -> bool:
+        """Stores `value` for `ttl` seconds, returns False when `only_if_missing` and the key exists."""
+
+    @abstractmethod
+    def delete(self, *keys: str):
+        ...
+
+class MemoryBackend(CacheBackend):
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float, *, only_if_missing: bool = False) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if only_if_missing:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] >= now:
+                    return False
+            self._entries[key] = (now + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class RedisBackend(CacheBackend):
+    shared = True
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, password: Optional[str] = None, timeout: float = 0.5):
+        self.host, self.port, self.db, self.password, self.timeout = host, port, db, password, timeout
+        self._socket: Optional[socket.socket] = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.execute("GET", key)
+
+    def set(self, key: str, value: bytes, ttl: float, *, only_if_missing: bool = False) -> bool:
+        command = ["SET", key, value, "PX", str(int(ttl * 1000))]
+        if only_if_missing:
+            command.append("NX")
+        return self.execute(*command) is not None
+
+    def delete(self, *keys: str):
+        if keys:
+            self.execute("DEL", *keys)
+
+    def execute(self, *command) -> Any:
+        with self._lock:
+            try:
+                if self._socket is None:
+                    self._connect()
+                self._socket.sendall(_encode(command))
+                return self._read_reply()
+            except (OSError, EOFError) as e:
+                self._close()
+                raise CacheBackendError(f"redis command {command[0]} failed: {e}") from e
+
+    def _connect(self):
+        self._socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._reader = self._socket.makefile("rb")
+        if self.password:
+            self._socket.sendall(_encode(("AUTH", self.password)))
+            self._read_reply()
+        if self.db:
+            self._socket.sendall(_encode(("SELECT", str(self.db))))
+            self._read_reply()
+
+    def _close(self):
+        if self._socket is not None:
+            self._socket.close()
+        self._socket, self._reader = None, None
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise EOFError("connection closed")
+        kind, payload = line[:1], line[1:-2]
+        match kind:
+            case b"+":
+                return payload.decode()
+            case b"-":
+                raise CacheBackendError(payload.decode())
+            case b":":
+                return int(payload)
+            case b"$":
+                length = int(payload)
+                if length < 0:
+                    return None
+                data = self._reader.read(length + 2)
+                return data[:-2]
+            case b"*":
+                length = int(payload)
+                return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise CacheBackendError(f"unexpected reply {line!r}")
+
+def _encode(command) -> bytes:
+    parts: List[bytes] = [b"*%d\r\n" % len(command)]
+    for argument in command:
+        if isinstance(argument, str):
+            argument = argument.encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(argument), argument))
+    return b"".join(parts)
+
+def backend_from_url(url: str) -> CacheBackend:
+    """`memory://?max_entries=10000` or `redis://[:password@]host[:port][/db]`."""
+    parsed = urlparse(url)
+    match parsed.scheme:
+        case "memory":
+            options = parse_qs(parsed.query)
+            return MemoryBackend(max_entries=int(options.get("max_entries", ["10000"])[0]))
+        case "redis":
+            db = int(parsed.path.lstrip("/") or 0)
+            return RedisBackend(host=parsed.hostname or "localhost", port=parsed.port or 6379, db=db, password=parsed.password)
+    raise ValueError(f"unsupported cache backend {url!r}")
@@ -0,0 +1,139 @@
+"""Per-user read cache for the db/* read functions.
+
+The entries of a user are keyed by a generation token, `<function>:<user>:<token>[:<arguments>]`.
+When a transaction that changed the user's data commits (see `db.versions.on_data_change`),
+the token is deleted and the next read starts a new one, so the old entries can't be reached
+anymore and expire on their own. A read racing with a write can only store what it read under
+the token it started with, which is the old one once the write has committed, so it never
+brings stale data back.
+
+Every result is also kept, under a key without the token, as the user's last known copy for
+`CACHE_STALE_TTL` seconds. That copy is what's served while the database is degraded, see
+`shared.degradation`.
+
+With the in-process backend the cached results are shared between requests, they must not be
+modified by the callers.
+"""
+import hashlib
+import inspect
+import logging
+import secrets
+import time
+from functools import wraps
+from typing import Any, Optional, Set, get_type_hints
+from pydantic import TypeAdapter
+from config import cache_url, cache_ttl, cache_stale_ttl
+from db.versions import on_data_change
+from monitoring import record_cache_lookup
+from shared.degradation import DB_ERRORS, DatabaseUnavailable, database_failed, is_degraded, mark_stale
+from .backends import CacheBackend, CacheBackendError, backend_from_url
+
+__all__ = ["cached", "set_backend", "get_backend", "init_cache"]
+
+logger = logging.getLogger(__name__)
+
+_backend: Optional[CacheBackend] = None
+
+def set_backend(backend: Optional[CacheBackend]):
+    global _backend
+    _backend = backend
+
+def get_backend() -> Optional[CacheBackend]:
+    return _backend
+
+def init_cache():
+    set_backend(backend_from_url(cache_url) if cache_url else None)
+
+def cached(user_param: str):
+    """Caches the decorated function's results per user, the user id being its `user_param` argument.
+
+    The other arguments are part of the key. Results are only encoded, with a TypeAdapter over
+    the function's return type, for the backends shared between processes.
+    """
+    def wrapper(func):
+        signature = inspect.signature(func)
+        name = f"{func.__module__}.{func.__qualname__}"
+        adapter: Optional[TypeAdapter] = None
+
+        @wraps(func)
+        def decorator(*args, **kwargs):
+            nonlocal adapter
+            backend = _backend
+            if backend is None:
+                return func(*args, **kwargs)
+
+            arguments = signature.bind(*args, **kwargs).arguments
+            user_id = str(arguments[user_param])
+            others = {key: value for key, value in arguments.items() if key != user_param}
+            suffix = f":{hashlib.blake2b(repr(sorted(others.items())).encode(), digest_size=8).hexdigest()}" if others else ""
+            stale_key = f"stale:{name}:{user_id}{suffix}"
+            try:
+                key = f"{name}:{user_id}:{_generation(backend, user_id)}{suffix}"
+                value = backend.get(key)
+            except CacheBackendError as e:
+                logger.warning("read cache unavailable: %s", e)
+                return func(*args, **kwargs)
+
+            record_cache_lookup(name, hit=value is not None)
+            if backend.shared and adapter is None:
+                adapter = TypeAdapter(get_type_hints(func)["return"])
+            if value is not None:
+                return adapter.validate_json(value) if backend.shared else value
+
+            if is_degraded():
+                return _stale(backend, stale_key, adapter)
+            try:
+                result = func(*args, **kwargs)
+            except DB_ERRORS:
+                database_failed()
+                return _stale(backend, stale_key, adapter)
+            if result is not None:
+                try:
+                    if backend.shared:
+                        encoded = adapter.dump_json(result)
+                        backend.set(key, encoded, cache_ttl)
+                        backend.set(stale_key, b"%f:%s" % (time.time(), encoded), cache_stale_ttl)
+                    else:
+                        backend.set(key, result, cache_ttl)
+                        backend.set(stale_key, (time.time(), result), cache_stale_ttl)
+                except CacheBackendError as e:
+                    logger.warning("read cache unavailable: %s", e)
+            return result
+        return decorator
+    return wrapper
+
+def _stale(backend: CacheBackend, stale_key: str, adapter: Optional[TypeAdapter]) -> Any:
+    """The last copy stored under `stale_key`, raises DatabaseUnavailable when there's none."""
+    try:
+        value = backend.get(stale_key)
+    except CacheBackendError as e:
+        raise DatabaseUnavailable() from e
+    if value is None:
+        raise DatabaseUnavailable()
+    if backend.shared:
+        stored_at, _, encoded = value.partition(b":")
+        stored_at, value = float(stored_at), adapter.validate_json(encoded)
+    else:
+        stored_at, value = value
+    mark_stale(stored_at)
+    return value
+
+def _generation(backend: CacheBackend, user_id: str) -> str:
+    key = f"generation:{user_id}"
+    token = backend.get(key)
+    if token is None:
+        # the generation outlives the entries, losing it early only costs misses
+        backend.set(key, secrets.token_hex(8), cache_ttl * 10, only_if_missing=True)
+        # another process may have started the generation first
+        token = backend.get(key) or ""
+    return token.decode() if isinstance(token, bytes) else token
+
+@on_data_change
+def _invalidate(user_ids: Set[Any]):
+    backend = _backend
+    if backend is None:
+        return
+    try:
+        backend.delete(*(f"generation:{user_id}" for user_id in user_ids))
+    except CacheBackendError as e:
+        logger.warning("failed to invalidate the read cache of users %s: %s", sorted(user_ids), e)
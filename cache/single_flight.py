@@ -0,0 +1,73 @@
+"""Coalescing of identical concurrent reads.
+
+A dashboard loading several widgets fires the same requests at once, and each would run the
+same queries. With `single_flight`, the first call of a function with given arguments runs it,
+the identical calls made while it's running, in other threads of the worker, wait for it and
+share its result, or its exception.
+
+Like the read cache's, the shared results must not be modified by the callers. The flights of
+the users whose data changed are dropped when the change commits (see
+`db.versions.on_data_change`), so a call made after a write never gets a result read before it.
+"""
+import inspect
+import threading
+from functools import wraps
+from typing import Any, Dict, Optional, Set, Tuple
+from db.versions import on_data_change
+
+__all__ = ["single_flight"]
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+_flights: Dict[Tuple[str, str, str], _Flight] = {}
+_lock = threading.Lock()
+
+def single_flight(user_param: str):
+    """Coalesces the concurrent calls with the same arguments, `user_param` is the user id argument."""
+    def wrapper(func):
+        signature = inspect.signature(func)
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def decorator(*args, **kwargs):
+            arguments = signature.bind(*args, **kwargs).arguments
+            others = sorted((key, value) for key, value in arguments.items() if key != user_param)
+            key = (name, str(arguments[user_param]), repr(others))
+            with _lock:
+                flight = _flights.get(key)
+                running = flight is not None
+                if not running:
+                    flight = _flights[key] = _Flight()
+
+            if running:
+                flight.done.wait()
+                if flight.error is not None:
+                    raise flight.error
+                return flight.result
+
+            try:
+                flight.result = func(*args, **kwargs)
+                return flight.result
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                with _lock:
+                    if _flights.get(key) is flight:
+                        del _flights[key]
+                flight.done.set()
+        return decorator
+    return wrapper
+
+@on_data_change
+def _drop_flights(user_ids: Set[Any]):
+    user_ids = {str(user_id) for user_id in user_ids}
+    with _lock:
+        for key in [key for key in _flights if key[1] in user_ids]:
+            del _flights[key]
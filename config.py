@@ -1,5 +1,6 @@
 from dotenv import load_dotenv, dotenv_values
 import os
+import tempfile
 
 # load_dotenv()
 # config = dotenv_values(".env")
@@ -9,4 +10,69 @@ import os
 
 db_conn = os.getenv("DB_CONN")
 jwt_secret = os.getenv("JWT_SECRET")
-jwt_algorithm = os.getenv("JWT_ALGORITHM", "HS256")
\ No newline at end of file
+jwt_algorithm = os.getenv("JWT_ALGORITHM", "HS256")
+debug = os.getenv("DEBUG", "False").lower() in ["true", "1", "t"]
+# the number of identical statements in one request that is reported as a likely N+1 query
+query_repeat_threshold = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+# statements slower than this are logged with their query plan, unset to disable the slow-query log
+slow_query_threshold_ms = float(os.getenv("SLOW_QUERY_THRESHOLD_MS")) if os.getenv("SLOW_QUERY_THRESHOLD_MS") else None
+slow_query_sample_rate = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "1.0"))
+slow_query_log = os.getenv("SLOW_QUERY_LOG")
+# set when running several gunicorn workers so /metrics aggregates all of them, see gunicorn.conf.py
+prometheus_multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+# when set, request traces are appended to this file as JSON lines
+trace_file = os.getenv("TRACE_FILE")
+# fraction of requests profiled without the X-Profile header, and the profiler's sampling interval
+profile_sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+profile_interval_ms = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+profile_dir = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "revobank-profiles"))
+# the latest profiles kept in PROFILE_DIR, the older ones are removed
+profile_max_files = int(os.getenv("PROFILE_MAX_FILES", "1000"))
+# build the transaction and bill listings as JSON in PostgreSQL and stream them, ignored on other databases
+sql_json_listings = os.getenv("SQL_JSON_LISTINGS", "False").lower() in ["true", "1", "t"]
+# responses smaller than this many bytes are sent uncompressed, streamed responses are always compressed
+compression_min_size = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# read cache in front of the per-user db reads, `memory://` (one process only) or `redis://host:port/db`, unset to disable
+cache_url = os.getenv("CACHE_URL")
+cache_ttl = float(os.getenv("CACHE_TTL", "300"))
+# how long the last copy of a cached read is kept, to be served while the database is degraded
+cache_stale_ttl = float(os.getenv("CACHE_STALE_TTL", "86400"))
+# seconds to wait for a connection, from the pool or from PostgreSQL, and how long the writes fail fast after a database error
+db_pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "2"))
+degraded_cooldown = float(os.getenv("DEGRADED_COOLDOWN", "5"))
+# requests in flight per worker before the admission control sheds load (0 disables it), the pool
+# wait over which the non-critical routes are shed, and the Retry-After of the rejected requests
+admission_max_in_flight = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "32"))
+admission_max_pool_wait_ms = float(os.getenv("ADMISSION_MAX_POOL_WAIT_MS", "100"))
+admission_retry_after = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+# time budget of a request, and of the routes that need another, as `endpoint=ms,endpoint=ms`
+request_deadline_ms = float(os.getenv("REQUEST_DEADLINE_MS", "5000"))
+route_deadlines_ms = {
+    endpoint.strip(): float(ms)
+    for endpoint, _, ms in (entry.partition("=") for entry in os.getenv("ROUTE_DEADLINES_MS", "").split(",") if entry.strip())
+}
+# consecutive database connection failures before the circuit breaker opens, how long it stays
+# open, in seconds, and how many connection attempts it lets through once half-open
+breaker_failure_threshold = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+breaker_reset_timeout = float(os.getenv("BREAKER_RESET_TIMEOUT", "10"))
+breaker_half_open_trials = int(os.getenv("BREAKER_HALF_OPEN_TRIALS", "1"))
+# how long the results of the health checks are reused, and the pool saturation over which the
+# worker reports it isn't ready
+health_cache_seconds = float(os.getenv("HEALTH_CACHE_SECONDS", "5"))
+readiness_max_pool_saturation = float(os.getenv("READINESS_MAX_POOL_SATURATION", "0.9"))
+# whether the responses carry a `Server-Timing` header with the time spent in each phase of the request
+server_timing = os.getenv("SERVER_TIMING", "1") == "1"
+# level of the loggers, and of some modules as `module=LEVEL,module=LEVEL`, `json` or `text` log lines,
+# the records queued for the logging thread before new ones are dropped, and the fraction of the
+# records under WARNING kept for the high-volume loggers, as `logger=rate,logger=rate`
+log_level = os.getenv("LOG_LEVEL", "INFO").upper()
+log_levels = {
+    name.strip(): level.strip().upper()
+    for name, _, level in (entry.partition("=") for entry in os.getenv("LOG_LEVELS", "").split(",") if entry.strip())
+}
+log_format = os.getenv("LOG_FORMAT", "json")
+log_queue_size = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+log_sample_rates = {
+    name.strip(): float(rate)
+    for name, _, rate in (entry.partition("=") for entry in os.getenv("LOG_SAMPLE_RATES", "").split(",") if entry.strip())
+}
@@ -5,7 +5,9 @@ import pytest
 from app import create_app
 from models import UserCredential, Account, Transaction
 from db import Base, DB
-from typing import List, Generator
+from contextlib import contextmanager
+from typing import List, Generator, Callable, ContextManager
+from monitoring import track_queries, QueryStats
 from auth_jwt.blacklist import blacklisted_tokens
 
 @pytest.fixture(autouse=True)
@@ -21,6 +23,28 @@ def app() -> Generator[Flask, None, None]:
     Base.metadata.drop_all(DB.get_engine())
 
 
+@pytest.fixture
+def statements(app: Flask) -> Generator[List[str], None, None]:
+    """Records every SQL statement sent to the database while the test runs."""
+    with track_queries() as stats:
+        yield stats.statements
+
+@pytest.fixture
+def query_budget(app: Flask) -> Callable[[int], ContextManager[QueryStats]]:
+    """Asserts that the block runs at most `max_statements` statements, e.g.
+
+        with query_budget(2):
+            client.get("/accounts/", headers=...)
+    """
+    @contextmanager
+    def budget(max_statements: int) -> Generator[QueryStats, None, None]:
+        with track_queries() as stats:
+            yield stats
+        assert stats.count <= max_statements, (
+            f"expected at most {max_statements} statements, got {stats.count}: {stats.statements}"
+        )
+    return budget
+
 @pytest.fixture
 def client(app: Flask) -> FlaskClient:
     return app.test_client()
@@ -1 +1,3 @@
-from .db import *
\ No newline at end of file
+from .db import *
+from .versions import *
+from .breaker import *
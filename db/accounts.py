@@ -2,7 +2,10 @@ from typing import List, Optional
 from models import Account as AccountModel, CreateAccountRequest, UpdateAccountRequest
 from sqlalchemy import select, delete
 from sqlalchemy.exc import NoResultFound
-from db import db_session, Users, Accounts
+from db import db_session, Users, Accounts, bump_data_versions
+from .projections import ACCOUNT_COLUMNS, account_from_row
+from monitoring import traced
+from cache import cached, single_flight
 
 class AccountsNotFoundException(Exception):
     def __init__(self, user_id:str):
@@ -14,20 +17,24 @@ class AccountNotFoundException(Exception):
         super().__init__("account not found")
         self.account_id = account_id
 
+@traced
+@cached("user_id")
+@single_flight("user_id")
 def get_accounts(user_id:str) -> List[AccountModel]:
-    try:
-        statement=select(Users).where(Users.id.is_(user_id))
-        user = db_session().scalars(statement=statement).one()
-        return user.get_accounts()
-    except NoResultFound:
+    statement = select(*ACCOUNT_COLUMNS).where(Accounts.user_id == user_id)
+    accounts = [account_from_row(row) for row in db_session.execute(statement)]
+    # every user starts with a default account, so the user lookup is only needed when there's none
+    if not accounts and db_session.scalar(select(Users.id).where(Users.id == user_id)) is None:
         raise AccountsNotFoundException(user_id=user_id)
+    return accounts
     
+@traced
 def get_account(user_id:str, account_id:str) -> Optional[AccountModel]:
     try:
         statement = (
             select(Accounts)
-            .filter(Accounts.id.is_(account_id))
-            .filter(Accounts.user_id.is_(user_id))
+            .filter(Accounts.id == account_id)
+            .filter(Accounts.user_id == user_id)
         )
 
         account = db_session.scalars(statement=statement).one()
@@ -39,16 +46,18 @@ def get_account(user_id:str, account_id:str) -> Optional[AccountModel]:
 # through actions like transfer, withdraw, or deposit, right? since the actions will also 
 # produce transaction traces that we can use to verify the account integrity. Anyway, let's 
 # do this as an exercise.
+@traced
 def update_account(user_id:str, request: UpdateAccountRequest) -> Optional[AccountModel]:
     try:
         if request.account_id:
             account = db_session.query(Accounts).filter_by(id=request.account_id).first()
         else:
-            user = db_session.query(Users).filter_by(id=user_id).first()
-            if not user or not user.default_account_id:
-                raise AccountsNotFoundException(user_id=user_id)
-            
-            account = db_session.query(Accounts).filter_by(id=user.default_account_id).first()
+            account = (
+                db_session.query(Accounts)
+                .join(Users, Users.default_account_id == Accounts.id)
+                .filter(Users.id == user_id)
+                .first()
+            )
 
         if not account:
             raise AccountsNotFoundException(user_id=user_id)
@@ -60,6 +69,7 @@ def update_account(user_id:str, request: UpdateAccountRequest) -> Optional[Accou
         db_session.rollback()
         raise AccountsNotFoundException(user_id=user_id)
     
+@traced
 def create_account(user_id:str, request: CreateAccountRequest) -> AccountModel:
     try:
         account = Accounts(balance=request.balance, user_id=int(user_id))
@@ -70,10 +80,13 @@ def create_account(user_id:str, request: CreateAccountRequest) -> AccountModel:
         db_session.rollback()
         raise AccountNotFoundException(account_id="")
     
+@traced
 def delete_account(user_id:str, account_id:str):
     try:
-        statement = delete(Accounts).where(Accounts.id.is_(account_id)).returning(Accounts.id)
+        statement = delete(Accounts).where(Accounts.id == account_id).returning(Accounts.id, Accounts.user_id)
         result = db_session.execute(statement=statement).one()
+        # a Core statement, the flush doesn't see the deleted account
+        bump_data_versions([result.user_id])
         db_session.commit()
         db_session.flush()
         return result[0]
@@ -1,15 +1,20 @@
-from typing import List
+from typing import List, Iterator
 from models import CreateBillRequest, Bill, QueryBillsRequest, UpdateBillRequest
 from db import db_session, Bills, Users, Accounts
 from db.users import UserNotFoundException
 from db.accounts import AccountNotFoundException
-from sqlalchemy import select
+from sqlalchemy import Select, select
+from .projections import BILL_COLUMNS, bill_from_row
+from .json_listings import json_object, json_string, json_number, json_datetime, stream_json_rows
+from monitoring import traced
+from cache import cached, single_flight
 
 class BillNotFoundException(Exception):
     def __init__(self, bill_id:str):
         super().__init__("the bill can't be found")
         self.bill_id = bill_id
 
+@traced
 def create_bill(user_id: str, request: CreateBillRequest) -> Bill:
     user = db_session.get(Users, user_id)
     if user is None:
@@ -47,18 +52,37 @@ def create_bill(user_id: str, request: CreateBillRequest) -> Bill:
     db_session.commit()
     return model
 
+@traced
+@cached("user_id")
+@single_flight("user_id")
 def get_bills(user_id: str, request:QueryBillsRequest) -> List[Bill]:
-    user = db_session.get(Users, user_id)
-    if user is None:
+    if db_session.scalar(select(Users.id).where(Users.id == user_id)) is None:
         raise UserNotFoundException(id=user_id)
-    
-    statement = (
-        select(Bills)
-        .where(Bills.user_id.is_(user_id))
+
+    statement = _filter_bills(select(*BILL_COLUMNS), user_id, request)
+    return [bill_from_row(row) for row in db_session.execute(statement)]
+
+@traced
+def get_bills_json(user_id: str, request:QueryBillsRequest) -> Iterator[str]:
+    """The bills of `get_bills` as JSON documents built by PostgreSQL, see `db.json_listings`."""
+    if db_session.scalar(select(Users.id).where(Users.id == user_id)) is None:
+        raise UserNotFoundException(id=user_id)
+
+    bill = json_object(
+        ("account_id", json_string(Bills.account_id)),
+        ("amount", json_number(Bills.amount)),
+        ("biller_name", json_string(Bills.biller_name)),
+        # models.DateTime replaces the timezone with UTC
+        ("due_date", json_datetime(Bills.due_date, offset="+00:00")),
+        ("id", json_string(Bills.id)),
     )
+    return stream_json_rows(_filter_bills(select(bill), user_id, request))
+
+def _filter_bills(statement: Select, user_id: str, request:QueryBillsRequest) -> Select:
+    statement = statement.where(Bills.user_id == user_id).order_by(Bills.id)
 
     if request.account_id is not None:
-        statement = statement.filter(Bills.account_id.is_(request.account_id))
+        statement = statement.filter(Bills.account_id == request.account_id)
     if request.biller_name is not None:
         statement = statement.filter(Bills.biller_name.like(request.biller_name))
     if request.due_date_from is not None:
@@ -70,21 +94,9 @@ def get_bills(user_id: str, request:QueryBillsRequest) -> List[Bill]:
     if request.amount_max is not None:
         statement = statement.filter(Bills.amount <= request.amount_max)
 
-    result = db_session.scalars(statement=statement).all()
-    bills: List[Bill] = []
-    for res in result:
-        bill = Bill(
-            id=str(res.id),
-            account_id=str(res.account_id),
-            biller_name=res.biller_name,
-            due_date=res.due_date.isoformat(),
-            amount=res.amount,
-        )
-
-        bills.append(bill)
-    
-    return bills
+    return statement
 
+@traced
 def update_bill(user_id: str, bill_id:str, request: UpdateBillRequest) -> Bill: 
     user = db_session.get(Users, user_id)
     if user is None:
@@ -112,6 +124,7 @@ def update_bill(user_id: str, bill_id:str, request: UpdateBillRequest) -> Bill:
 
     return updated
 
+@traced
 def get_bill(user_id: str, bill_id: str) -> Bill:
 
     user = db_session.get(Users, user_id)
@@ -130,6 +143,7 @@ def get_bill(user_id: str, bill_id: str) -> Bill:
         amount=bill.amount,
     )
 
+@traced
 def delete_bill(user_id: str, bill_id: str) -> bool:
     user = db_session.get(Users, user_id)
     if user is None:
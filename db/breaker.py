@@ -0,0 +1,95 @@
+"""Circuit breaker around the database connections.
+
+While the database is down, every new connection waits for the connect timeout. The breaker
+counts the consecutive connection failures, on connect or as disconnects while running a
+statement, and after `BREAKER_FAILURE_THRESHOLD` of them it opens: for `BREAKER_RESET_TIMEOUT`
+seconds the new connections fail right away with `CircuitOpenError`, and the worker is in
+degraded mode (see `shared.degradation`). Then it's half-open, it lets
+`BREAKER_HALF_OPEN_TRIALS` connection attempts through: the first to succeed closes it, a
+failure opens it again.
+
+The breaker is per worker. Its state is reported by the `/` health check and the
+`db_circuit_breaker_state` metric.
+"""
+import threading
+import time
+from sqlalchemy import Engine, event
+from config import breaker_failure_threshold, breaker_reset_timeout, breaker_half_open_trials
+from monitoring import DB_CIRCUIT_STATE
+from .db import DB
+
+__all__ = ["CircuitOpenError", "CircuitBreaker", "circuit_breaker", "CLOSED", "OPEN", "HALF_OPEN"]
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+# the values of the state in the metric
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitOpenError(Exception):
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"the database circuit breaker is open, retry in {retry_after:.1f}s")
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float, half_open_trials: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_trials = half_open_trials
+        self.failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trials = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic()) if self._current_state() == OPEN else 0.0
+
+    def before_connect(self):
+        """Raises CircuitOpenError when the connection mustn't be attempted."""
+        with self._lock:
+            state = self._current_state()
+            if state == OPEN or (state == HALF_OPEN and self._trials >= self.half_open_trials):
+                raise CircuitOpenError(max(0.0, self._opened_at + self.reset_timeout - time.monotonic()))
+            if state == HALF_OPEN:
+                self._trials += 1
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._current_state() == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def watch(self, engine: Engine):
+        event.listen(engine, "do_connect", lambda dialect, record, cargs, cparams: self.before_connect())
+        event.listen(engine, "connect", lambda dbapi_connection, record: self.record_success())
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def _handle_error(self, context):
+        # no connection: it failed to connect
+        if context.connection is None or context.is_disconnect:
+            self.record_failure()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() >= self._opened_at + self.reset_timeout:
+            self._set_state(HALF_OPEN)
+        return self._state
+
+    def _set_state(self, state: str):
+        if state in (OPEN, HALF_OPEN):
+            self._trials = 0
+        self._state = state
+        DB_CIRCUIT_STATE.set(STATE_VALUES[state])
+
+circuit_breaker = CircuitBreaker(breaker_failure_threshold, breaker_reset_timeout, breaker_half_open_trials)
+circuit_breaker.watch(DB.get_engine())
@@ -5,6 +5,9 @@ from db.users import UserNotFoundException
 from sqlalchemy import select
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.orm import joinedload
+from .projections import BUDGET_COLUMNS, BUDGET_USER_COLUMNS, budgets_from_rows
+from monitoring import traced
+from cache import cached, single_flight
 
 class BudgetsNotFoundException(Exception):
     def __init__(self, user_id:str):
@@ -16,6 +19,7 @@ class BudgetNotFoundException(Exception):
         super().__init__("budget can't be found")
         self.budget_id = budget_id
 
+@traced
 def create_budget(user_id: str, request: CreateBudgetRequest) -> Optional[BudgetModel]:
     user = db_session.get(Users, user_id)
     if user is None:
@@ -50,6 +54,7 @@ def create_budget(user_id: str, request: CreateBudgetRequest) -> Optional[Budget
     db_session.commit()
     return response
 
+@traced
 def get_budget(budget_id: str) -> BudgetModel:
     budget = db_session.get(Budgets, budget_id, options=[joinedload(Budgets.user)])
     if budget is None:
@@ -69,29 +74,22 @@ def get_budget(budget_id: str) -> BudgetModel:
             end_date=budget.end_date.isoformat(),
         )
     
+@traced
+@cached("user_id")
+@single_flight("user_id")
 def get_budgets(user_id: str) -> List[BudgetModel]:
     try:
-        statement = select(Budgets).where(Budgets.user_id.is_(user_id)).options(joinedload(Budgets.user))
-        budgets = db_session.scalars(statement=statement).all()
-        response =  [BudgetModel(
-            id=str(budget.id),
-            name=budget.name,
-            amount=budget.amount,
-            user=UserInformation(
-                name=budget.user.username,
-                fullname=budget.user.fullname,
-                email_address=budget.user.email,
-                default_account=None,
-                roles=budget.user.roles.split(","),     
-            ),
-            start_date=budget.start_date.isoformat(),
-            end_date=budget.end_date.isoformat(),
-        ) for budget in budgets]
-        return response
+        statement = (
+            select(*BUDGET_COLUMNS, *BUDGET_USER_COLUMNS)
+            .join(Users, Budgets.user_id == Users.id)
+            .where(Budgets.user_id == user_id)
+        )
+        return budgets_from_rows(db_session.execute(statement).all())
     except NoResultFound as e:
         db_session.rollback()
         raise BudgetsNotFoundException(user_id=user_id)
     
+@traced
 def update_budget(budget_id: str, request: UpdateBudgetRequest)-> Optional[BudgetModel]:
     try:
         budget = db_session.get(Budgets, budget_id, options=[joinedload(Budgets.user)])
@@ -124,6 +122,7 @@ def update_budget(budget_id: str, request: UpdateBudgetRequest)-> Optional[Budge
         db_session.rollback()
         raise BudgetNotFoundException(budget_id=budget_id)
     
+@traced
 def delete_budget(budget_id:str):
     try:
         budget = db_session.get(Budgets, budget_id)
@@ -2,6 +2,7 @@ import bcrypt
 from sqlalchemy import select
 from sqlalchemy.exc import NoResultFound
 from db import db_session, Users
+from monitoring import track_bcrypt, traced
 class UserNotFoundException(Exception):
     # keep the email for logging
     email: str
@@ -16,16 +17,18 @@ class WrongCredentialException(Exception):
         super().__init__("incorrect email/password")
         self.email = email
     
+@traced
 def get_and_compare_hash(email_address:str, password:str) -> str:
     if email_address is None or password is None:
             raise WrongCredentialException(email=email_address)
     try:
-        statement = select(Users).where(Users.email.is_(email_address))
+        statement = select(Users).where(Users.email == email_address)
         user = db_session.scalars(statement=statement).one()
         if user is None:
             raise UserNotFoundException(email=email_address)
         hash = user.credential.hash
-        ok = bcrypt.checkpw(password=password.encode(), hashed_password=hash)
+        with track_bcrypt("check"):
+            ok = bcrypt.checkpw(password=password.encode(), hashed_password=hash)
         if not ok:
             raise WrongCredentialException(email=email_address)
 
@@ -1,34 +1,57 @@
+import math
+import time
 import uuid
-import os
 import bcrypt
 from typing import Optional, List, get_args, Literal
-from sqlalchemy import create_engine, Engine
+from sqlalchemy import create_engine, make_url, Engine
 from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
 from sqlalchemy import ForeignKey, String, DateTime, Enum
 from sqlalchemy.sql import func
 from sqlalchemy.orm import  Mapped, mapped_column, relationship
 from exceptions import ConfigurationError
-from config import db_conn
+from monitoring import record_pool_wait
+from config import db_conn, debug, db_pool_timeout, request_deadline_ms
 from models import Account as AccountModel, UserCredential, UserInformation, Transaction as TransactionModel
 
-engine = create_engine(db_conn, echo=os.getenv('DEBUG', 'False').lower() in ['true', '1', 't'])
-db_session = scoped_session(sessionmaker(
-    autoflush=False, 
-    bind=engine,
-    autocommit=False))
+class TimedQueuePool(QueuePool):
+    """A QueuePool recording how long each checkout waited for a connection, see `shared.admission`."""
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            record_pool_wait(time.perf_counter() - start)
+
+def _engine_options(url: str) -> dict:
+    # SQLite's pools don't queue for connections
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    options = {"poolclass": TimedQueuePool, "pool_timeout": db_pool_timeout}
+    if make_url(url).get_backend_name() == "postgresql":
+        # the statements of a request are cut at its deadline, see `shared.deadlines`
+        options["connect_args"] = {
+            "connect_timeout": max(1, math.ceil(db_pool_timeout)),
+            "options": f"-c statement_timeout={math.ceil(request_deadline_ms)}",
+        }
+    return options
 
 class DB:
-    _instance: Engine = create_engine(db_conn, echo=os.getenv('DEBUG', 'False').lower() in ['true', '1', 't'])
+    _instance: Engine = create_engine(db_conn, echo=debug, **_engine_options(db_conn))
 
     @classmethod
     def get_engine(cls) -> Engine:
         return cls._instance
 Base = declarative_base()
 
+# expire_on_commit is disabled so that the response models can be built from the instances
+# right after `commit()` without SQLAlchemy reloading every attribute with a fresh SELECT. The
+# session is removed at the end of each request (see `create_app`), so nothing stale survives.
 db_session = scoped_session(sessionmaker(
     autoflush=False, 
     bind=DB.get_engine(),
-    autocommit=False))
+    autocommit=False,
+    expire_on_commit=False))
 
 Base.query = db_session.query_property()
 
@@ -52,6 +75,8 @@ class Transactions(Base):
         - Has many TransactionEntries (one-to-many)
     """
     __tablename__ = "transactions"
+    # fetch server-generated timestamps with RETURNING on insert instead of a later SELECT
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(primary_key=True)
     transaction_type: Mapped[TransactionType] = mapped_column(
@@ -88,10 +113,10 @@ class TransactionEntries(Base):
     entry_id: Mapped[int] = mapped_column(primary_key=True)
     amount: Mapped[int]
 
-    transaction_id: Mapped[int] = mapped_column(ForeignKey("transactions.id"))
+    transaction_id: Mapped[int] = mapped_column(ForeignKey("transactions.id"), index=True)
     transaction: Mapped["Transactions"] = relationship(back_populates="entries")
 
-    account_id:Mapped[int] = mapped_column(ForeignKey("accounts.id"))
+    account_id:Mapped[int] = mapped_column(ForeignKey("accounts.id"), index=True)
     account:Mapped["Accounts"] = relationship(back_populates="transaction_entries")
 
     entry_type: Mapped[TransactionEntryType] = mapped_column(
@@ -137,9 +162,10 @@ class Accounts(Base):
         __repr__(): String representation of the account
     """
     __tablename__ = "accounts"
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
     user: Mapped["Users"] = relationship(back_populates="accounts", foreign_keys=[user_id])
     account_type: Mapped[str] = mapped_column(String(30), default="saving")
     account_number: Mapped[str] = mapped_column(String(128), default=lambda: str(uuid.uuid4()))
@@ -198,6 +224,7 @@ class Users(Base):
         __repr__(): String representation of the user
     """
     __tablename__ = "users"
+    __mapper_args__ = {"eager_defaults": True}
     id: Mapped[int] = mapped_column(primary_key=True)
     username: Mapped[str] = mapped_column(String(30))
     fullname: Mapped[Optional[str]]
@@ -274,6 +301,7 @@ class Credentials(Base):
         __repr__(): String representation of the credential
     """
     __tablename__ = "user_credentials"
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
@@ -290,7 +318,7 @@ class Budgets(Base):
     __tablename__ = "budgets"
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(30))
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
     user: Mapped["Users"] = relationship(back_populates="budgets")
     amount: Mapped[int]
     start_date: Mapped[DateTime] = mapped_column(DateTime(timezone=True))
@@ -301,14 +329,14 @@ class TransactionCategories(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(30))
-    transaction_id: Mapped[int] = mapped_column(ForeignKey("transactions.id"))
+    transaction_id: Mapped[int] = mapped_column(ForeignKey("transactions.id"), index=True)
     transaction: Mapped[Transactions] = relationship(back_populates="category")
     
 class Bills(Base):
     __tablename__ = "bills"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
     user: Mapped[Users] = relationship(back_populates="bills")
     biller_name: Mapped[str] = mapped_column(String(30))
     due_date: Mapped[DateTime] = mapped_column(DateTime(timezone=True))
@@ -316,6 +344,18 @@ class Bills(Base):
     account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"))
     account: Mapped[Accounts] = relationship(back_populates="bills")
 
+class DataVersions(Base):
+    """Version of the data a user can read through the API.
+
+    The version is bumped by every write to the user's accounts, ledger, budgets, bills or profile
+    (see db/versions.py) and identifies the state of that data in the ETags of the read endpoints.
+    Users that were never written to have no row, which is version 0.
+    """
+    __tablename__ = "data_versions"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    version: Mapped[int] = mapped_column(default=0)
+
 if not db_conn:
     raise ConfigurationError("DB_CONN is not set")
 
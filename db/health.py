@@ -0,0 +1,62 @@
+"""Database checks of the health endpoints, see routes/health.py.
+
+They use their own connection from the engine, not the request's session, so a probe never
+joins or breaks the transaction of the request.
+"""
+import os
+import time
+from typing import Dict, List, Optional
+from sqlalchemy import inspect, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from .db import Base, DB
+
+__all__ = ["ping_database", "migration_version", "expected_migrations", "check_tables", "pool_status"]
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+def ping_database() -> float:
+    """Runs `SELECT 1` and returns its round trip in seconds, raises when the database fails."""
+    start = time.perf_counter()
+    with DB.get_engine().connect() as connection:
+        connection.execute(text("SELECT 1"))
+    return time.perf_counter() - start
+
+def migration_version() -> Optional[str]:
+    """The alembic revision of the database, None when it isn't managed by migrations."""
+    with DB.get_engine().connect() as connection:
+        if not inspect(connection).has_table("alembic_version"):
+            return None
+        return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+def expected_migrations() -> Optional[List[str]]:
+    """The head revisions of the migrations shipped with the app, None without migrations."""
+    if not os.path.isdir(MIGRATIONS_DIR):
+        return None
+    from alembic.script import ScriptDirectory
+    return list(ScriptDirectory(MIGRATIONS_DIR).get_heads())
+
+def check_tables() -> Dict[str, bool]:
+    """Whether each table of the models can be read, one row at most, so it's cheap on any size."""
+    results = {}
+    with DB.get_engine().connect() as connection:
+        for table in Base.metadata.sorted_tables:
+            try:
+                with connection.begin_nested():
+                    connection.execute(select(text("1")).select_from(table).limit(1))
+                results[table.name] = True
+            except SQLAlchemyError:
+                results[table.name] = False
+    return results
+
+def pool_status() -> Optional[dict]:
+    pool = DB.get_engine().pool
+    # only QueuePool (the default outside of SQLite) keeps these counters
+    if not hasattr(pool, "checkedout"):
+        return None
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "saturation": round(pool.checkedout() / capacity, 3) if capacity else 1.0,
+    }
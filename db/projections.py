@@ -0,0 +1,76 @@
+"""Column projections for the listing endpoints.
+
+Hydrating ORM instances means building the objects, registering them in the identity map
+and tracking their state, only for the listings to copy a few attributes into the response
+models. The functions here select just the columns a response needs, as plain row tuples,
+and build the response models from them.
+"""
+from itertools import groupby
+from typing import Iterable, List, Optional, Sequence
+from sqlalchemy import Row, func
+from models import Account as AccountModel, Bill as BillModel, Budget as BudgetModel, UserInformation
+from .records import TransactionRecord
+from .db import Accounts, Bills, Budgets, Users, Transactions, TransactionEntries, TransactionCategories
+
+ACCOUNT_COLUMNS = (Accounts.id, Accounts.user_id, Accounts.balance, Accounts.created_at, Accounts.updated_at)
+
+def account_from_row(row: Row) -> AccountModel:
+    id, user_id, balance, created_at, updated_at = row
+    return AccountModel(id=str(id), user_id=str(user_id), balance=balance, created_at=created_at, updated_at=updated_at)
+
+BILL_COLUMNS = (Bills.id, Bills.account_id, Bills.biller_name, Bills.due_date, Bills.amount)
+
+def bill_from_row(row: Row) -> BillModel:
+    id, account_id, biller_name, due_date, amount = row
+    return BillModel(id=str(id), account_id=str(account_id), biller_name=biller_name, due_date=due_date, amount=amount)
+
+BUDGET_COLUMNS = (Budgets.id, Budgets.name, Budgets.amount, Budgets.start_date, Budgets.end_date)
+BUDGET_USER_COLUMNS = (Users.username, Users.fullname, Users.email, Users.roles)
+
+def budgets_from_rows(rows: Sequence[Row]) -> List[BudgetModel]:
+    """Builds budgets from `BUDGET_COLUMNS + BUDGET_USER_COLUMNS` rows, sharing one owner model per user."""
+    owners = {}
+    budgets = []
+    for id, name, amount, start_date, end_date, username, fullname, email, roles in rows:
+        owner = owners.get(email)
+        if owner is None:
+            owner = owners[email] = UserInformation(name=username, fullname=fullname, email_address=email, default_account=None, roles=roles.split(","))
+        budgets.append(BudgetModel(id=str(id), name=name, amount=amount, user=owner, start_date=start_date, end_date=end_date))
+    return budgets
+
+# one row per entry, ordered by transaction so that the entries of a transaction are adjacent
+TRANSACTION_ENTRY_COLUMNS = (
+    Transactions.id, Transactions.transaction_type, Transactions.timestamp,
+    # the category of the requests' default, for the transactions without one
+    func.coalesce(TransactionCategories.name, "none").label("name"),
+    TransactionEntries.account_id, TransactionEntries.amount, TransactionEntries.entry_type,
+)
+
+def transactions_from_rows(rows: Iterable[Row]) -> List[TransactionRecord]:
+    """Builds transactions from `TRANSACTION_ENTRY_COLUMNS` rows, with the same rules as `_parse_transaction_record`."""
+    transactions = []
+    for _, entries in groupby(rows, key=lambda row: row[0]):
+        transaction = _transaction_from_entries(list(entries))
+        if transaction is not None:
+            transactions.append(transaction)
+    return transactions
+
+def _transaction_from_entries(entries: List[Row]) -> Optional[TransactionRecord]:
+    id, transaction_type, timestamp, category, account_id, amount, entry_type = entries[0]
+    if transaction_type != "transfer":
+        return TransactionRecord(
+            id=str(id), account_id=str(account_id), transaction_type=transaction_type,
+            amount=amount, timestamp=timestamp, category=category,
+        )
+
+    if len(entries) < 2:
+        # TODO: log out that there's an invalid transaction entry
+        return None
+
+    sender, recipient = entries[0], entries[1]
+    if entry_type == "credit":
+        sender, recipient = entries[1], entries[0]
+    return TransactionRecord(
+        id=str(id), account_id=str(sender[4]), transaction_type=transaction_type,
+        amount=sender[5], timestamp=timestamp, recipient_id=str(recipient[4]), category=category,
+    )
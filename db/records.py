@@ -0,0 +1,70 @@
+"""Lightweight records for internal code paths.
+
+The pydantic models in `models` validate and coerce every field when they're built, which is
+wasted work for data that comes straight from the database and is only read by internal code,
+like the current user loaded for the RBAC checks of every request, or the rows of a listing.
+The records here are slotted, frozen dataclasses with the same fields, they're converted to the
+pydantic models with `to_model()` only where they leave the API.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Annotated, Optional, Tuple
+from pydantic import PlainSerializer
+from models import Account as AccountModel, Transaction as TransactionModel, UserInformation
+
+__all__ = ["AccountRecord", "UserRecord", "TransactionRecord"]
+
+# pydantic writes the UTC offset of a plain datetime as "Z", the models write the "+00:00" of
+# the datetimes they validated, `isoformat()` keeps the records' JSON the same as the models'
+IsoDateTime = Annotated[datetime, PlainSerializer(lambda dt: dt.isoformat(), when_used="json")]
+
+@dataclass(slots=True, frozen=True)
+class AccountRecord:
+    id: str
+    user_id: str
+    balance: int
+    created_at: datetime
+    updated_at: datetime
+
+    def to_model(self) -> AccountModel:
+        return AccountModel(id=self.id, user_id=self.user_id, balance=self.balance, created_at=self.created_at, updated_at=self.updated_at)
+
+@dataclass(slots=True, frozen=True)
+class UserRecord:
+    name: str
+    fullname: Optional[str]
+    email_address: str
+    roles: Tuple[str, ...]
+    default_account: Optional[AccountRecord] = None
+    accounts: Tuple[AccountRecord, ...] = ()
+
+    def owns_account(self, account_id: str) -> bool:
+        return any(account.id == account_id for account in self.accounts)
+
+    def to_model(self) -> UserInformation:
+        return UserInformation(
+            name=self.name,
+            fullname=self.fullname,
+            email_address=self.email_address,
+            default_account=self.default_account.to_model() if self.default_account is not None else None,
+            roles=list(self.roles),
+            accounts=[account.to_model() for account in self.accounts],
+        )
+
+# the fields are in the order of `models.Transaction`, so a TypeAdapter over the records writes
+# the same JSON as one over the models
+@dataclass(slots=True, frozen=True, kw_only=True)
+class TransactionRecord:
+    id: str
+    account_id: str
+    transaction_type: str
+    amount: int
+    timestamp: IsoDateTime
+    recipient_id: Optional[str] = None
+    category: str
+
+    def to_model(self) -> TransactionModel:
+        return TransactionModel(
+            id=self.id, account_id=self.account_id, transaction_type=self.transaction_type, amount=self.amount,
+            timestamp=self.timestamp, recipient_id=self.recipient_id, category=self.category,
+        )
@@ -0,0 +1,295 @@
+"""Synthetic data in bulk, for scale testing.
+
+`flask --app main seed --users 10000 --accounts 3 --transactions 10000000` adds users, their
+accounts, credentials, budgets and bills, and a ledger of deposits, withdrawals and transfers
+with their entries and categories. The activity is skewed like real traffic: the accounts, and
+the categories, are drawn from a Zipf distribution, a few of them get most of the transactions.
+
+The rows are written straight to the database, with `COPY` on PostgreSQL and `executemany`
+elsewhere, in batches of `--batch-size` rows, and in a single transaction. The ids follow the
+existing rows, so seeding again adds more data. The same `--seed` generates the same data.
+Every seeded user logs in with its email, `seed<user id>@example.com`, and `--password`.
+"""
+import bcrypt
+import csv
+import io
+import itertools
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import Engine
+from .db import Base, DB
+
+__all__ = ["SeedPlan", "seed", "seed_command"]
+
+CATEGORIES = ["groceries", "rent", "utilities", "transport", "dining", "shopping", "health", "entertainment", "travel", "none"]
+BILLERS = ["electricity", "water", "internet", "phone", "insurance", "rent", "gym", "streaming"]
+# share of each transaction type, the withdrawals and transfers larger than the balance become deposits
+TRANSACTION_TYPES = (("deposit", 0.4), ("withdraw", 0.35), ("transfer", 0.25))
+
+# (table, primary key, columns), in the order they're written
+USERS = ("users", "id", ("id", "username", "fullname", "email", "roles"))
+CREDENTIALS = ("user_credentials", "id", ("id", "user_id", "hash"))
+ACCOUNTS = ("accounts", "id", ("id", "user_id", "account_type", "account_number", "balance"))
+BUDGETS = ("budgets", "id", ("id", "name", "user_id", "amount", "start_date", "end_date"))
+BILLS = ("bills", "id", ("id", "user_id", "biller_name", "due_date", "amount", "account_id"))
+TRANSACTIONS = ("transactions", "id", ("id", "transaction_type", "description", "timestamp"))
+ENTRIES = ("transaction_entries", "entry_id", ("entry_id", "amount", "transaction_id", "account_id", "entry_type"))
+CATEGORIES_TABLE = ("transaction_categories", "id", ("id", "name", "transaction_id"))
+TABLES = [USERS, CREDENTIALS, ACCOUNTS, BUDGETS, BILLS, TRANSACTIONS, ENTRIES, CATEGORIES_TABLE]
+
+Table = Tuple[str, str, Tuple[str, ...]]
+
+@dataclass(frozen=True)
+class SeedPlan:
+    """What to generate.
+
+    Attributes:
+        users (int): users to add
+        accounts_per_user (int): accounts of each user, the first one is its default account
+        transactions (int): ledger transactions, a transfer has two entries, the others one
+        budgets_per_user (int): budgets of each user
+        bills_per_user (int): bills of each user, on one of its accounts
+        zipf_exponent (float): skew of the activity, 0 is uniform, above 1 a few accounts dominate
+        seed (int): seed of the random generator
+        start (datetime): time of the first transaction
+        days (int): the transactions are spread over this many days
+        password (str): password of every seeded user
+        batch_size (int): rows sent to the database at once
+    """
+    users: int = 1000
+    accounts_per_user: int = 2
+    transactions: int = 100_000
+    budgets_per_user: int = 2
+    bills_per_user: int = 3
+    zipf_exponent: float = 1.1
+    seed: int = 0
+    start: datetime = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    days: int = 365
+    password: str = "password"
+    batch_size: int = 10_000
+
+def zipf_cum_weights(n: int, exponent: float) -> List[float]:
+    """Cumulative weights of ranks 1..n with P(rank k) proportional to 1/k^exponent."""
+    return list(itertools.accumulate(1 / k ** exponent for k in range(1, n + 1)))
+
+class _Writer:
+    """Sends batches of rows of a table through a DBAPI connection."""
+    def __init__(self, engine: Engine, connection):
+        self.connection = connection
+        self.dialect = engine.dialect
+        self.copy = engine.dialect.name == "postgresql"
+        self.placeholder = "?" if engine.dialect.paramstyle == "qmark" else "%s"
+        self.rows: Dict[str, int] = {}
+
+    def _processors(self, name: str, columns: Sequence[str]) -> List[Tuple[int, Callable]]:
+        # the conversions SQLAlchemy applies to the parameters, e.g. the datetimes stored as text on SQLite
+        if name not in Base.metadata.tables:
+            return []
+        table = Base.metadata.tables[name]
+        processors = [(i, table.c[column].type.bind_processor(self.dialect)) for i, column in enumerate(columns)]
+        return [(i, processor) for i, processor in processors if processor is not None]
+
+    def write(self, table: Table, rows: Sequence[tuple]):
+        if not rows:
+            return
+        name, _, columns = table
+        cursor = self.connection.cursor()
+        try:
+            if self.copy:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(tuple(_csv_value(value) for value in row) for row in rows)
+                buffer.seek(0)
+                cursor.copy_expert(f"COPY {name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+            else:
+                processors = self._processors(name, columns)
+                if processors:
+                    rows = [list(row) for row in rows]
+                    for row in rows:
+                        for i, processor in processors:
+                            row[i] = processor(row[i])
+                placeholders = ", ".join([self.placeholder] * len(columns))
+                cursor.executemany(f"INSERT INTO {name} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+        finally:
+            cursor.close()
+        self.rows[name] = self.rows.get(name, 0) + len(rows)
+
+    def execute(self, statement: str, parameters: Sequence = ()):
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(statement.replace("?", self.placeholder), parameters)
+            return cursor.fetchall() if cursor.description else None
+        finally:
+            cursor.close()
+
+def _csv_value(value):
+    # NULL is an unquoted empty field, bytea is written in its hex format
+    if isinstance(value, bytes):
+        return "\\x" + value.hex()
+    return value
+
+class _Batches:
+    """Buffers the rows of each table, the tables are flushed in the order of their foreign keys."""
+    def __init__(self, writer: _Writer, batch_size: int):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.buffers: Dict[Table, List[tuple]] = {table: [] for table in TABLES}
+
+    def add(self, table: Table, row: tuple):
+        buffer = self.buffers[table]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for table in TABLES:
+            self.writer.write(table, self.buffers[table])
+            self.buffers[table] = []
+
+def seed(plan: SeedPlan, engine: Optional[Engine] = None, progress: Callable[[str], None] = lambda message: None) -> Dict[str, int]:
+    """Writes the data of `plan`, returns the rows added to each table."""
+    engine = engine or DB.get_engine()
+    rng = random.Random(plan.seed)
+    connection = engine.raw_connection()
+    try:
+        writer = _Writer(engine, connection)
+        if writer.copy:
+            # the connections' statement_timeout is the budget of a request, not of a bulk load
+            writer.execute("SET LOCAL statement_timeout = 0")
+        first = {name: writer.execute(f"SELECT COALESCE(MAX({pk}), 0) FROM {name}")[0][0] + 1 for name, pk, _ in TABLES}
+        batches = _Batches(writer, plan.batch_size)
+
+        account_ids = _seed_users(plan, rng, first, batches)
+        progress(f"{plan.users} users, {len(account_ids)} accounts")
+        balances = _seed_ledger(plan, rng, first, account_ids, batches, progress)
+        batches.flush()
+        _finish(writer, first, account_ids, balances)
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+    return writer.rows
+
+def _seed_users(plan: SeedPlan, rng: random.Random, first: Dict[str, int], batches: _Batches) -> List[int]:
+    # a single hash, bcrypt would take hours for millions of users
+    password_hash = bcrypt.hashpw(plan.password.encode(), bcrypt.gensalt())
+    account_ids = []
+    for n in range(plan.users):
+        user_id = first["users"] + n
+        batches.add(USERS, (user_id, f"seed{user_id}", f"Seed User {user_id}", f"seed{user_id}@example.com", "customer"))
+        batches.add(CREDENTIALS, (first["user_credentials"] + n, user_id, password_hash))
+
+        accounts = [first["accounts"] + n * plan.accounts_per_user + i for i in range(plan.accounts_per_user)]
+        for account_id in accounts:
+            batches.add(ACCOUNTS, (account_id, user_id, "saving", str(uuid.UUID(int=rng.getrandbits(128), version=4)), 0))
+        account_ids.extend(accounts)
+
+        for i in range(plan.budgets_per_user):
+            start = plan.start + timedelta(days=30 * rng.randrange(12))
+            budget = (first["budgets"] + n * plan.budgets_per_user + i, rng.choice(CATEGORIES), user_id,
+                      rng.randrange(100, 5000) * 100, start, start + timedelta(days=30))
+            batches.add(BUDGETS, budget)
+
+        for i in range(plan.bills_per_user):
+            bill = (first["bills"] + n * plan.bills_per_user + i, user_id, rng.choice(BILLERS),
+                    plan.start + timedelta(days=rng.randrange(plan.days)), rng.randrange(10, 500) * 100, rng.choice(accounts))
+            batches.add(BILLS, bill)
+    return account_ids
+
+def _seed_ledger(plan: SeedPlan, rng: random.Random, first: Dict[str, int], account_ids: List[int], batches: _Batches, progress) -> List[int]:
+    balances = [0] * len(account_ids)
+    if not account_ids:
+        return balances
+    # the busiest accounts are spread over all the users instead of being the first ones
+    ranked = list(range(len(account_ids)))
+    rng.shuffle(ranked)
+    account_weights = zipf_cum_weights(len(ranked), plan.zipf_exponent)
+    category_weights = zipf_cum_weights(len(CATEGORIES), plan.zipf_exponent)
+    types, type_weights = zip(*TRANSACTION_TYPES)
+    step = timedelta(days=plan.days) / max(plan.transactions, 1)
+    entry_id = first["transaction_entries"]
+    started = time.perf_counter()
+
+    for n in range(plan.transactions):
+        transaction_id = first["transactions"] + n
+        account, recipient = (ranked[i] for i in rng.choices(range(len(ranked)), cum_weights=account_weights, k=2))
+        transaction_type = rng.choices(types, type_weights)[0]
+        amount = max(1, int(rng.lognormvariate(8, 1.2)))
+        if transaction_type != "deposit" and balances[account] < amount:
+            transaction_type = "deposit"
+        if transaction_type == "transfer" and recipient == account:
+            transaction_type = "withdraw"
+
+        batches.add(TRANSACTIONS, (transaction_id, transaction_type, None, plan.start + step * n))
+        if transaction_type == "deposit":
+            balances[account] += amount
+            batches.add(ENTRIES, (entry_id, amount, transaction_id, account_ids[account], "credit"))
+        else:
+            balances[account] -= amount
+            batches.add(ENTRIES, (entry_id, amount, transaction_id, account_ids[account], "debit"))
+        entry_id += 1
+        if transaction_type == "transfer":
+            balances[recipient] += amount
+            batches.add(ENTRIES, (entry_id, amount, transaction_id, account_ids[recipient], "credit"))
+            entry_id += 1
+        category = rng.choices(CATEGORIES, cum_weights=category_weights)[0]
+        batches.add(CATEGORIES_TABLE, (first["transaction_categories"] + n, category, transaction_id))
+
+        if (n + 1) % 1_000_000 == 0:
+            progress(f"{n + 1} transactions, {(n + 1) / (time.perf_counter() - started):.0f}/s")
+    return balances
+
+def _finish(writer: _Writer, first: Dict[str, int], account_ids: List[int], balances: List[int]):
+    # the accounts were written before the ledger, with a zero balance
+    if writer.copy:
+        writer.execute("CREATE TEMPORARY TABLE seed_balances (id integer PRIMARY KEY, balance bigint) ON COMMIT DROP")
+        writer.write(("seed_balances", "id", ("id", "balance")), [row for row in zip(account_ids, balances) if row[1]])
+        writer.rows.pop("seed_balances", None)
+        writer.execute("UPDATE accounts SET balance = seed_balances.balance FROM seed_balances WHERE accounts.id = seed_balances.id")
+    else:
+        cursor = writer.connection.cursor()
+        try:
+            cursor.executemany(
+                f"UPDATE accounts SET balance = {writer.placeholder} WHERE id = {writer.placeholder}",
+                [(balance, account_id) for account_id, balance in zip(account_ids, balances) if balance],
+            )
+        finally:
+            cursor.close()
+    # the first account of each user is its default one, users and accounts reference each other
+    writer.execute(
+        "UPDATE users SET default_account_id = (SELECT MIN(accounts.id) FROM accounts WHERE accounts.user_id = users.id) WHERE users.id >= ?",
+        (first["users"],),
+    )
+    if writer.copy:
+        # the ids were set explicitly, the sequences must continue after them
+        for name, pk, _ in TABLES:
+            writer.execute(f"SELECT setval(pg_get_serial_sequence('{name}', '{pk}'), (SELECT MAX({pk}) FROM {name}))")
+
+@click.command("seed")
+@click.option("--users", default=SeedPlan.users, show_default=True, help="Users to add.")
+@click.option("--accounts", "accounts_per_user", default=SeedPlan.accounts_per_user, type=click.IntRange(min=1), show_default=True, help="Accounts of each user.")
+@click.option("--transactions", default=SeedPlan.transactions, show_default=True, help="Ledger transactions to add.")
+@click.option("--budgets", "budgets_per_user", default=SeedPlan.budgets_per_user, show_default=True, help="Budgets of each user.")
+@click.option("--bills", "bills_per_user", default=SeedPlan.bills_per_user, show_default=True, help="Bills of each user.")
+@click.option("--zipf", "zipf_exponent", default=SeedPlan.zipf_exponent, show_default=True, help="Skew of the activity, 0 is uniform.")
+@click.option("--seed", default=SeedPlan.seed, show_default=True, help="Seed of the random generator.")
+@click.option("--days", default=SeedPlan.days, show_default=True, help="Days the transactions are spread over.")
+@click.option("--password", default=SeedPlan.password, show_default=True, help="Password of the seeded users.")
+@click.option("--batch-size", default=SeedPlan.batch_size, show_default=True, help="Rows sent to the database at once.")
+@with_appcontext
+def seed_command(**options):
+    """Bulk-seed synthetic users, accounts, ledger, budgets and bills."""
+    plan = SeedPlan(**options)
+    started = time.perf_counter()
+    rows = seed(plan, progress=click.echo)
+    elapsed = time.perf_counter() - started
+    for table, count in rows.items():
+        click.echo(f"{table}: {count} rows")
+    click.echo(f"{sum(rows.values())} rows in {elapsed:.1f}s")
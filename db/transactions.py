@@ -1,11 +1,16 @@
-from typing import Optional, List
-from db import db_session, Accounts, Transactions, TransactionEntries, TransactionCategories
+from typing import Optional, List, Iterator
+from db import db_session, bump_data_versions, Accounts, Transactions, TransactionEntries, TransactionCategories
 from models import Transaction as TransactionModel, TransactionTypes, DepositRequest, WithdrawRequest, TransferRequest
 from .accounts import AccountNotFoundException
-from sqlalchemy import select
+from .projections import TRANSACTION_ENTRY_COLUMNS, transactions_from_rows
+from .records import TransactionRecord
+from .json_listings import json_object, json_string, json_number, json_datetime, stream_json_rows
+from sqlalchemy import Select, select, case, func, or_
 from sqlalchemy.orm import joinedload 
 from pydantic import BaseModel
 from datetime import datetime
+from monitoring import traced
+from cache import cached, single_flight
 
 class TransactionNotFoundException(Exception):
     def __init__(self, *, transaction_id:str):
@@ -13,12 +18,15 @@ class TransactionNotFoundException(Exception):
         self.transaction_id = transaction_id
 
 
+@traced
 def withdraw(request=WithdrawRequest) -> Optional[TransactionModel]:
     account = db_session.get(Accounts, request.account_id)
     if account is None:
         raise AccountNotFoundException(account_id=request.account_id)
     
-    account.balance = account.balance - request.amount
+    # computed by the UPDATE itself: a balance read here and written back would overwrite the
+    # postings committed in between, concurrent postings to an account queue on its row lock instead
+    account.balance = Accounts.balance - request.amount
     transaction = Transactions(
         transaction_type="withdraw",
         description=request.description,
@@ -51,12 +59,13 @@ def withdraw(request=WithdrawRequest) -> Optional[TransactionModel]:
         category=category.name,
     )
 
+@traced
 def deposit(request: DepositRequest) -> Optional[TransactionModel]:    
     account = db_session.get(Accounts, request.account_id)
     if account is None:
         raise AccountNotFoundException(account_id=request.account_id)
     
-    account.balance = account.balance + request.amount
+    account.balance = Accounts.balance + request.amount
     transaction = Transactions(
         transaction_type="deposit",
         description=request.description,
@@ -88,6 +97,7 @@ def deposit(request: DepositRequest) -> Optional[TransactionModel]:
         category=category.name,
     )
 
+@traced
 def transfer(request: TransferRequest) -> Optional[TransactionModel]:
     sender_account = db_session.get(Accounts, request.account_id)
     if sender_account is None:
@@ -97,8 +107,13 @@ def transfer(request: TransferRequest) -> Optional[TransactionModel]:
     if recipient_account is None:
         raise AccountNotFoundException(account_id=request.recipient_account_id)
 
-    sender_account.balance = sender_account.balance - request.amount
-    recipient_account.balance = recipient_account.balance + request.amount
+    if sender_account is not recipient_account:
+        sender_account.balance = Accounts.balance - request.amount
+        recipient_account.balance = Accounts.balance + request.amount
+    else:
+        # a transfer to the same account leaves its balance as is, the flush doesn't see the
+        # account changed but the owner's ledger did
+        bump_data_versions([sender_account.user_id])
 
     transaction = Transactions(
         transaction_type="transfer", 
@@ -144,63 +159,103 @@ class TransactionQuery(BaseModel):
     range_to: Optional[datetime] = None
     transaction_type: Optional[List[TransactionTypes]] = None
     
-def get_transactions(query: TransactionQuery, current_user: str) -> List[TransactionModel]:
-    statement= (
-        select(
-            Transactions
+@traced
+@cached("current_user")
+@single_flight("current_user")
+def get_transactions(query: TransactionQuery, current_user: str) -> List[TransactionRecord]:
+    statement = _transaction_entries(query, current_user).order_by(Transactions.id, TransactionEntries.entry_id)
+    return transactions_from_rows(db_session.execute(statement))
+
+@traced
+def get_transactions_json(query: TransactionQuery, current_user: str) -> Iterator[str]:
+    """The transactions of `get_transactions` as JSON documents built by PostgreSQL, see `db.json_listings`."""
+    by_transaction = dict(partition_by=Transactions.id, order_by=TransactionEntries.entry_id)
+    entries = (
+        _transaction_entries(query, current_user)
+        .add_columns(
+            func.row_number().over(**by_transaction).label("position"),
+            func.lead(TransactionEntries.account_id).over(**by_transaction).label("next_account_id"),
+            func.lead(TransactionEntries.amount).over(**by_transaction).label("next_amount"),
         )
-        .select_from(TransactionEntries)
+        .subquery("entries")
+    )
+
+    # one row per transaction: its first entry, and the second one for transfers. The same
+    # rules as `_parse_transaction_record`, the sender is the first entry unless it's a credit.
+    is_transfer = entries.c.transaction_type == "transfer"
+    swapped = is_transfer & (entries.c.entry_type == "credit")
+    transaction = json_object(
+        ("account_id", json_string(case((swapped, entries.c.next_account_id), else_=entries.c.account_id))),
+        ("amount", json_number(case((swapped, entries.c.next_amount), else_=entries.c.amount))),
+        ("category", json_string(entries.c.name)),
+        ("id", json_string(entries.c.id)),
+        ("recipient_id", json_string(case((swapped, entries.c.account_id), (is_transfer, entries.c.next_account_id)))),
+        ("timestamp", json_datetime(entries.c.timestamp)),
+        ("transaction_type", json_string(entries.c.transaction_type)),
+    )
+
+    statement = (
+        select(transaction)
+        .where(entries.c.position == 1)
+        .where(or_(~is_transfer, entries.c.next_account_id.is_not(None)))
+        .order_by(entries.c.id)
+    )
+    return stream_json_rows(statement)
+
+def _transaction_entries(query: TransactionQuery, current_user: str) -> Select:
+    # the transactions touching the user's accounts, the other side of a transfer included
+    matching = (
+        select(TransactionEntries.transaction_id)
         .join(Accounts)
-        .join(Transactions)
-        .where(Accounts.user_id.is_(current_user))
-        .options(joinedload(Transactions.entries))
-        .options(joinedload(Transactions.category))
+        .where(Accounts.user_id == current_user)
     )
-    
     if query.account_id is not None:
-        statement = statement.filter(Accounts.id.is_(query.account_id))
+        matching = matching.where(Accounts.id == query.account_id)
+
+    statement = (
+        select(*TRANSACTION_ENTRY_COLUMNS)
+        .select_from(TransactionEntries)
+        .join(Transactions)
+        # like the `joinedload` of the ORM listing, a transaction without a category is kept
+        .outerjoin(TransactionCategories, TransactionCategories.transaction_id == Transactions.id)
+        .where(Transactions.id.in_(matching))
+    )
     if query.range_from is not None:
         statement = statement.filter(Transactions.timestamp >= query.range_from)
     if query.range_to is not None:
         statement = statement.filter(Transactions.timestamp <= query.range_to)
     if query.transaction_type is not None:
         statement = statement.filter(Transactions.transaction_type.in_(query.transaction_type))
-        
-    result = db_session.scalars(statement=statement).unique().all()
-    transactions: List[TransactionModel] = []
-    for transaction in result:
-        parsed = _parse_transaction_model(transaction)
-        if parsed is not None:
-            transactions.append(parsed)
-
-    return transactions
+
+    return statement
     
-def get_transaction(transaction_id:str) -> Optional[TransactionModel]:
+@traced
+def get_transaction(transaction_id:str) -> Optional[TransactionRecord]:
     transaction = db_session.get(Transactions, transaction_id, options=[joinedload(Transactions.entries), joinedload(Transactions.category)])
 
     if transaction is None:
         raise TransactionNotFoundException(transaction_id=transaction_id)
 
-    result = _parse_transaction_model(transaction)
+    result = _parse_transaction_record(transaction)
     if result is None:
         raise TransactionNotFoundException(transaction_id=transaction_id)
     
     return result
         
     
-def _parse_transaction_model(transaction: Transactions)-> Optional[TransactionModel]:
+def _parse_transaction_record(transaction: Transactions)-> Optional[TransactionRecord]:
     if len(transaction.entries) == 0:
         # TODO: log out that there's an invalid transaction entry
         return None
 
     if transaction.transaction_type != "transfer":
         entry = transaction.entries[0]
-        return TransactionModel(
+        return TransactionRecord(
             id=str(transaction.id),
             account_id=str(entry.account_id),
             transaction_type=transaction.transaction_type,
             amount=entry.amount,
-            timestamp=transaction.timestamp.isoformat(),
+            timestamp=transaction.timestamp,
             category=transaction.category.name                   
         )
     
@@ -212,20 +267,22 @@ def _parse_transaction_model(transaction: Transactions)-> Optional[TransactionMo
     if sender.entry_type == "credit":
         sender, recipient = transaction.entries[1], transaction.entries[0]
     
-    return TransactionModel(
+    return TransactionRecord(
         id=str(transaction.id),
         account_id=str(sender.account_id),
         transaction_type=transaction.transaction_type,
         amount=sender.amount,
-        timestamp=transaction.timestamp.isoformat(), 
+        timestamp=transaction.timestamp, 
         recipient_id=str(recipient.account_id),
         category=transaction.category.name
     )
 
+@traced
+@single_flight("user_id")
 def get_categories(user_id: str) -> List[str]:
     statement=(select(TransactionCategories)
         .select_from(Accounts)
-        .where(Accounts.user_id.is_(user_id))
+        .where(Accounts.user_id == user_id)
         .join(TransactionEntries)
         .join(Transactions)
         .join(TransactionCategories)
@@ -2,9 +2,12 @@ import bcrypt
 from sqlalchemy import select
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.orm import joinedload
-from models import UserInformation, CreateUserRequest, Account as AccountModel
+from models import UserInformation, CreateUserRequest
 from db import db_session, Users, Accounts, Credentials
+from .records import AccountRecord, UserRecord
 from typing import Optional
+from monitoring import track_bcrypt, traced
+from cache import cached, single_flight
 
 class UserNotFoundException(Exception):
     id: str
@@ -12,6 +15,7 @@ class UserNotFoundException(Exception):
         super().__init__("user not found")
         self.id = id
 
+@traced
 def create_user(request: CreateUserRequest) -> str:
     user = Users(
         username=request.name,
@@ -27,9 +31,12 @@ def create_user(request: CreateUserRequest) -> str:
         balance=0,
     )
 
+    with track_bcrypt("hash"):
+        hash = bcrypt.hashpw(request.password.encode(), bcrypt.gensalt())
+
     credential = Credentials(
         user_id=user.id,
-        hash=bcrypt.hashpw(request.password.encode(), bcrypt.gensalt())
+        hash=hash
     )
 
     db_session.add_all([account, credential])
@@ -40,36 +47,46 @@ def create_user(request: CreateUserRequest) -> str:
     db_session.commit()
     return user.id
 
+@traced
+@cached("id")
 def get_user(id:str) -> Optional[UserInformation]:
+    return get_user_record(id).to_model()
+
+@traced
+@single_flight("id")
+def get_user_record(id:str) -> UserRecord:
+    """Same as `get_user`, for internal code that only reads the user, see `db.records`.
+
+    It isn't cached, the authorization relies on it and a copy could still hold the roles and
+    accounts changed by another worker.
+    """
     try:
-        statement = select(Users).where(Users.id.is_(id)).options(joinedload(Users.accounts)).options(joinedload(Users.default_account))
+        statement = select(Users).where(Users.id == id).options(joinedload(Users.accounts)).options(joinedload(Users.default_account))
         user = db_session.scalars(statement=statement).unique().one()
-        return UserInformation(
+        return UserRecord(
             name=user.username,
             fullname=user.fullname,
             email_address=user.email,
-            default_account=AccountModel(
-                id=str(user.default_account.id),
-                user_id=str(user.id),
-                balance=user.default_account.balance,
-                created_at=user.default_account.created_at.isoformat(),
-                updated_at=user.default_account.updated_at.isoformat(),
-            ),
-            roles=user.roles.split(","),
-            accounts=[AccountModel(
-                id=str(account.id),
-                user_id=str(user.id),
-                balance=account.balance,
-                created_at=account.created_at.isoformat(),
-                updated_at=account.updated_at.isoformat(),
-            ) for account in user.accounts],
+            default_account=_account_record(user.default_account) if user.default_account is not None else None,
+            roles=tuple(user.roles.split(",")),
+            accounts=tuple(_account_record(account) for account in user.accounts),
         )
     except NoResultFound:
         raise UserNotFoundException(id)
+
+def _account_record(account: Accounts) -> AccountRecord:
+    return AccountRecord(
+        id=str(account.id),
+        user_id=str(account.user_id),
+        balance=account.balance,
+        created_at=account.created_at,
+        updated_at=account.updated_at,
+    )
     
+@traced
 def update_user(id: str, user: UserInformation) -> Optional[UserInformation]:
     try:
-        statement = select(Users).where(Users.id.is_(id))
+        statement = select(Users).where(Users.id == id)
         existing = db_session.scalars(statement=statement).one()
         existing.update(user)
         db_session.commit()
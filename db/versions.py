@@ -0,0 +1,78 @@
+"""Per-user data versions, bumped on write.
+
+Every flush that adds, changes or deletes a user's accounts, budgets or bills, or the user
+itself, bumps the user's `DataVersions` row in the same transaction. Ledger writes are covered
+too, they change the balance of the accounts involved, so a transfer bumps both the sender's and
+the recipient's versions. A version is only bumped once per transaction.
+
+Code that keeps copies of the users' data, like the read cache, registers with `on_data_change`
+to hear about the users whose data changed once the transaction is committed. The writes the
+flush doesn't see, like the Core `DELETE` of `db.accounts.delete_account` or a transfer to the
+same account, which leaves its balance as is, call `bump_data_versions` instead.
+"""
+from itertools import chain
+from typing import Callable, Iterable, List, Set
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from .db import db_session, DataVersions, Users, Accounts, Budgets, Bills
+
+__all__ = ["get_data_version", "on_data_change", "bump_data_versions"]
+
+_table = DataVersions.__table__
+_listeners: List[Callable[[Set[int]], None]] = []
+
+def get_data_version(user_id: str) -> int:
+    return db_session.scalar(select(DataVersions.version).where(DataVersions.user_id == user_id)) or 0
+
+def on_data_change(callback: Callable[[Set[int]], None]) -> Callable[[Set[int]], None]:
+    """Calls `callback(user_ids)` after every commit that changed the data of these users."""
+    _listeners.append(callback)
+    return callback
+
+def _changed_users(session: Session) -> Set[int]:
+    user_ids = set()
+    for instance in chain(session.new, session.dirty, session.deleted):
+        if isinstance(instance, (Accounts, Budgets, Bills)):
+            user_ids.add(instance.user_id)
+        elif isinstance(instance, Users) and instance not in session.new:
+            # a new user has nothing to invalidate yet
+            user_ids.add(instance.id)
+    user_ids.discard(None)
+    return user_ids
+
+def _bump(session: Session, user_ids: Iterable[int]):
+    connection = session.connection()
+    insert = sqlite.insert if connection.dialect.name == "sqlite" else postgresql.insert
+    statement = insert(_table).on_conflict_do_update(
+        index_elements=[_table.c.user_id],
+        set_={"version": _table.c.version + 1},
+    )
+    # a fixed order, so that concurrent transactions bumping the same users can't deadlock
+    connection.execute(statement, [{"user_id": user_id, "version": 1} for user_id in sorted(user_ids)])
+
+def _bump_once(session: Session, user_ids: Set[int]):
+    bumped = session.info.setdefault("bumped_versions", set())
+    user_ids = user_ids - bumped
+    if user_ids:
+        _bump(session, user_ids)
+        bumped |= user_ids
+
+def bump_data_versions(user_ids: Iterable[int]):
+    """Bumps the versions of `user_ids` in the current transaction, for the writes the flush doesn't see."""
+    _bump_once(db_session(), {int(user_id) for user_id in user_ids})
+
+@event.listens_for(db_session, "after_flush")
+def _bump_changed_users(session: Session, flush_context):
+    _bump_once(session, _changed_users(session))
+
+@event.listens_for(db_session, "after_commit")
+def _notify_changed_users(session: Session):
+    user_ids = session.info.pop("bumped_versions", None)
+    if user_ids:
+        for listener in _listeners:
+            listener(user_ids)
+
+@event.listens_for(db_session, "after_rollback")
+def _reset_bumped(session: Session):
+    session.info.pop("bumped_versions", None)
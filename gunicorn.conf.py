@@ -0,0 +1,23 @@
+import os
+import shutil
+from prometheus_client import multiprocess
+
+# Threaded workers run several requests at once, the admission control (shared/admission.py)
+# counts them and sheds the load over ADMISSION_MAX_IN_FLIGHT, so a worker has that many threads
+# by default. The threads over the pool's connections wait for one, which the admission control
+# also watches.
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS") or os.getenv("ADMISSION_MAX_IN_FLIGHT") or "32") or 32
+
+# Every worker writes its metrics to PROMETHEUS_MULTIPROC_DIR and /metrics aggregates the files.
+# The directory must be emptied on start, and a dead worker's live gauges must be dropped.
+
+def on_starting(server):
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
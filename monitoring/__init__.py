@@ -0,0 +1,7 @@
+from .queries import *
+from .slow_queries import *
+from .metrics import *
+from .tracing import *
+from .profiling import *
+from .logs import *
+from .timing import *
@@ -0,0 +1,138 @@
+"""Structured, non-blocking logging.
+
+The records are written as JSON lines, one object per record with the time, level, logger,
+message, the id of the request that logged it, and the fields passed in `extra`. The id comes
+from the `X-Request-ID` request header, or is generated, and is returned in the response's.
+The handlers of the app don't write themselves: the records are put on a bounded queue, in the
+request thread, and a background thread writes them to stderr. When the queue is full the record is
+dropped and counted in `log_records_dropped_total`, logging never blocks a request.
+
+`LOG_LEVEL` sets the level of every logger and `LOG_LEVELS` the level of some modules, e.g.
+`sqlalchemy.engine=WARNING,cache=DEBUG`. `LOG_SAMPLE_RATES` keeps only a fraction of the
+records under WARNING of the high-volume loggers, e.g. `auth_jwt=0.01`.
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+from flask import Flask, Response, g, request
+from config import log_level, log_levels, log_sample_rates, log_queue_size, log_format
+from .metrics import LOG_RECORDS_DROPPED
+
+__all__ = ["JsonFormatter", "current_request_id", "init_logging"]
+
+# the ids sent by the clients are cut to this length
+MAX_REQUEST_ID_LENGTH = 128
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_listener: Optional[QueueListener] = None
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+class JsonFormatter(logging.Formatter):
+    # the attributes of every record, the others were passed in `extra`
+    RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in self.RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+class _SamplingFilter(logging.Filter):
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        # the rate of the closest configured parent logger
+        name = record.name
+        while name:
+            if name in self.rates:
+                return random.random() < self.rates[name]
+            name = name.rpartition(".")[0]
+        return True
+
+class _NonBlockingQueueHandler(QueueHandler):
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the message is built in the logging thread, its arguments may change once it returns,
+        # the exception is kept apart so that it stays a field of its own
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def init_logging(app: Flask):
+    global _listener
+    if _listener is None:
+        output = logging.StreamHandler(sys.stderr)
+        output.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+        handler = _NonBlockingQueueHandler(queue.Queue(maxsize=log_queue_size))
+        handler.addFilter(_RequestIdFilter())
+        handler.addFilter(_SamplingFilter(log_sample_rates))
+
+        root = logging.getLogger()
+        root.addHandler(handler)
+        root.setLevel(log_level)
+        for name, level in log_levels.items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    @app.before_request
+    def start_request_id():
+        g._request_id_token = _request_id.set(
+            request.headers.get("X-Request-ID", "")[:MAX_REQUEST_ID_LENGTH] or uuid.uuid4().hex)
+
+    @app.after_request
+    def add_request_id(response: Response) -> Response:
+        request_id = _request_id.get()
+        if request_id is not None:
+            response.headers["X-Request-ID"] = request_id
+        return response
+
+    @app.teardown_request
+    def end_request_id(exception=None):
+        token = g.pop("_request_id_token", None)
+        if token is not None:
+            _request_id.reset(token)
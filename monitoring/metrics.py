@@ -0,0 +1,122 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Generator
+from flask import Flask, Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import Engine
+from config import prometheus_multiproc_dir
+
+__all__ = [
+    "REQUEST_LATENCY", "REQUEST_COUNT", "REQUESTS_IN_FLIGHT", "DB_POOL_CONNECTIONS",
+    "BCRYPT_IN_PROGRESS", "BCRYPT_DURATION", "CACHE_REQUESTS", "DB_POOL_WAIT", "REQUESTS_SHED", "DB_CIRCUIT_STATE",
+    "LOG_RECORDS_DROPPED", "track_bcrypt", "record_cache_lookup", "record_pool_wait", "recent_pool_wait", "init_metrics",
+]
+
+# Gauges use the "livesum" mode so that, with several gunicorn workers, the scrape reports the
+# sum over the workers that are still alive. See gunicorn.conf.py for the multiprocess setup.
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency", ["blueprint", "endpoint", "method"]
+)
+REQUEST_COUNT = Counter(
+    "http_requests_total", "Handled requests", ["blueprint", "endpoint", "method", "status"]
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being handled", multiprocess_mode="livesum"
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Connections in the database pool", ["state"], multiprocess_mode="livesum"
+)
+BCRYPT_IN_PROGRESS = Gauge(
+    "bcrypt_operations_in_progress", "bcrypt hashes and checks running or waiting for a CPU",
+    multiprocess_mode="livesum",
+)
+BCRYPT_DURATION = Histogram("bcrypt_duration_seconds", "Time spent in bcrypt", ["operation"])
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups", ["cache", "result"])
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled database connection",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+DB_CIRCUIT_STATE = Gauge(
+    "db_circuit_breaker_state", "State of the database circuit breaker, 0 closed, 1 half-open, 2 open",
+    multiprocess_mode="max",
+)
+REQUESTS_SHED = Counter("http_requests_shed_total", "Requests rejected by the admission control", ["priority"])
+LOG_RECORDS_DROPPED = Counter("log_records_dropped_total", "Log records dropped because the logging queue was full")
+
+# the average pool wait of the worker, weighted towards the recent waits, and decaying by half
+# every POOL_WAIT_HALF_LIFE seconds without new waits, so that it recovers once the load is shed
+POOL_WAIT_HALF_LIFE = 1.0
+POOL_WAIT_WEIGHT = 0.2
+_pool_wait = 0.0
+_pool_wait_at = time.monotonic()
+_pool_wait_lock = threading.Lock()
+
+@contextmanager
+def track_bcrypt(operation: str) -> Generator[None, None, None]:
+    with BCRYPT_IN_PROGRESS.track_inprogress(), BCRYPT_DURATION.labels(operation).time():
+        yield
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+def record_pool_wait(seconds: float):
+    global _pool_wait, _pool_wait_at
+    DB_POOL_WAIT.observe(seconds)
+    with _pool_wait_lock:
+        average = recent_pool_wait()
+        _pool_wait = average + (seconds - average) * POOL_WAIT_WEIGHT
+        _pool_wait_at = time.monotonic()
+
+def recent_pool_wait() -> float:
+    return _pool_wait * 0.5 ** ((time.monotonic() - _pool_wait_at) / POOL_WAIT_HALF_LIFE)
+
+def update_pool_metrics(engine: Engine):
+    pool = engine.pool
+    # only QueuePool (the default outside of SQLite) keeps these counters
+    if not hasattr(pool, "checkedout"):
+        return
+    DB_POOL_CONNECTIONS.labels("checked_out").set(pool.checkedout())
+    DB_POOL_CONNECTIONS.labels("checked_in").set(pool.checkedin())
+    DB_POOL_CONNECTIONS.labels("overflow").set(max(pool.overflow(), 0))
+    DB_POOL_CONNECTIONS.labels("size").set(pool.size())
+
+def registry() -> CollectorRegistry:
+    if prometheus_multiproc_dir:
+        collector_registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collector_registry, path=prometheus_multiproc_dir)
+        return collector_registry
+    return REGISTRY
+
+def init_metrics(app: Flask, engine: Engine):
+    """Records request metrics and exposes them in the Prometheus format on `/metrics`."""
+
+    @app.before_request
+    def start_request_metrics():
+        g._metrics_start = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+
+    @app.after_request
+    def record_request_metrics(response: Response) -> Response:
+        start = g.get("_metrics_start")
+        if start is None:
+            return response
+
+        # unmatched URLs share a single label to keep the cardinality bounded
+        labels = (request.blueprint or "", request.endpoint or "unmatched", request.method)
+        REQUEST_LATENCY.labels(*labels).observe(time.perf_counter() - start)
+        REQUEST_COUNT.labels(*labels, str(response.status_code)).inc()
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exception=None):
+        if g.pop("_metrics_start", None) is not None:
+            REQUESTS_IN_FLIGHT.dec()
+            update_pool_metrics(engine)
+
+    @app.route("/metrics")
+    def metrics():
+        update_pool_metrics(engine)
+        return Response(generate_latest(registry()), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,118 @@
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from flask import Flask, Response, g, request
+from config import profile_sample_rate, profile_interval_ms, profile_dir, profile_max_files
+from .logs import current_request_id
+
+__all__ = ["SamplingProfiler", "init_profiler"]
+
+class SamplingProfiler:
+    """Statistical profiler for a single thread.
+
+    A background thread records the stack of the profiled thread every `interval` seconds,
+    so the overhead doesn't depend on how many functions the request calls. The result is
+    written in the folded format used by flamegraph.pl and speedscope: one `a;b;c count`
+    line per distinct stack, outermost frame first.
+    """
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stopped.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self):
+        while not self._stopped.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[self._collapse(frame)] += 1
+            self._stopped.wait(self.interval)
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        stack = []
+        while frame is not None:
+            stack.append(f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+def _profiling_requested() -> bool:
+    if request.headers.get("X-Profile") == "1":
+        # imported here because rbac depends on this package
+        from rbac.route import load_current_user
+        user = load_current_user()
+        if user is not None and "admin" in user.roles:
+            return True
+    return profile_sample_rate > 0 and random.random() < profile_sample_rate
+
+def init_profiler(app: Flask):
+    """Profiles requests sent by an admin with `X-Profile: 1`, and a `PROFILE_SAMPLE_RATE` fraction of all requests.
+
+    The stacks are stored in `PROFILE_DIR/<profile id>.folded` and the id is returned in the
+    `X-Profile-Id` response header. The id starts with the time of the request and a random
+    part, so that a client repeating its `X-Request-ID` can't overwrite earlier profiles, and
+    only the `PROFILE_MAX_FILES` latest profiles are kept.
+    """
+
+    @app.before_request
+    def start_profiler():
+        if not _profiling_requested():
+            return
+        profiler = SamplingProfiler(threading.get_ident(), profile_interval_ms / 1000)
+        g._profiler = (_profile_id(current_request_id() or ""), profiler)
+        profiler.start()
+
+    @app.after_request
+    def add_profile_id(response: Response) -> Response:
+        profile = g.get("_profiler")
+        if profile is not None:
+            response.headers["X-Profile-Id"] = profile[0]
+        return response
+
+    @app.teardown_request
+    def stop_profiler(exception=None):
+        profile = g.pop("_profiler", None)
+        if profile is None:
+            return
+        profile_id, profiler = profile
+        profiler.stop()
+        os.makedirs(profile_dir, exist_ok=True)
+        profiler.dump(os.path.join(profile_dir, f"{profile_id}.folded"))
+        _prune(profile_dir, profile_max_files)
+
+def _profile_id(request_id: str) -> str:
+    # the request id may come from a request header, keep it from escaping the profile directory
+    safe = "".join(c for c in request_id if c.isalnum() or c in "-_")[:64]
+    profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    return f"{profile_id}-{safe}" if safe else profile_id
+
+def _prune(directory: str, max_files: int):
+    """Removes the oldest profiles of `directory` over `max_files`."""
+    profiles = [entry for entry in os.scandir(directory) if entry.name.endswith(".folded")]
+    if len(profiles) <= max_files:
+        return
+    profiles.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in profiles[:len(profiles) - max_files]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            # removed by another worker
+            pass
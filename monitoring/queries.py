@@ -0,0 +1,100 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Generator, List, Tuple
+from flask import Flask, Response, g
+from sqlalchemy import Engine, event
+from config import query_repeat_threshold
+
+__all__ = ["QueryStats", "track_queries", "install_query_counter", "init_query_counter"]
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class QueryStats:
+    """Statements executed while the stats object is being tracked.
+
+    Attributes:
+        statements (List[str]): SQL text of every statement, in execution order
+        duration (float): total time spent waiting for the database, in seconds
+    """
+    statements: List[str] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Returns the statements executed at least `threshold` times, the usual N+1 symptom."""
+        return [(statement, n) for statement, n in Counter(self.statements).items() if n >= threshold]
+
+_active: ContextVar[Tuple[QueryStats, ...]] = ContextVar("active_query_stats", default=())
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    for stats in _active.get():
+        stats.statements.append(statement)
+        stats.duration += elapsed
+
+def _handle_error(context):
+    # a failed statement never reaches `after_cursor_execute`, its start time would be paired
+    # with the next statement of the pooled connection
+    if context.connection is not None:
+        starts = context.connection.info.get("query_start_time")
+        if starts:
+            starts.pop()
+
+def install_query_counter(engine: Engine):
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+@contextmanager
+def track_queries() -> Generator[QueryStats, None, None]:
+    """Collects the statements executed by the current thread inside the `with` block.
+
+    Trackers nest, so a test can track a single request while the request tracks itself.
+    """
+    stats = QueryStats()
+    token = _active.set(_active.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active.reset(token)
+
+def init_query_counter(app: Flask, engine: Engine):
+    """Tracks the statements of every request.
+
+    Statements repeated `QUERY_REPEAT_THRESHOLD` times within a request are logged as a
+    likely N+1 query.
+    """
+    install_query_counter(engine)
+
+    @app.before_request
+    def start_tracking():
+        g._query_tracker = track_queries()
+        g._query_stats = g._query_tracker.__enter__()
+
+    @app.after_request
+    def report_queries(response: Response) -> Response:
+        stats: QueryStats = g.get("_query_stats")
+        if stats is None:
+            return response
+
+        for statement, n in stats.repeated(query_repeat_threshold):
+            logger.warning("statement executed %d times in one request (N+1?): %s", n, statement)
+        return response
+
+    @app.teardown_request
+    def stop_tracking(exception=None):
+        tracker = g.pop("_query_tracker", None)
+        if tracker is not None:
+            tracker.__exit__(None, None, None)
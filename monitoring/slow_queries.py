@@ -0,0 +1,113 @@
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass, asdict
+from logging.handlers import RotatingFileHandler
+from typing import Any, List, Optional
+from sqlalchemy import Engine, event
+from config import slow_query_threshold_ms, slow_query_sample_rate, slow_query_log
+
+__all__ = ["SlowQuery", "init_slow_query_log"]
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class SlowQuery:
+    """A statement that took longer than `SLOW_QUERY_THRESHOLD_MS`.
+
+    Attributes:
+        statement (str): SQL text of the statement
+        parameters (Any): bound parameters with every value replaced by its type name
+        duration_ms (float): execution time in milliseconds
+        plan (Optional[List[str]]): the query plan, only captured for SELECT statements
+    """
+    statement: str
+    parameters: Any
+    duration_ms: float
+    plan: Optional[List[str]] = None
+
+def redact(parameters: Any) -> Any:
+    """Keeps the shape of the bound parameters but never their values."""
+    if isinstance(parameters, dict):
+        return {key: redact(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact(value) for value in parameters]
+    if parameters is None:
+        return None
+    return f"<{type(parameters).__name__}>"
+
+def explain(cursor, dialect: str, statement: str, parameters: Any) -> Optional[List[str]]:
+    # ANALYZE runs the statement a second time, which is only safe for reads.
+    if not statement.lstrip().upper().startswith("SELECT"):
+        return None
+
+    if dialect == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) "
+    elif dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    else:
+        return None
+
+    # a failed statement aborts the whole transaction on Postgres, so the EXPLAIN gets its own
+    # savepoint to keep the request's transaction usable.
+    savepoint = dialect == "postgresql"
+    explain_cursor = cursor.connection.cursor()
+    try:
+        if savepoint:
+            explain_cursor.execute("SAVEPOINT slow_query_explain")
+        explain_cursor.execute(prefix + statement, parameters)
+        plan = [" ".join(str(column) for column in row) for row in explain_cursor.fetchall()]
+        if savepoint:
+            explain_cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    except Exception as e:
+        logger.debug("failed to explain statement: %s", e)
+        if savepoint:
+            explain_cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+        return None
+    finally:
+        explain_cursor.close()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_start_time", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["slow_query_start_time"].pop()) * 1000
+    if slow_query_threshold_ms is None or elapsed_ms < slow_query_threshold_ms:
+        return
+    if random.random() >= slow_query_sample_rate:
+        return
+
+    record = SlowQuery(
+        statement=statement,
+        parameters=redact(parameters),
+        duration_ms=round(elapsed_ms, 3),
+        plan=None if executemany else explain(cursor, conn.dialect.name, statement, parameters),
+    )
+    logger.warning(json.dumps(asdict(record)))
+
+def _handle_error(context):
+    # a failed statement never reaches `after_cursor_execute`, its start time would be paired
+    # with the next statement of the pooled connection
+    if context.connection is not None:
+        starts = context.connection.info.get("slow_query_start_time")
+        if starts:
+            starts.pop()
+
+def init_slow_query_log(engine: Engine):
+    """Logs statements slower than `SLOW_QUERY_THRESHOLD_MS` together with their query plan.
+
+    Only a `SLOW_QUERY_SAMPLE_RATE` fraction of the slow statements is captured to bound the
+    cost of running EXPLAIN. When `SLOW_QUERY_LOG` is set the records are also written to
+    that file, rotated at 10MB.
+    """
+    if slow_query_log and not any(isinstance(h, RotatingFileHandler) for h in logger.handlers):
+        handler = RotatingFileHandler(slow_query_log, maxBytes=10 * 1024 * 1024, backupCount=5)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler)
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
@@ -0,0 +1,116 @@
+"""Per-request phase timings, returned in a `Server-Timing` header.
+
+The time of a request is split between the phases it goes through: `auth` (`jwt_required` and
+the roles checks), `db` (the statements, measured on the cursor), `validation` (the request
+bodies, see `shared.validation`) and `serialization` (`jsonify` and the JSON listings). The
+phases are exclusive, a statement run during the authentication counts as `db` only, so they
+add up to at most `total`, the rest being the code of the route itself.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Generator, List, Optional
+from flask import Flask, Response, g
+from sqlalchemy import Engine, event
+from config import server_timing
+
+__all__ = ["PhaseTimer", "phase", "start_phase", "end_phase", "init_server_timing"]
+
+class PhaseTimer:
+    """Accumulates the exclusive time of each phase, a phase started within another pauses it."""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        # [name, time it started or resumed]
+        self._stack: List[list] = []
+
+    def start(self, name: str):
+        now = time.perf_counter()
+        if self._stack:
+            self._add(self._stack[-1], now)
+        self._stack.append([name, now])
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def end(self, name: str):
+        # a failed statement may end a phase that never started, see `_statement_failed`
+        if not self._stack or self._stack[-1][0] != name:
+            return
+        now = time.perf_counter()
+        self._add(self._stack.pop(), now)
+        if self._stack:
+            self._stack[-1][1] = now
+
+    def _add(self, entry: list, now: float):
+        name, since = entry
+        self.durations[name] = self.durations.get(name, 0.0) + now - since
+
+    def header(self) -> str:
+        entries = []
+        for name, duration in self.durations.items():
+            entry = f"{name};dur={duration * 1000:.2f}"
+            if name == "db":
+                entry += f';desc="{self.counts[name]} queries"'
+            entries.append(entry)
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(entries)
+
+_timer: ContextVar[Optional[PhaseTimer]] = ContextVar("phase_timer", default=None)
+
+def start_phase(name: str):
+    timer = _timer.get()
+    if timer is not None:
+        timer.start(name)
+
+def end_phase(name: str):
+    timer = _timer.get()
+    if timer is not None:
+        timer.end(name)
+
+@contextmanager
+def phase(name: str) -> Generator[None, None, None]:
+    """Counts the `with` block in the `name` phase of the current request, if any."""
+    timer = _timer.get()
+    if timer is None:
+        yield
+        return
+    timer.start(name)
+    try:
+        yield
+    finally:
+        timer.end(name)
+
+def _statement_started(conn, cursor, statement, parameters, context, executemany):
+    start_phase("db")
+
+def _statement_ended(conn, cursor, statement, parameters, context, executemany):
+    end_phase("db")
+
+def _statement_failed(context):
+    end_phase("db")
+
+def init_server_timing(app: Flask, engine: Engine):
+    """Times the phases of every request, unless `SERVER_TIMING` is disabled."""
+    if not server_timing:
+        return
+    if not event.contains(engine, "before_cursor_execute", _statement_started):
+        event.listen(engine, "before_cursor_execute", _statement_started)
+        event.listen(engine, "after_cursor_execute", _statement_ended)
+        event.listen(engine, "handle_error", _statement_failed)
+
+    @app.before_request
+    def start_timer():
+        g._phase_timer_token = _timer.set(PhaseTimer())
+
+    @app.after_request
+    def add_server_timing(response: Response) -> Response:
+        timer = _timer.get()
+        if timer is not None:
+            response.headers.add("Server-Timing", timer.header())
+        return response
+
+    @app.teardown_request
+    def stop_timer(exception=None):
+        token = g.pop("_phase_timer_token", None)
+        if token is not None:
+            _timer.reset(token)
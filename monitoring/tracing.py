@@ -0,0 +1,181 @@
+import json
+import re
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from functools import wraps
+from typing import Any, Callable, Dict, Generator, List, Optional
+from flask import Flask, Response, g, request
+from config import trace_file
+
+__all__ = [
+    "Span", "SpanExporter", "InMemoryExporter", "FileExporter",
+    "set_exporter", "get_exporter", "span", "traced", "current_span", "init_tracing",
+]
+
+# W3C trace context: version-trace_id-parent_id-flags
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+@dataclass
+class Span:
+    """A timed operation within a trace.
+
+    Attributes:
+        name (str): what the span measures, e.g. `db.accounts.get_accounts`
+        trace_id (str): shared by every span of the same request, 32 hex characters
+        span_id (str): 16 hex characters
+        parent_id (Optional[str]): the enclosing span, or the caller's span for the root
+        start (float): wall-clock start time, seconds since the epoch
+        duration_ms (float): set when the span ends
+        attributes (Dict[str, Any]): extra information, e.g. the status code of a request
+    """
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start: float = field(default_factory=time.time)
+    duration_ms: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+class SpanExporter(ABC):
+    @abstractmethod
+    def export(self, span: Span):
+        ...
+
+class InMemoryExporter(SpanExporter):
+    """Keeps the finished spans in memory, meant for tests."""
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, span: Span):
+        self.spans.append(span)
+
+    def names(self) -> List[str]:
+        return [span.name for span in self.spans]
+
+    def clear(self):
+        self.spans.clear()
+
+class FileExporter(SpanExporter):
+    """Appends the finished spans to a file, one JSON object per line."""
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(asdict(span), default=str)
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+_exporter: Optional[SpanExporter] = FileExporter(trace_file) if trace_file else None
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def set_exporter(exporter: Optional[SpanExporter]):
+    """Sets where finished spans are sent, `None` disables tracing."""
+    global _exporter
+    _exporter = exporter
+
+def get_exporter() -> Optional[SpanExporter]:
+    return _exporter
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+def _start(name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None, **attributes) -> Span:
+    parent = _current.get()
+    if trace_id is None:
+        trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        parent_id = parent.span_id if parent is not None else None
+    return Span(name=name, trace_id=trace_id, span_id=secrets.token_hex(8), parent_id=parent_id, attributes=attributes)
+
+def _finish(span: Span, started: float):
+    span.duration_ms = (time.perf_counter() - started) * 1000
+    exporter = _exporter
+    if exporter is not None:
+        exporter.export(span)
+
+@contextmanager
+def span(name: str, **attributes) -> Generator[Optional[Span], None, None]:
+    """Measures the `with` block as a child of the current span. Does nothing when tracing is disabled."""
+    if _exporter is None:
+        yield None
+        return
+
+    current = _start(name, **attributes)
+    started = time.perf_counter()
+    token = _current.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        _finish(current, started)
+
+def traced(f: Optional[Callable] = None, *, name: Optional[str] = None):
+    """Decorator that wraps every call in a span named after the function, e.g. `db.users.get_user`."""
+    def decorate(func: Callable) -> Callable:
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _exporter is None:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    if f is not None:
+        return decorate(f)
+    return decorate
+
+def init_tracing(app: Flask):
+    """Starts a root span for every request.
+
+    The trace continues the caller's one when the request carries a W3C `traceparent` header,
+    and the response's `traceparent` header identifies the request's span.
+    """
+
+    # every `jsonify` goes through the provider, so this covers the response serialization
+    json_response = app.json.response
+    def traced_json_response(*args, **kwargs):
+        with span("serialize"):
+            return json_response(*args, **kwargs)
+    app.json.response = traced_json_response
+
+    @app.before_request
+    def start_request_span():
+        if _exporter is None:
+            return
+
+        trace_id, parent_id = None, None
+        match = TRACEPARENT.match(request.headers.get("traceparent", ""))
+        if match:
+            trace_id, parent_id = match.group(1), match.group(2)
+
+        root = _start(f"{request.method} {request.url_rule.rule if request.url_rule else request.path}",
+                      trace_id=trace_id, parent_id=parent_id)
+        g._trace = (root, time.perf_counter(), _current.set(root))
+
+    @app.after_request
+    def propagate_trace(response: Response) -> Response:
+        trace = g.get("_trace")
+        if trace is not None:
+            root = trace[0]
+            root.attributes["status"] = response.status_code
+            response.headers["traceparent"] = f"00-{root.trace_id}-{root.span_id}-01"
+        return response
+
+    @app.teardown_request
+    def finish_request_span(exception=None):
+        trace = g.pop("_trace", None)
+        if trace is None:
+            return
+        root, started, token = trace
+        _current.reset(token)
+        _finish(root, started)
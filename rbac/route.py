@@ -1,9 +1,10 @@
 from flask import has_request_context, g, abort
 from auth_jwt import get_jwt_identity
-from db.users import get_user
+from db.users import get_user_record
+from db.records import UserRecord
 from functools import wraps
-from models import UserInformation
 from typing import Optional
+from monitoring import record_cache_lookup, traced, phase
 
 def role_required(*roles: tuple[str]):
     def wrapper(func):
@@ -30,19 +31,22 @@ def is_account_belong_to_current_user(account_id: str) -> bool:
     if current_user is None:
         return False
 
-    return account_id in [account.id for account in current_user.accounts]
+    return current_user.owns_account(account_id)
 
-def load_current_user() -> Optional[UserInformation]:
+@traced(name="load_current_user")
+def load_current_user() -> Optional[UserRecord]:
     if has_request_context():
+        record_cache_lookup("current_user", hit="_login_user" in g)
         if "_login_user" not in g:
-            current_user_id = get_jwt_identity()
-            if current_user_id is None:
-                return None
-
-            user =  get_user(current_user_id)
-            if user is None:
-                return None
-            g._login_user = user
+            with phase("auth"):
+                current_user_id = get_jwt_identity()
+                if current_user_id is None:
+                    return None
+
+                user =  get_user_record(current_user_id)
+                if user is None:
+                    return None
+                g._login_user = user
 
         return g._login_user
     return None
\ No newline at end of file
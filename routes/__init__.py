@@ -4,6 +4,7 @@ from .accounts import accounts_bp
 from .transactions import transaction_bp
 from .budgets import budget_bp
 from .bills import bills_bp
+from .health import health_bp
 from flask import Flask
 
 def register_bp(app: Flask):
@@ -12,4 +13,5 @@ def register_bp(app: Flask):
     app.register_blueprint(accounts_bp())
     app.register_blueprint(transaction_bp())
     app.register_blueprint(budget_bp())
-    app.register_blueprint(bills_bp())
\ No newline at end of file
+    app.register_blueprint(bills_bp())
+    app.register_blueprint(health_bp())
\ No newline at end of file
@@ -1,3 +1,4 @@
+import logging
 from flask import Blueprint, jsonify, request, Response
 from pydantic import ValidationError
 from auth_jwt import jwt_required, get_jwt_identity
@@ -11,6 +12,10 @@ from db.accounts import create_account as db_create_account
 from db.accounts import delete_account as db_delete_account
 from db.accounts import AccountsNotFoundException, AccountNotFoundException
 from rbac.route import is_account_belong_to_current_user, role_required
+from shared.etag import conditional_get
+from shared.validation import parse_body
+
+logger = logging.getLogger(__name__)
 
 def accounts_bp():
     bp = Blueprint("account", __name__, url_prefix="/accounts")
@@ -39,6 +44,7 @@ def accounts_bp():
     
     return bp
 
+@conditional_get
 def get_accounts():
     try:
         current_user = get_jwt_identity()
@@ -52,15 +58,15 @@ def create_account():
         current_user = get_jwt_identity()
         account = db_create_account(
             user_id=current_user, 
-            request=CreateAccountRequest(**request.get_json())
+            request=parse_body(CreateAccountRequest)
         )
         dump = account.model_dump()
         return jsonify({"account":dump }), 201
     except ValidationError as e:
-        # TODO: logging: log the error detail here, use structured logging.
         if e.title == "CreateAccountRequest":            
             return parseValidationError(e, 400)
         
+        logger.error("created an invalid account", extra={"model": e.title, "errors": e.errors(include_url=False)})
         return jsonify({"error": "server responded with invalid data"}), 500
 
 def get_account(id: str):
@@ -79,7 +85,7 @@ def get_account(id: str):
 def update_account(id: str):
     try:
         current_user = get_jwt_identity()
-        req = UpdateAccountRequest(**request.get_json())
+        req = parse_body(UpdateAccountRequest)
         req.account_id = id
         account = db_update_account(user_id=current_user,request=req)
         return jsonify(account.model_dump()), 200
@@ -102,7 +108,7 @@ def update_account(id: str):
 def update_default_account():
     try:
         current_user = get_jwt_identity()
-        req = UpdateAccountRequest(**request.get_json())
+        req = parse_body(UpdateAccountRequest)
         account = db_update_account(user_id=current_user,request=req)
         return jsonify(account.model_dump()), 200
     except ValidationError as e:
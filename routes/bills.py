@@ -1,16 +1,25 @@
+import hashlib
 from flask import Blueprint, request, jsonify
 from auth_jwt import jwt_required, get_jwt_identity
-from pydantic import ValidationError
-from models import CreateBillRequest, QueryBillsRequest, UpdateBillRequest
+from pydantic import ValidationError, TypeAdapter
+from models import CreateBillRequest, QueryBillsRequest, UpdateBillRequest, Bill
+from typing import List
 from shared.exceptions import parseValidationError
+from shared.json_provider import json_list_response, json_stream_response
 from db.bills import create_bill as db_create_bill
 from db.bills import get_bills as db_get_bills
+from db.bills import get_bills_json as db_get_bills_json
 from db.bills import get_bill as db_get_bill
 from db.bills import update_bill as db_update_bill
 from db.bills import delete_bill as db_delete_bill
 from db.bills import BillNotFoundException
 from db.accounts import AccountNotFoundException
 from db.users import UserNotFoundException
+from db.json_listings import sql_json_enabled
+from shared.etag import conditional_get
+from shared.validation import parse_body
+
+bills_adapter = TypeAdapter(List[Bill])
 
 def bills_bp() -> Blueprint:
     bp = Blueprint("bills", __name__, url_prefix="/bills")
@@ -41,7 +50,7 @@ def create_bills():
     try:
         # TODO: perform RBAC here
         current_user = get_jwt_identity()
-        req = CreateBillRequest(**request.get_json())
+        req = parse_body(CreateBillRequest)
         bill = db_create_bill(user_id=current_user, request=req)
         return jsonify({"bill": bill.model_dump()}), 201
     except ValidationError as e:        
@@ -53,17 +62,26 @@ def create_bills():
     except AccountNotFoundException as e:
         return jsonify({"error": str(e)}), 404
 
+def _bills_query() -> QueryBillsRequest:
+    if request is None or request.content_length is None or request.content_length > 0:
+        return parse_body(QueryBillsRequest)
+    return QueryBillsRequest()
+
+def _bills_query_variant() -> str:
+    # the filters are read from the body, the same URL lists different bills
+    return hashlib.sha256(_bills_query().model_dump_json().encode()).hexdigest()[:16]
+
+@conditional_get(variant=_bills_query_variant)
 def get_bills():
     try:
         # TODO: perform RBAC here
         current_user = get_jwt_identity()
-        if request is None or request.content_length is None or request.content_length > 0:
-            req = QueryBillsRequest(**request.get_json())
-        else:
-            req = QueryBillsRequest()
+        req = _bills_query()
 
+        if sql_json_enabled():
+            return json_stream_response("bills", db_get_bills_json(user_id=current_user, request=req))
         bills = db_get_bills(user_id=current_user, request=req)
-        return jsonify({"bills": [bill.model_dump() for bill in bills]}), 200
+        return json_list_response("bills", bills_adapter, bills)
     except ValidationError as e:
         if e.title == "QueryBillsRequest":
             return parseValidationError(e, 400)
@@ -75,7 +93,7 @@ def update_bill(id: str):
     try:
         # TODO: perform RBAC here
         current_user = get_jwt_identity()   
-        req = UpdateBillRequest(**request.get_json())
+        req = parse_body(UpdateBillRequest)
         bill = db_update_bill(user_id=current_user, bill_id=id, request=req)
         return jsonify({"bill": bill.model_dump()}), 200
     except ValidationError as e:
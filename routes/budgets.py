@@ -9,6 +9,8 @@ from db.budgets import update_budget as db_update_budget
 from db.budgets import delete_budget as db_delete_budget
 from db.budgets import get_budget as db_get_budget
 from db.budgets import BudgetsNotFoundException, BudgetNotFoundException
+from shared.etag import conditional_get
+from shared.validation import parse_body
 
 def budget_bp() -> Blueprint:
     bp = Blueprint("budgets", __name__, url_prefix="/budgets")
@@ -37,12 +39,13 @@ def budget_bp() -> Blueprint:
 def create_budget():
     try:
         current_user = get_jwt_identity()
-        req = CreateBudgetRequest(**request.get_json())
+        req = parse_body(CreateBudgetRequest)
         res = db_create_budget(user_id=current_user, request=req)
         return jsonify({"budget": res.model_dump()}), 200
     except ValidationError as e:
         return parseValidationError(e, 400)
 
+@conditional_get
 def get_budgets():
     try:
         current_user = get_jwt_identity()
@@ -63,7 +66,7 @@ def get_budget(id: str):
     
 def update_budget(id: str):
     try:
-        req = UpdateBudgetRequest(**request.get_json())
+        req = parse_body(UpdateBudgetRequest)
         res = db_update_budget(budget_id=id, request=req)
         return jsonify({"budget": res.model_dump()})
     except ValidationError as e:
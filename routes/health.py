@@ -0,0 +1,121 @@
+"""Liveness, readiness and deep health checks.
+
+- `/healthz` answers as long as the process serves requests, without any I/O.
+- `/readyz` answers 503 while the worker can't serve: the database doesn't answer or the circuit
+  breaker is open, the schema isn't at the migrations' head, or the pool is saturated.
+- `/health/deep`, for admins, adds the latency of the database, the tables that can't be read,
+  the read cache, the degraded mode and the admission control.
+
+The database checks are run at most once per `HEALTH_CACHE_SECONDS` in a worker, and the probes
+arriving meanwhile share their result, so probing never adds load on the database.
+"""
+import threading
+import time
+from typing import Any, Callable
+from flask import Blueprint, current_app, jsonify
+from sqlalchemy.exc import SQLAlchemyError
+from auth_jwt import jwt_required
+from cache import get_backend, CacheBackendError
+from config import health_cache_seconds, readiness_max_pool_saturation
+from db import circuit_breaker, CircuitOpenError, OPEN
+from db.health import ping_database, migration_version, expected_migrations, check_tables, pool_status
+from rbac.route import role_required
+from shared.deadlines import DeadlineExceeded
+from shared.degradation import is_degraded
+
+# the errors a database check reports instead of raising
+CHECK_ERRORS = (SQLAlchemyError, CircuitOpenError, DeadlineExceeded)
+
+class CachedCheck:
+    """Runs `check` at most once per `ttl` seconds, the concurrent calls wait for its result."""
+    def __init__(self, check: Callable[[], Any], ttl: float):
+        self.check = check
+        self.ttl = ttl
+        self._result = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self) -> Any:
+        with self._lock:
+            if time.monotonic() >= self._expires:
+                self._result = self.check()
+                self._expires = time.monotonic() + self.ttl
+            return self._result
+
+    def clear(self):
+        with self._lock:
+            self._expires = 0.0
+
+def _database_check() -> dict:
+    if circuit_breaker.state == OPEN:
+        return {"ok": False, "error": "the circuit breaker is open"}
+    try:
+        latency = ping_database()
+        version = migration_version()
+    except CHECK_ERRORS as e:
+        return {"ok": False, "error": type(e).__name__}
+
+    result = {"ok": True, "latency_ms": round(latency * 1000, 2), "migration": version}
+    expected = expected_migrations()
+    if expected is not None:
+        result["expected_migrations"] = expected
+        result["ok"] = version in expected
+    return result
+
+def _tables_check() -> dict:
+    if circuit_breaker.state == OPEN:
+        return {"ok": False, "error": "the circuit breaker is open"}
+    try:
+        tables = check_tables()
+    except CHECK_ERRORS as e:
+        return {"ok": False, "error": type(e).__name__}
+    return {"ok": all(tables.values()), "unreadable": sorted(name for name, ok in tables.items() if not ok)}
+
+database_check = CachedCheck(_database_check, health_cache_seconds)
+tables_check = CachedCheck(_tables_check, health_cache_seconds)
+
+def _pool_check() -> dict:
+    status = pool_status()
+    if status is None:
+        return {"ok": True}
+    return {"ok": status["saturation"] < readiness_max_pool_saturation, **status}
+
+def _cache_check() -> dict:
+    backend = get_backend()
+    if backend is None:
+        return {"ok": True, "enabled": False}
+    try:
+        backend.get("health")
+    except CacheBackendError as e:
+        return {"ok": False, "enabled": True, "error": str(e)}
+    return {"ok": True, "enabled": True, "backend": type(backend).__name__}
+
+def _report(checks: dict):
+    ok = all(check["ok"] for check in checks.values())
+    return jsonify({"status": "ready" if ok else "unavailable", "checks": checks}), 200 if ok else 503
+
+def health_bp() -> Blueprint:
+    bp = Blueprint("health", __name__)
+
+    @bp.route("/healthz", methods=["GET"])
+    def liveness():
+        return jsonify({"status": "alive"}), 200
+
+    @bp.route("/readyz", methods=["GET"])
+    def readiness():
+        return _report({"database": database_check(), "pool": _pool_check()})
+
+    @bp.route("/health/deep", methods=["GET"])
+    @jwt_required
+    @role_required("admin")
+    def deep_check():
+        admission = current_app.extensions.get("admission")
+        return _report({
+            "database": {**database_check(), "circuit_breaker": circuit_breaker.state, "degraded": is_degraded()},
+            "tables": tables_check(),
+            "pool": _pool_check(),
+            "cache": _cache_check(),
+            "admission": {"ok": True, "in_flight": admission.in_flight, "max_in_flight": admission.max_in_flight} if admission else {"ok": True},
+        })
+
+    return bp
@@ -1,19 +1,28 @@
 from flask import Blueprint, request, jsonify
-from pydantic import ValidationError
+from pydantic import ValidationError, TypeAdapter
 from auth_jwt import jwt_required, get_jwt_identity
 from db.transactions import withdraw
 from db.transactions import deposit
 from db.transactions import transfer
 from db.transactions import get_transactions as db_get_transactions
+from db.transactions import get_transactions_json as db_get_transactions_json
 from db.transactions import get_transaction as db_get_transaction
 from db.transactions import TransactionNotFoundException
 from db.transactions import TransactionQuery
+from db.records import TransactionRecord
 from db.transactions import get_categories
 from db.accounts import AccountsNotFoundException, AccountNotFoundException
+from db.json_listings import sql_json_enabled
 from models import WithdrawRequest, DepositRequest, TransferRequest
 from typing import List
 from shared.exceptions import parseValidationError
+from shared.json_provider import json_list_response, json_stream_response
 from rbac.route import is_account_belong_to_current_user
+from shared.etag import conditional_get
+from shared.validation import parse_body
+
+# the listing is serialized straight from the records, with the same JSON as `Transaction`
+transactions_adapter = TypeAdapter(List[TransactionRecord])
 
 def transaction_bp() -> Blueprint:
     bp = Blueprint("transactions", __name__, url_prefix="/transactions")
@@ -29,7 +38,7 @@ def transaction_bp() -> Blueprint:
     @jwt_required
     def handle_withdraw():
         try:
-            withdraw_request = WithdrawRequest(**request.get_json())
+            withdraw_request = parse_body(WithdrawRequest)
             if withdraw_request.account_id is not None:
                 if not is_account_belong_to_current_user(withdraw_request.account_id):
                     return jsonify({"error": "Forbidden"}), 401
@@ -44,7 +53,7 @@ def transaction_bp() -> Blueprint:
     @jwt_required
     def handle_deposit():
         try:
-            deposit_request = DepositRequest(**request.get_json())
+            deposit_request = parse_body(DepositRequest)
             if deposit_request.account_id is not None:
                 if not is_account_belong_to_current_user(deposit_request.account_id):
                     return jsonify({"error": "Forbidden"}), 401
@@ -59,7 +68,7 @@ def transaction_bp() -> Blueprint:
     @jwt_required
     def handle_transfer():
         try:
-            transfer_request = TransferRequest(**request.get_json())
+            transfer_request = parse_body(TransferRequest)
             if transfer_request.account_id is not None:
                 if not is_account_belong_to_current_user(transfer_request.account_id):
                     return jsonify({"error": "Forbidden"}), 401
@@ -72,12 +81,15 @@ def transaction_bp() -> Blueprint:
 
     @bp.route("/", methods=["GET"])
     @jwt_required
+    @conditional_get
     def handle_get_transactions():
         try:
             current_user = get_jwt_identity()
             query = parse_transaction_query()
+            if sql_json_enabled():
+                return json_stream_response("transactions", db_get_transactions_json(query=query, current_user=current_user))
             transactions = db_get_transactions(query=query, current_user=current_user)
-            return jsonify({"transactions": [transaction.model_dump() for transaction in transactions]}), 200
+            return json_list_response("transactions", transactions_adapter, transactions)
         except ValidationError as e:
             return e.errors(), 400
         except AccountsNotFoundException as e:
@@ -89,7 +101,7 @@ def transaction_bp() -> Blueprint:
             transaction = db_get_transaction(id)
             if not is_account_belong_to_current_user(transaction.account_id):
                 return jsonify({"error": "Forbidden"}), 401
-            return jsonify({"transaction": transaction.model_dump()}), 200
+            return jsonify({"transaction": transaction.to_model().model_dump()}), 200
         except TransactionNotFoundException as e:
             return jsonify({"error": str(e)}), 404
     
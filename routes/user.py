@@ -7,6 +7,8 @@ from db.users import create_user as db_create_user
 from db.users import get_user as db_get_user
 from db.users import update_user as db_update_user
 from db.users import UserNotFoundException
+from shared.etag import conditional_get
+from shared.validation import parse_body
 
 def user_bp()-> Blueprint:
     bp = Blueprint("users", __name__, url_prefix="/users")
@@ -14,7 +16,7 @@ def user_bp()-> Blueprint:
     @bp.route("/", methods=["POST"])
     def create_user():
         try:
-            req = CreateUserRequest(**request.get_json())
+            req = parse_body(CreateUserRequest)
             id = db_create_user(req)
             
             return jsonify({"id": id}), 201
@@ -45,6 +47,7 @@ def user_bp()-> Blueprint:
             
     return bp
 
+@conditional_get
 def handle_get_me():
     try:
         current_user = get_jwt_identity()
@@ -57,7 +60,7 @@ def handle_get_me():
 def handle_update_me():
     try:
         current_user = get_jwt_identity()
-        updated = db_update_user(current_user, UserInformation(**request.get_json()))
+        updated = db_update_user(current_user, parse_body(UserInformation))
         return jsonify(updated.model_dump()), 200
     except ValidationError as e:
         errors = e.errors()
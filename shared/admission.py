@@ -0,0 +1,98 @@
+"""Admission control and load shedding.
+
+Behind a saturated database pool, requests queue until they time out and the latency of every
+route explodes. The controller tracks the requests in flight in the worker and the recent wait
+for a pooled connection (see `monitoring.recent_pool_wait`), and rejects the requests it can't
+serve in time with a 503 and a `Retry-After`, starting with the expensive ones:
+
+- critical routes (token refresh, balance and profile reads) are admitted up to the full
+  `ADMISSION_MAX_IN_FLIGHT`, whatever the pool wait,
+- normal routes up to 80% of it, while the pool wait is under `ADMISSION_MAX_POOL_WAIT_MS`,
+- expensive routes (the listings) up to 50% of it, while the pool wait is under half of that.
+
+The liveness probe is never shed nor counted, a busy worker is still alive.
+
+The requests in flight are counted per worker, they only build up with threaded workers, which
+gunicorn.conf.py sets up with `ADMISSION_MAX_IN_FLIGHT` threads. Sync workers queue in the
+listen backlog instead.
+"""
+import threading
+from typing import Dict, Tuple
+from flask import Flask, g, jsonify, request
+from config import admission_max_in_flight, admission_max_pool_wait_ms, admission_retry_after
+from monitoring import REQUESTS_SHED, recent_pool_wait
+
+__all__ = ["CRITICAL", "NORMAL", "EXPENSIVE", "EXEMPT", "AdmissionController", "route_priority", "init_admission"]
+
+CRITICAL, NORMAL, EXPENSIVE = "critical", "normal", "expensive"
+
+# the share of the in-flight capacity, and of the pool wait budget, each priority may use
+SHARES = {CRITICAL: 1.0, NORMAL: 0.8, EXPENSIVE: 0.5}
+
+# (endpoint, method), the routes that aren't listed are NORMAL
+PRIORITIES: Dict[Tuple[str, str], str] = {
+    ("ping", "GET"): CRITICAL,
+    ("metrics", "GET"): CRITICAL,
+    ("health.readiness", "GET"): CRITICAL,
+    ("auth.refresh", "POST"): CRITICAL,
+    ("auth.logout", "GET"): CRITICAL,
+    ("account.handle_root", "GET"): CRITICAL,
+    ("account.handle_id", "GET"): CRITICAL,
+    ("users.handle_me", "GET"): CRITICAL,
+    ("transactions.handle_get_transactions", "GET"): EXPENSIVE,
+    ("transactions.handle_categories", "GET"): EXPENSIVE,
+    ("bills.handle_bills", "GET"): EXPENSIVE,
+    ("budgets.handle_budgets", "GET"): EXPENSIVE,
+}
+
+# endpoints left out of the admission control, a 503 would get a busy but healthy container restarted
+EXEMPT = {"health.liveness"}
+
+def route_priority(endpoint: str, method: str) -> str:
+    return PRIORITIES.get((endpoint, "GET" if method == "HEAD" else method), NORMAL)
+
+class AdmissionController:
+    def __init__(self, max_in_flight: int, max_pool_wait: float):
+        self.max_in_flight = max_in_flight
+        self.max_pool_wait = max_pool_wait
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def admit(self, priority: str) -> bool:
+        share = SHARES[priority]
+        with self._lock:
+            if self.in_flight >= self.max_in_flight * share:
+                return False
+            # the critical routes are cheap, they're only bounded by the capacity
+            if priority != CRITICAL and recent_pool_wait() > self.max_pool_wait * share:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+def init_admission(app: Flask):
+    """Sheds the requests over capacity, must be registered before the other request hooks."""
+    if admission_max_in_flight <= 0:
+        return
+    controller = app.extensions["admission"] = AdmissionController(admission_max_in_flight, admission_max_pool_wait_ms / 1000)
+
+    @app.before_request
+    def admit_request():
+        if request.endpoint in EXEMPT:
+            return
+        priority = route_priority(request.endpoint or "", request.method)
+        if not controller.admit(priority):
+            REQUESTS_SHED.labels(priority).inc()
+            response = jsonify({"error": "the server is overloaded, try again later"})
+            response.status_code = 503
+            response.headers["Retry-After"] = str(admission_retry_after)
+            return response
+        g._admitted = True
+
+    @app.teardown_request
+    def release_request(exception=None):
+        if g.pop("_admitted", False):
+            controller.release()
@@ -0,0 +1,139 @@
+"""Content-negotiated response compression.
+
+JSON responses are compressed with the best encoding the client accepts: zstd or brotli when
+their packages are installed, gzip otherwise. Buffered responses smaller than
+`COMPRESSION_MIN_SIZE` are sent as they are, the framing costs more than it saves. Streamed
+responses can't be measured up front and are always compressed, chunk by chunk, so that the
+client keeps receiving data as it's produced.
+"""
+import typing as t
+import zlib
+from flask import Flask, Response, request
+from config import compression_min_size
+from monitoring import span
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional, see README
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is optional, see README
+    zstandard = None
+
+__all__ = ["init_compression", "encodings", "compressor"]
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/plain", "text/html", "text/csv"}
+
+# levels tuned for dynamic responses, the maximum levels are far too slow to run per request
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+class _GzipCompressor:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+class _BrotliCompressor:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+class _ZstdCompressor:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+def encodings() -> t.List[str]:
+    """The available encodings, most preferred first."""
+    available = []
+    if zstandard is not None:
+        available.append("zstd")
+    if brotli is not None:
+        available.append("br")
+    available.append("gzip")
+    return available
+
+def compressor(encoding: str):
+    """A streaming compressor for `encoding`, with `compress(data)`, `flush()` and `finish()`."""
+    match encoding:
+        case "gzip":
+            return _GzipCompressor()
+        case "br":
+            return _BrotliCompressor()
+        case "zstd":
+            return _ZstdCompressor()
+    raise ValueError(f"unsupported encoding {encoding!r}")
+
+def init_compression(app: Flask):
+    @app.after_request
+    def compress_response(response: Response) -> Response:
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        response.vary.add("Accept-Encoding")
+
+        if (request.method == "HEAD" or response.status_code < 200 or response.status_code in (204, 304)
+                or response.direct_passthrough or "Content-Encoding" in response.headers):
+            return response
+
+        encoding = request.accept_encodings.best_match(encodings())
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, compressor(encoding))
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < compression_min_size:
+                return response
+            with span("compress", encoding=encoding):
+                stream = compressor(encoding)
+                response.set_data(stream.compress(data) + stream.finish())
+
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+def _compress_stream(chunks: t.Iterable[t.Union[str, bytes]], stream) -> t.Iterator[bytes]:
+    # every chunk is flushed so that the client gets it right away, instead of when the
+    # compressor's buffer fills up
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = stream.compress(chunk) + stream.flush()
+            if data:
+                yield data
+        yield stream.finish()
+    finally:
+        # closing the response closes this generator, pass it on so that streams wrapped
+        # with `stream_with_context` tear down their request context
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,124 @@
+"""Request deadlines and statement timeouts.
+
+Every request gets a time budget, `REQUEST_DEADLINE_MS` or the route's entry in
+`ROUTE_DEADLINES_MS`. The deadline is kept in a context variable, so the code called by the
+route sees what's left of it with `remaining()`, and `deadline()` gives a part of the work a
+tighter budget. The database enforces it:
+
+- on PostgreSQL, the connections' `statement_timeout` is `REQUEST_DEADLINE_MS` (see
+  `db.db`), and a transaction only sets its own with `SET LOCAL` when the budget left as it
+  begins is under half of that, or over it for the routes with a longer budget. Most requests
+  don't pay for an extra statement, and a statement outlasts the deadline by half of
+  `REQUEST_DEADLINE_MS` at most,
+- on SQLite, a progress handler interrupts the statement running when the deadline passes,
+- no statement starts after the deadline.
+
+A statement stopped by the deadline raises `DeadlineExceeded`, answered with a 503. It doesn't
+put the worker in degraded mode (see `shared.degradation`), the database isn't at fault.
+"""
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Generator, Optional
+from flask import Flask, g, jsonify, request
+from sqlalchemy import Engine, event
+from sqlalchemy.exc import OperationalError
+from config import request_deadline_ms, route_deadlines_ms
+from db import db_session
+
+__all__ = ["DeadlineExceeded", "deadline", "remaining", "route_deadline", "statement_timeout_ms", "init_deadlines"]
+
+# virtual machine instructions between two checks of the SQLite progress handler
+SQLITE_PROGRESS_INTERVAL = 1000
+# share of the connections' statement_timeout under which a transaction sets a tighter one
+STATEMENT_TIMEOUT_SLACK = 0.5
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+class DeadlineExceeded(Exception):
+    pass
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, None without a deadline."""
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+@contextmanager
+def deadline(seconds: float) -> Generator[None, None, None]:
+    """Runs the block with `seconds` of budget, or what's left of the enclosing deadline if it's sooner."""
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires if current is None else min(current, expires))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def route_deadline(endpoint: str) -> float:
+    return route_deadlines_ms.get(endpoint, request_deadline_ms) / 1000
+
+def statement_timeout_ms(left: float) -> Optional[int]:
+    """The `statement_timeout` of a transaction beginning with `left` seconds of budget, None to keep the connection's."""
+    timeout = max(1, math.ceil(left * 1000))
+    if STATEMENT_TIMEOUT_SLACK * request_deadline_ms <= timeout <= request_deadline_ms:
+        return None
+    return timeout
+
+def _expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+def _is_cancellation(error: BaseException) -> bool:
+    # query_canceled on PostgreSQL, an interrupt of the progress handler on SQLite
+    return getattr(error, "pgcode", None) == "57014" or str(error) == "interrupted"
+
+def _interrupt_after_deadline() -> int:
+    return 1 if _expired() else 0
+
+def init_deadlines(app: Flask, engine: Engine):
+    @app.before_request
+    def start_deadline():
+        expires = time.monotonic() + route_deadline(request.endpoint or "")
+        g._deadline_token = _deadline.set(expires)
+
+    @app.teardown_request
+    def end_deadline(exception=None):
+        token = g.pop("_deadline_token", None)
+        if token is not None:
+            _deadline.reset(token)
+
+    @app.errorhandler(DeadlineExceeded)
+    def handle_deadline_exceeded(e):
+        db_session.rollback()
+        response = jsonify({"error": "the request took too long, try again later"})
+        response.status_code = 503
+        response.headers["Retry-After"] = "1"
+        return response
+
+    if not event.contains(engine, "before_cursor_execute", _check_deadline):
+        event.listen(engine, "before_cursor_execute", _check_deadline)
+        event.listen(engine, "handle_error", _raise_deadline_exceeded)
+
+def _check_deadline(conn, cursor, statement, parameters, context, executemany):
+    if _expired():
+        raise DeadlineExceeded()
+    if conn.dialect.name == "sqlite" and not conn.connection.info.get("progress_handler"):
+        conn.connection.dbapi_connection.set_progress_handler(_interrupt_after_deadline, SQLITE_PROGRESS_INTERVAL)
+        conn.connection.info["progress_handler"] = True
+
+def _raise_deadline_exceeded(context):
+    if isinstance(context.sqlalchemy_exception, OperationalError) and _is_cancellation(context.original_exception):
+        return DeadlineExceeded()
+
+@event.listens_for(db_session, "after_begin")
+def _set_statement_timeout(session, transaction, connection):
+    left = remaining()
+    if left is None or connection.dialect.name != "postgresql":
+        return
+    if left <= 0:
+        raise DeadlineExceeded()
+    timeout = statement_timeout_ms(left)
+    if timeout is not None:
+        # SET LOCAL only lasts until the end of the transaction
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout}")
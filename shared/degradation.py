@@ -0,0 +1,80 @@
+"""Serving stale reads while the database is degraded.
+
+A database error (the server is down, a statement timed out, or no pooled connection was
+available within `DB_POOL_TIMEOUT`) puts the worker in degraded mode for `DEGRADED_COOLDOWN`
+seconds, and so does the database circuit breaker (see `db.breaker`) while it's open. While
+degraded, the writes are answered with a 503 right away instead of queueing for the database,
+and the cached reads that miss (see `cache.cached`) answer with the last copy they stored
+instead of querying. Those responses are marked with `Warning: 110` and an `Age`
+header. Reads without a copy, and the requests that hit the error, get a 503.
+
+The authorization never reads a copy (see `db.users.get_user_record`): a revoked role or a
+deleted account would still be honoured, so the routes checking them get a 503 instead.
+"""
+import math
+import time
+from flask import Flask, Response, g, has_request_context, jsonify, request
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from config import degraded_cooldown
+from db import db_session, circuit_breaker, CircuitOpenError, OPEN
+
+__all__ = ["DB_ERRORS", "DatabaseUnavailable", "database_failed", "is_degraded", "mark_stale", "is_stale", "init_degradation"]
+
+# TimeoutError is raised when no pooled connection is available, CircuitOpenError while the
+# breaker refuses to connect
+DB_ERRORS = (OperationalError, PoolTimeoutError, CircuitOpenError)
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+_degraded_until = 0.0
+
+class DatabaseUnavailable(Exception):
+    pass
+
+def database_failed():
+    """Rolls back the failed transaction and starts the degraded mode."""
+    global _degraded_until
+    db_session.rollback()
+    _degraded_until = time.monotonic() + degraded_cooldown
+
+def is_degraded() -> bool:
+    return time.monotonic() < _degraded_until or circuit_breaker.state == OPEN
+
+def mark_stale(stored_at: float):
+    """Marks the current response as built from data stored at `stored_at`, a `time.time()`."""
+    if has_request_context():
+        g._stale_since = min(g.get("_stale_since", stored_at), stored_at)
+
+def is_stale() -> bool:
+    return has_request_context() and "_stale_since" in g
+
+def _unavailable() -> Response:
+    response = jsonify({"error": "the database is unavailable, try again later"})
+    response.status_code = 503
+    retry_after = max(_degraded_until - time.monotonic(), circuit_breaker.retry_after())
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+def init_degradation(app: Flask):
+    @app.before_request
+    def fail_writes_fast():
+        if request.method not in SAFE_METHODS and is_degraded():
+            return _unavailable()
+
+    @app.errorhandler(OperationalError)
+    @app.errorhandler(PoolTimeoutError)
+    @app.errorhandler(CircuitOpenError)
+    def handle_database_error(e):
+        database_failed()
+        return _unavailable()
+
+    @app.errorhandler(DatabaseUnavailable)
+    def handle_database_unavailable(e):
+        return _unavailable()
+
+    @app.after_request
+    def add_staleness_headers(response: Response) -> Response:
+        if is_stale():
+            response.headers["Warning"] = '110 - "Response is Stale"'
+            response.headers["Age"] = str(max(0, int(time.time() - g._stale_since)))
+        return response
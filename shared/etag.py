@@ -0,0 +1,59 @@
+"""Conditional GET from the current user's data version.
+
+The read endpoints tagged with `conditional_get` answer with a weak ETag built from the user's
+data version, see db/versions.py. A request whose `If-None-Match` holds the current tag gets a
+304 after a single version lookup, without running the endpoint's queries or serializing its
+body. The endpoints whose result depends on more than the URL, like the filters of `GET /bills/`
+read from the request body, give a `variant` that is mixed into the tag.
+"""
+from functools import wraps
+from typing import Callable, Optional
+from flask import Response, make_response, request
+from auth_jwt import get_jwt_identity
+from db import get_data_version
+from .degradation import DB_ERRORS, database_failed, is_degraded, is_stale
+
+__all__ = ["conditional_get"]
+
+def conditional_get(func: Optional[Callable] = None, *, variant: Optional[Callable[[], str]] = None):
+    """Tags the responses of `func` with the user's data version, and `variant()` when given.
+
+    `variant` identifies the result among the ones of the URL, a request it fails on, e.g. with
+    an invalid body, is passed to `func` untagged.
+    """
+    if func is None:
+        return lambda func: conditional_get(func, variant=variant)
+
+    @wraps(func)
+    def decorator(*args, **kwargs):
+        current_user = get_jwt_identity()
+        if current_user is None or is_degraded():
+            return func(*args, **kwargs)
+        suffix = ""
+        if variant is not None:
+            try:
+                suffix = f".{variant()}"
+            except Exception:
+                return func(*args, **kwargs)
+
+        # the version is read before the endpoint's queries: a write committed in between gives
+        # newer data under the older tag, which the next request revalidates, never the reverse
+        try:
+            etag = f"{current_user}.{get_data_version(current_user)}{suffix}"
+        except DB_ERRORS:
+            # answered from the stale copies, which can't be tagged with a version
+            database_failed()
+            return func(*args, **kwargs)
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = make_response(func(*args, **kwargs))
+            if response.status_code != 200 or is_stale():
+                return response
+
+        response.set_etag(etag, weak=True)
+        # cached copies must be revalidated, and they're only valid for the user who fetched them
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    return decorator
@@ -0,0 +1,75 @@
+import typing as t
+from flask import Response, current_app, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from pydantic import TypeAdapter
+from monitoring import span, phase
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional, see README
+    orjson = None
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes with orjson, falling back to the standard library when it isn't installed.
+
+    The output matches Flask's default provider: keys are sorted, dates go through Flask's
+    `default` hook, and the response is indented in debug mode. Request bodies are small, so
+    decoding is left to the default provider.
+    """
+    def dumps(self, obj: t.Any, **kwargs: t.Any) -> str:
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dumps_bytes(obj).decode()
+
+    def response(self, *args: t.Any, **kwargs: t.Any) -> Response:
+        with phase("serialization"):
+            if orjson is None:
+                return super().response(*args, **kwargs)
+
+            obj = self._prepare_response_obj(args, kwargs)
+            indent = (self.compact is None and self._app.debug) or self.compact is False
+            body = self._dumps_bytes(obj, indent=indent)
+            return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+    def _dumps_bytes(self, obj: t.Any, *, indent: bool = False) -> bytes:
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+def json_list_response(key: str, adapter: TypeAdapter, items: t.Sequence[t.Any], status: int = 200) -> Response:
+    """Serializes `{key: items}` straight from the pydantic models.
+
+    pydantic-core converts the models to JSON-ready values in a single pass, skipping the
+    `model_dump()` dicts and Flask's `default` hook, which is what dominates large listings.
+    pydantic writes the fields in their declaration order, so while the app's provider sorts
+    the keys the values are encoded by it, like every other response. Otherwise
+    `adapter.dump_json` writes the whole body.
+    """
+    with span("serialize"), phase("serialization"):
+        provider = current_app.json
+        if getattr(provider, "sort_keys", False):
+            body = provider.dumps({key: adapter.dump_python(items, mode="json")}).encode() + b"\n"
+        else:
+            body = b'{"' + key.encode() + b'":' + adapter.dump_json(items) + b"}\n"
+    return current_app.response_class(body, status=status, mimetype="application/json")
+
+def json_stream_response(key: str, items: t.Iterator[str], status: int = 200) -> Response:
+    """Streams `{key: [...]}` from already-encoded chunks of comma-separated JSON items, see `db.json_listings`.
+
+    The first chunk is fetched before the response is returned, so that the query runs in the
+    view: a failure to run it, a database error or an exceeded deadline, is raised there and
+    answered like in any other view. A failure while the later chunks are fetched happens
+    once the `200` headers are sent, and truncates the body.
+    """
+    first = next(items, None)
+
+    def generate() -> t.Iterator[str]:
+        yield '{"' + key + '":['
+        if first is not None:
+            yield first
+            yield from items
+        yield "]}\n"
+    return current_app.response_class(stream_with_context(generate()), status=status, mimetype="application/json")
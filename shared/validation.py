@@ -0,0 +1,15 @@
+"""Parsing of the request bodies, timed as the `validation` phase of `Server-Timing`."""
+from typing import Type, TypeVar
+from flask import request
+from pydantic import BaseModel
+from monitoring import phase
+
+__all__ = ["parse_body"]
+
+Model = TypeVar("Model", bound=BaseModel)
+
+def parse_body(model: Type[Model]) -> Model:
+    """The JSON body of the request validated as `model`, raises pydantic's `ValidationError`."""
+    body = request.get_json()
+    with phase("validation"):
+        return model(**body)
@@ -0,0 +1,74 @@
+"""A minimal Redis-protocol server, for testing `cache.RedisBackend` without Redis.
+
+It supports the commands the backend sends: PING, GET, SET with PX and NX, and DEL.
+"""
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+class RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.entries: Dict[bytes, Tuple[Optional[float], bytes]] = {}
+        self.commands: List[List[bytes]] = []
+        self.lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "RespServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def execute(self, command: List[bytes]) -> bytes:
+        with self.lock:
+            self.commands.append(command)
+            name, args = command[0].upper(), command[1:]
+            if name == b"PING":
+                return b"+PONG\r\n"
+            if name == b"GET":
+                value = self._get(args[0])
+                return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+            if name == b"SET":
+                key, value, options = args[0], args[1], [option.upper() for option in args[2:]]
+                if b"NX" in options and self._get(key) is not None:
+                    return b"$-1\r\n"
+                expires = None
+                if b"PX" in options:
+                    expires = time.monotonic() + int(options[options.index(b"PX") + 1]) / 1000
+                self.entries[key] = (expires, value)
+                return b"+OK\r\n"
+            if name == b"DEL":
+                return b":%d\r\n" % sum(self.entries.pop(key, None) is not None for key in args)
+            return b"-ERR unknown command '%s'\r\n" % name
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires is not None and expires < time.monotonic():
+            del self.entries[key]
+            return None
+        return value
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = []
+            for _ in range(int(line[1:-2])):
+                length = int(self.rfile.readline()[1:-2])
+                command.append(self.rfile.read(length + 2)[:-2])
+            self.wfile.write(self.server.execute(command))
@@ -0,0 +1,105 @@
+import os
+import runpy
+import threading
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import create_engine, text
+from db import TimedQueuePool
+from monitoring import DB_POOL_WAIT, metrics
+from shared import admission
+from shared.admission import AdmissionController, CRITICAL, NORMAL, EXPENSIVE, route_priority
+
+GUNICORN_CONF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gunicorn.conf.py")
+
+@pytest.fixture
+def pool_wait(monkeypatch):
+    """Sets the recent pool wait the controller sees, in seconds."""
+    def set_wait(seconds: float):
+        monkeypatch.setattr(admission, "recent_pool_wait", lambda: seconds)
+    set_wait(0.0)
+    return set_wait
+
+class TestAdmissionController:
+    def test_expensive_routes_are_shed_first(self, pool_wait):
+        controller = AdmissionController(max_in_flight=10, max_pool_wait=0.1)
+        for _ in range(5):
+            assert controller.admit(EXPENSIVE)
+        assert not controller.admit(EXPENSIVE)
+        for _ in range(3):
+            assert controller.admit(NORMAL)
+        assert not controller.admit(NORMAL)
+        assert controller.admit(CRITICAL) and controller.admit(CRITICAL)
+        assert not controller.admit(CRITICAL)
+
+        controller.release()
+        assert controller.admit(CRITICAL)
+
+    def test_pool_wait_sheds_non_critical_routes(self, pool_wait):
+        controller = AdmissionController(max_in_flight=10, max_pool_wait=0.1)
+        pool_wait(0.06)
+        assert not controller.admit(EXPENSIVE)
+        assert controller.admit(NORMAL)
+        pool_wait(0.2)
+        assert not controller.admit(NORMAL)
+        assert controller.admit(CRITICAL)
+        assert controller.in_flight == 2
+
+    def test_route_priorities(self):
+        assert route_priority("auth.refresh", "POST") == CRITICAL
+        assert route_priority("account.handle_root", "HEAD") == CRITICAL
+        assert route_priority("account.handle_root", "POST") == NORMAL
+        assert route_priority("transactions.handle_get_transactions", "GET") == EXPENSIVE
+        assert route_priority("", "GET") == NORMAL
+
+class TestLoadShedding:
+    def test_over_capacity_requests_are_rejected(self, app: Flask, client: FlaskClient, access_token: str, pool_wait):
+        controller: AdmissionController = app.extensions["admission"]
+        headers = {"Authorization": f"Bearer {access_token}"}
+        controller.in_flight = int(controller.max_in_flight * 0.5)
+
+        response = client.get("/transactions/", headers=headers)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert client.get("/accounts/", headers=headers).status_code == 200
+        # the admitted requests are released
+        assert controller.in_flight == int(controller.max_in_flight * 0.5)
+
+        controller.in_flight = 0
+        assert client.get("/transactions/", headers=headers).status_code == 200
+
+    def test_liveness_is_never_shed(self, app: Flask, client: FlaskClient, pool_wait):
+        controller: AdmissionController = app.extensions["admission"]
+        controller.in_flight = controller.max_in_flight
+        assert client.get("/healthz").status_code == 200
+        assert controller.in_flight == controller.max_in_flight
+        assert client.get("/readyz").status_code == 503
+
+def test_gunicorn_workers_are_threaded(monkeypatch):
+    monkeypatch.delenv("GUNICORN_THREADS", raising=False)
+    monkeypatch.setenv("ADMISSION_MAX_IN_FLIGHT", "24")
+    settings = runpy.run_path(GUNICORN_CONF)
+    assert settings["worker_class"] == "gthread"
+    # the in-flight requests can reach the limit
+    assert settings["threads"] == 24
+
+    monkeypatch.setenv("GUNICORN_THREADS", "8")
+    assert runpy.run_path(GUNICORN_CONF)["threads"] == 8
+
+def test_pool_waits_are_recorded(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "_pool_wait", 0.0)
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05)
+    before = DB_POOL_WAIT.collect()[0].samples
+
+    def count(samples) -> float:
+        return next(sample.value for sample in samples if sample.name.endswith("_count"))
+
+    with engine.connect() as connection:
+        connection.execute(text("select 1"))
+        # the only connection is checked out, the other thread waits for it until the timeout
+        waiter = threading.Thread(target=lambda: pytest.raises(Exception, engine.connect))
+        waiter.start()
+        waiter.join()
+
+    assert count(DB_POOL_WAIT.collect()[0].samples) == count(before) + 2
+    assert metrics.recent_pool_wait() > 0.005
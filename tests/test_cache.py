@@ -0,0 +1,141 @@
+import socket
+import time
+import pytest
+from typing import Generator
+from flask.testing import FlaskClient
+from sqlalchemy import delete
+from db import db_session, Accounts
+from cache import MemoryBackend, RedisBackend, CacheBackend, set_backend, get_backend, backend_from_url
+from fixtures.resp_server import RespServer
+
+@pytest.fixture
+def resp_server() -> Generator[RespServer, None, None]:
+    server = RespServer().start()
+    yield server
+    server.stop()
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request, app, resp_server: RespServer) -> Generator[CacheBackend, None, None]:
+    previous = get_backend()
+    backend = MemoryBackend() if request.param == "memory" else RedisBackend(port=resp_server.port)
+    set_backend(backend)
+    yield backend
+    set_backend(previous)
+
+def _balance(client: FlaskClient, url: str, access_token: str, account_id: str) -> int:
+    accounts = _get(client, url, access_token)["accounts"]
+    return next(account["balance"] for account in accounts if account["id"] == account_id)
+
+def _get(client: FlaskClient, url: str, access_token: str):
+    response = client.get(url, headers={"Authorization": f"Bearer {access_token}"}, json={})
+    assert response.status_code == 200, response.get_data()
+    return response.get_json()
+
+class TestMemoryBackend:
+    def test_expires(self, monkeypatch):
+        backend = MemoryBackend()
+        backend.set("key", "value", ttl=10)
+        assert backend.get("key") == "value"
+        now = time.monotonic()
+        monkeypatch.setattr("cache.backends.time.monotonic", lambda: now + 11)
+        assert backend.get("key") is None
+        assert len(backend) == 0
+
+    def test_evicts_the_least_recently_used(self):
+        backend = MemoryBackend(max_entries=2)
+        backend.set("a", 1, ttl=10)
+        backend.set("b", 2, ttl=10)
+        backend.get("a")
+        backend.set("c", 3, ttl=10)
+        assert backend.get("b") is None
+        assert backend.get("a") == 1 and backend.get("c") == 3
+
+    def test_only_if_missing(self):
+        backend = MemoryBackend()
+        assert backend.set("key", "first", ttl=10, only_if_missing=True)
+        assert not backend.set("key", "second", ttl=10, only_if_missing=True)
+        assert backend.get("key") == "first"
+        backend.delete("key", "missing")
+        assert backend.get("key") is None
+
+class TestRedisBackend:
+    def test_commands(self, resp_server: RespServer):
+        backend = RedisBackend(port=resp_server.port)
+        assert backend.get("key") is None
+        assert backend.set("key", b"value\r\nwith a newline", ttl=10)
+        assert not backend.set("key", b"other", ttl=10, only_if_missing=True)
+        assert backend.get("key") == b"value\r\nwith a newline"
+        backend.delete("key")
+        assert backend.get("key") is None
+        assert [b"SET", b"key", b"value\r\nwith a newline", b"PX", b"10000"] in resp_server.commands
+
+    def test_from_url(self):
+        backend = backend_from_url("redis://:secret@cache:6380/2")
+        assert (backend.host, backend.port, backend.db, backend.password) == ("cache", 6380, 2, "secret")
+        assert backend_from_url("memory://?max_entries=5").max_entries == 5
+        with pytest.raises(ValueError):
+            backend_from_url("memcached://localhost")
+
+class TestReadCache:
+    def test_reads_are_cached(self, client: FlaskClient, access_token: str, account_id: str, backend: CacheBackend, statements):
+        for url in ["/accounts/", "/users/me", "/transactions/", "/budgets/", "/bills/"]:
+            first = _get(client, url, access_token)
+            statements.clear()
+            assert _get(client, url, access_token) == first
+            # only the data version of the ETag is looked up
+            assert len(statements) == 1, statements
+
+    def test_writes_invalidate(self, client: FlaskClient, access_token: str, account_id: str, backend: CacheBackend):
+        assert _balance(client, "/accounts/", access_token, account_id) == 1000
+        assert _get(client, "/transactions/", access_token)["transactions"] == []
+
+        response = client.post("/transactions/deposit", headers={"Authorization": f"Bearer {access_token}"}, json={"amount": 10, "account_id": account_id})
+        assert response.status_code == 200
+
+        assert _balance(client, "/accounts/", access_token, account_id) == 1010
+        assert len(_get(client, "/transactions/", access_token)["transactions"]) == 1
+        assert _balance(client, "/users/me", access_token, account_id) == 1010
+
+        response = client.post("/bills/", headers={"Authorization": f"Bearer {access_token}"}, json={"biller_name": "biller", "amount": 10, "due_date": "2025-01-01T00:00:00Z"})
+        assert response.status_code == 201
+        assert len(_get(client, "/bills/", access_token)["bills"]) == 1
+
+    def test_transfer_invalidates_the_recipient(self, client: FlaskClient, access_token: str, access_token_2: str, account_id: str, account_id_2: str, backend: CacheBackend):
+        _get(client, "/accounts/", access_token_2)
+        response = client.post("/transactions/transfer", headers={"Authorization": f"Bearer {access_token}"}, json={"amount": 10, "account_id": account_id, "recipient_account_id": account_id_2})
+        assert response.status_code == 200
+
+        assert _balance(client, "/accounts/", access_token_2, account_id_2) == 1011
+
+    def test_account_delete_invalidates(self, client: FlaskClient, admin_access_token: str, admin_account_id: str, backend: CacheBackend):
+        assert admin_account_id in [account["id"] for account in _get(client, "/accounts/", admin_access_token)["accounts"]]
+        response = client.delete(f"/accounts/{admin_account_id}", headers={"Authorization": f"Bearer {admin_access_token}"})
+        assert response.status_code == 200, response.get_data()
+
+        assert admin_account_id not in [account["id"] for account in _get(client, "/accounts/", admin_access_token)["accounts"]]
+
+    def test_authorization_is_not_cached(self, client: FlaskClient, access_token: str, account_id: str, backend: CacheBackend):
+        headers = {"Authorization": f"Bearer {access_token}"}
+        assert client.get(f"/accounts/{account_id}", headers=headers).status_code == 200
+        # deleted by another worker, whose invalidations don't reach this one's memory backend
+        db_session.execute(delete(Accounts).where(Accounts.id == account_id))
+        db_session.commit()
+        db_session.remove()
+
+        assert client.get(f"/accounts/{account_id}", headers=headers).status_code == 401
+
+    def test_cache_is_per_user(self, client: FlaskClient, access_token: str, access_token_2: str, account_id: str, account_id_2: str, backend: CacheBackend):
+        first = _get(client, "/accounts/", access_token)["accounts"]
+        second = _get(client, "/accounts/", access_token_2)["accounts"]
+        assert {account["id"] for account in first}.isdisjoint(account["id"] for account in second)
+
+    def test_unavailable_backend_is_bypassed(self, client: FlaskClient, access_token: str, account_id: str):
+        with socket.socket() as closed:
+            closed.bind(("127.0.0.1", 0))
+            port = closed.getsockname()[1]
+        previous = get_backend()
+        set_backend(RedisBackend(port=port))
+        try:
+            assert _balance(client, "/accounts/", access_token, account_id) == 1000
+        finally:
+            set_backend(previous)
@@ -0,0 +1,101 @@
+import sqlite3
+import time
+import pytest
+from flask.testing import FlaskClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import NullPool
+from db import CircuitBreaker, CircuitOpenError, circuit_breaker, CLOSED, OPEN, HALF_OPEN
+
+class FlakyDatabase:
+    """An SQLite engine whose connections fail while `down`."""
+    def __init__(self, breaker: CircuitBreaker):
+        self.down = False
+        self.attempts = 0
+        self.engine = create_engine("sqlite://", poolclass=NullPool)
+        breaker.watch(self.engine)
+        # after the breaker's listener, like the connection it guards
+        event.listen(self.engine, "do_connect", self.connect)
+
+    def connect(self, dialect, record, cargs, cparams):
+        self.attempts += 1
+        if self.down:
+            raise sqlite3.OperationalError("unable to open database file")
+
+    def query(self):
+        with self.engine.connect() as connection:
+            return connection.execute(text("SELECT 1")).scalar()
+
+@pytest.fixture
+def open_breaker():
+    for _ in range(circuit_breaker.failure_threshold):
+        circuit_breaker.record_failure()
+    yield circuit_breaker
+    circuit_breaker.record_success()
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+        database = FlakyDatabase(breaker)
+        database.down = True
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                database.query()
+        assert breaker.state == OPEN
+
+        # the connection isn't even attempted
+        with pytest.raises(CircuitOpenError) as e:
+            database.query()
+        assert database.attempts == 3
+        assert 59 < e.value.retry_after <= 60
+
+    def test_successes_reset_the_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        database = FlakyDatabase(breaker)
+        for down in [True, False, True, False]:
+            database.down = down
+            if down:
+                with pytest.raises(OperationalError):
+                    database.query()
+            else:
+                assert database.query() == 1
+        assert breaker.state == CLOSED
+
+    def test_half_open_trials(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        database = FlakyDatabase(breaker)
+        database.down = True
+        with pytest.raises(OperationalError):
+            database.query()
+        assert breaker.state == OPEN
+
+        time.sleep(0.06)
+        assert breaker.state == HALF_OPEN
+        # a failed trial opens it again
+        with pytest.raises(OperationalError):
+            database.query()
+        assert breaker.state == OPEN
+
+        time.sleep(0.06)
+        database.down = False
+        assert database.query() == 1
+        assert breaker.state == CLOSED
+
+    def test_half_open_lets_a_limited_number_of_trials_through(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0, half_open_trials=2)
+        breaker.record_failure()
+        breaker.before_connect()
+        breaker.before_connect()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_connect()
+
+class TestOpenBreaker:
+    def test_state_is_reported(self, client: FlaskClient, open_breaker: CircuitBreaker):
+        assert client.get("/").get_json()["database"] == "open"
+        assert "db_circuit_breaker_state 2.0" in client.get("/metrics").get_data(as_text=True)
+
+    def test_writes_fail_fast(self, client: FlaskClient, access_token: str, account_id: str, open_breaker: CircuitBreaker, statements):
+        response = client.post("/transactions/deposit", headers={"Authorization": f"Bearer {access_token}"}, json={"amount": 10, "account_id": account_id})
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+        assert statements == []
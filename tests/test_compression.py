@@ -0,0 +1,70 @@
+import gzip
+import json
+import pytest
+from flask import Flask, Response, jsonify, stream_with_context
+from flask.testing import FlaskClient
+from shared.compression import compressor, encodings
+
+ITEMS = [{"id": str(i), "biller_name": "electricity", "amount": i} for i in range(500)]
+
+@pytest.fixture
+def large_app(app: Flask) -> Flask:
+    @app.route("/test/large")
+    def large():
+        return jsonify({"items": ITEMS})
+
+    @app.route("/test/stream")
+    def stream():
+        def generate():
+            yield '{"items":['
+            yield ",".join(json.dumps(item) for item in ITEMS)
+            yield "]}\n"
+        return Response(stream_with_context(generate()), mimetype="application/json")
+    return app
+
+@pytest.mark.parametrize("encoding", encodings())
+def test_compressor_round_trip(encoding: str):
+    stream = compressor(encoding)
+    data = stream.compress(b"hello ") + stream.flush() + stream.compress(b"world") + stream.finish()
+    match encoding:
+        case "gzip":
+            assert gzip.decompress(data) == b"hello world"
+        case "br":
+            import brotli
+            assert brotli.decompress(data) == b"hello world"
+        case "zstd":
+            import zstandard
+            assert zstandard.ZstdDecompressor().decompressobj().decompress(data) == b"hello world"
+
+def test_gzip(large_app: Flask, client: FlaskClient):
+    response = client.get("/test/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert int(response.headers["Content-Length"]) == len(response.get_data())
+    assert json.loads(gzip.decompress(response.get_data())) == {"items": ITEMS}
+
+def test_not_accepted(large_app: Flask, client: FlaskClient):
+    for headers in [{}, {"Accept-Encoding": "gzip;q=0"}, {"Accept-Encoding": "identity"}]:
+        response = client.get("/test/large", headers=headers)
+        assert "Content-Encoding" not in response.headers
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert response.get_json() == {"items": ITEMS}
+
+def test_small_responses_are_not_compressed(client: FlaskClient):
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.get_json() == {"status": "OK", "database": "closed"}
+
+def test_streamed(large_app: Flask, client: FlaskClient):
+    response = client.get("/test/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert json.loads(gzip.decompress(response.get_data())) == {"items": ITEMS}
+
+def test_users_me(client: FlaskClient, access_token: str, monkeypatch):
+    monkeypatch.setattr("shared.compression.compression_min_size", 0)
+    headers = {"Authorization": f"Bearer {access_token}"}
+    plain = client.get("/users/me", headers=headers)
+    compressed = client.get("/users/me", headers={**headers, "Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compressed.get_data()) == plain.get_data()
@@ -0,0 +1,78 @@
+import time
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import text
+from db import DB, db_session
+from shared import deadlines, degradation
+from shared.deadlines import DeadlineExceeded, deadline, remaining
+
+# counts forever, only a deadline stops it
+ENDLESS_QUERY = text("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c")
+
+class TestDeadline:
+    def test_nested_deadlines_keep_the_soonest(self):
+        assert remaining() is None
+        with deadline(10):
+            assert 9 < remaining() <= 10
+            with deadline(1):
+                assert remaining() <= 1
+            with deadline(60):
+                assert remaining() <= 10
+        assert remaining() is None
+
+    def test_running_statement_is_interrupted(self, app: Flask):
+        start = time.monotonic()
+        with deadline(0.05), pytest.raises(DeadlineExceeded):
+            db_session.execute(ENDLESS_QUERY)
+        assert time.monotonic() - start < 1
+        db_session.rollback()
+        # the connection is still usable, without a deadline
+        assert db_session.execute(text("SELECT 1")).scalar() == 1
+
+    def test_statement_timeout_only_for_other_budgets(self, monkeypatch):
+        monkeypatch.setattr(deadlines, "request_deadline_ms", 5000)
+        # within the connections' statement_timeout
+        assert deadlines.statement_timeout_ms(5) is None
+        assert deadlines.statement_timeout_ms(2.5) is None
+        # a tighter budget, and a longer one
+        assert deadlines.statement_timeout_ms(1) == 1000
+        assert deadlines.statement_timeout_ms(0.0001) == 1
+        assert deadlines.statement_timeout_ms(10) == 10000
+
+    def test_no_statement_starts_after_the_deadline(self, app: Flask, statements):
+        with deadline(0), pytest.raises(DeadlineExceeded):
+            db_session.execute(text("SELECT 1"))
+        assert statements == []
+
+class TestRouteDeadlines:
+    def test_timeouts_are_answered_with_503(self, client: FlaskClient, access_token: str, monkeypatch):
+        monkeypatch.setattr(degradation, "_degraded_until", 0.0)
+        monkeypatch.setitem(deadlines.route_deadlines_ms, "account.handle_root", 0)
+        response = client.get("/accounts/", headers={"Authorization": f"Bearer {access_token}"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        # a slow route isn't a database outage
+        assert not degradation.is_degraded()
+
+        monkeypatch.delitem(deadlines.route_deadlines_ms, "account.handle_root")
+        assert client.get("/accounts/", headers={"Authorization": f"Bearer {access_token}"}).status_code == 200
+
+    def test_route_deadlines(self, monkeypatch):
+        monkeypatch.setattr(deadlines, "request_deadline_ms", 5000)
+        monkeypatch.setitem(deadlines.route_deadlines_ms, "transactions.handle_get_transactions", 10000)
+        assert deadlines.route_deadline("transactions.handle_get_transactions") == 10
+        assert deadlines.route_deadline("account.handle_root") == 5
+
+    def test_statement_timeout_set_for_tight_budgets(self, client: FlaskClient, access_token: str, statements, monkeypatch):
+        headers = {"Authorization": f"Bearer {access_token}"}
+        statements.clear()
+        assert client.get("/accounts/", headers=headers).status_code == 200
+        # the connections' statement_timeout covers the default budget
+        assert not [statement for statement in statements if statement.startswith("SET LOCAL")]
+
+        monkeypatch.setitem(deadlines.route_deadlines_ms, "account.handle_root", deadlines.request_deadline_ms / 4)
+        statements.clear()
+        assert client.get("/accounts/", headers=headers).status_code == 200
+        timeouts = [statement for statement in statements if statement.startswith("SET LOCAL statement_timeout")]
+        assert len(timeouts) == (DB.get_engine().dialect.name == "postgresql")
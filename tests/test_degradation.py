@@ -0,0 +1,104 @@
+import pytest
+from typing import Generator
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from cache import CacheBackend, MemoryBackend, RedisBackend, set_backend, get_backend
+from db import DB
+from shared import degradation
+from fixtures.resp_server import RespServer
+from rbac.route import load_current_user
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request, app, monkeypatch) -> Generator[CacheBackend, None, None]:
+    # the degraded mode is per process, the tests start and end without it
+    monkeypatch.setattr(degradation, "_degraded_until", 0.0)
+    previous = get_backend()
+    server = RespServer().start() if request.param == "redis" else None
+    backend = MemoryBackend() if server is None else RedisBackend(port=server.port)
+    set_backend(backend)
+    yield backend
+    set_backend(previous)
+    if server is not None:
+        server.stop()
+
+class Outage:
+    """Makes every statement fail like with an unreachable server, between `start()` and `stop()`."""
+    def start(self):
+        event.listen(DB.get_engine(), "before_cursor_execute", self._fail)
+
+    def stop(self):
+        if event.contains(DB.get_engine(), "before_cursor_execute", self._fail):
+            event.remove(DB.get_engine(), "before_cursor_execute", self._fail)
+
+    @staticmethod
+    def _fail(conn, cursor, statement, parameters, context, executemany):
+        raise OperationalError(statement, parameters, Exception("server closed the connection unexpectedly"))
+
+@pytest.fixture
+def outage(app) -> Generator[Outage, None, None]:
+    outage = Outage()
+    yield outage
+    outage.stop()
+
+def _headers(access_token: str) -> dict:
+    return {"Authorization": f"Bearer {access_token}"}
+
+def _balance(response, account_id: str) -> int:
+    return next(account["balance"] for account in response.get_json()["accounts"] if account["id"] == account_id)
+
+class TestServeStale:
+    def test_reads_serve_the_last_copy(self, client: FlaskClient, access_token: str, account_id: str, backend: CacheBackend, outage: Outage, statements):
+        for url in ["/accounts/", "/users/me", "/budgets/", "/bills/"]:
+            assert client.get(url, headers=_headers(access_token), json={}).status_code == 200
+        # invalidates the copies, the last ones are still there
+        response = client.post("/transactions/deposit", headers=_headers(access_token), json={"amount": 10, "account_id": account_id})
+        assert response.status_code == 200
+
+        outage.start()
+        for url in ["/accounts/", "/users/me", "/budgets/", "/bills/"]:
+            response = client.get(url, headers=_headers(access_token), json={})
+            assert response.status_code == 200, (url, response.get_data())
+            assert response.headers["Warning"] == '110 - "Response is Stale"'
+            assert int(response.headers["Age"]) >= 0
+            assert "ETag" not in response.headers
+        assert _balance(client.get("/accounts/", headers=_headers(access_token)), account_id) == 1000
+
+    def test_writes_fail_fast(self, client: FlaskClient, access_token: str, account_id: str, backend: CacheBackend, outage: Outage, statements):
+        outage.start()
+        response = client.post("/transactions/deposit", headers=_headers(access_token), json={"amount": 10, "account_id": account_id})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"]
+
+        statements.clear()
+        response = client.post("/transactions/deposit", headers=_headers(access_token), json={"amount": 10, "account_id": account_id})
+        assert response.status_code == 503
+        assert statements == []
+
+    def test_authorization_is_not_served_stale(self, app: Flask, client: FlaskClient, access_token: str, backend: CacheBackend, outage: Outage):
+        assert client.get("/users/me", headers=_headers(access_token)).status_code == 200
+
+        outage.start()
+        # the profile has a copy, the roles and accounts the authorization checks don't
+        assert client.get("/users/me", headers=_headers(access_token)).status_code == 200
+        with app.test_request_context(headers=_headers(access_token)), pytest.raises(OperationalError):
+            load_current_user()
+
+    def test_reads_without_a_copy_are_unavailable(self, client: FlaskClient, access_token: str, account_id: str, backend: CacheBackend, outage: Outage):
+        outage.start()
+        response = client.get("/accounts/", headers=_headers(access_token))
+        assert response.status_code == 503
+        assert "Warning" not in response.headers
+
+    def test_recovers_after_the_cooldown(self, client: FlaskClient, access_token: str, account_id: str, backend: CacheBackend, outage: Outage, monkeypatch):
+        client.get("/accounts/", headers=_headers(access_token))
+        client.post("/transactions/deposit", headers=_headers(access_token), json={"amount": 10, "account_id": account_id})
+        outage.start()
+        assert "Warning" in client.get("/accounts/", headers=_headers(access_token)).headers
+
+        outage.stop()
+        monkeypatch.setattr(degradation, "_degraded_until", 0.0)
+        response = client.get("/accounts/", headers=_headers(access_token))
+        assert "Warning" not in response.headers
+        assert _balance(response, account_id) == 1010
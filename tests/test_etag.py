@@ -0,0 +1,79 @@
+from flask.testing import FlaskClient
+
+def _get(client: FlaskClient, url: str, access_token: str, etag: str = None):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    if etag is not None:
+        headers["If-None-Match"] = etag
+    # GET /bills/ reads its filters from a JSON body
+    return client.get(url, headers=headers, json={})
+
+class TestConditionalGet:
+    def test_not_modified(self, client: FlaskClient, access_token: str, account_id: str, query_budget):
+        for url in ["/accounts/", "/users/me", "/transactions/", "/budgets/", "/bills/"]:
+            response = _get(client, url, access_token)
+            assert response.status_code == 200, response.get_data()
+            etag = response.headers["ETag"]
+            assert etag.startswith('W/"')
+            assert response.headers["Cache-Control"] in ("private, no-cache", "no-cache, private")
+
+            # only the data version is looked up
+            with query_budget(1):
+                response = _get(client, url, access_token, etag)
+            assert response.status_code == 304, url
+            assert response.get_data() == b""
+            assert response.headers["ETag"] == etag
+
+    def test_writes_change_the_etag(self, client: FlaskClient, access_token: str, account_id: str):
+        etag = _get(client, "/transactions/", access_token).headers["ETag"]
+        response = client.post("/transactions/deposit", headers={"Authorization": f"Bearer {access_token}"}, json={"amount": 10, "account_id": account_id})
+        assert response.status_code == 200
+
+        response = _get(client, "/transactions/", access_token, etag)
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert len(response.get_json()["transactions"]) == 1
+
+        etag = response.headers["ETag"]
+        response = client.post("/bills/", headers={"Authorization": f"Bearer {access_token}"}, json={"biller_name": "biller", "amount": 10, "due_date": "2025-01-01T00:00:00Z"})
+        assert response.status_code == 201
+        assert _get(client, "/users/me", access_token, etag).status_code == 200
+
+    def test_transfer_changes_the_recipients_etag(self, client: FlaskClient, access_token: str, access_token_2: str, account_id: str, account_id_2: str):
+        etag = _get(client, "/accounts/", access_token_2).headers["ETag"]
+        response = client.post("/transactions/transfer", headers={"Authorization": f"Bearer {access_token}"}, json={"amount": 10, "account_id": account_id, "recipient_account_id": account_id_2})
+        assert response.status_code == 200
+
+        response = _get(client, "/accounts/", access_token_2, etag)
+        assert response.status_code == 200
+        balances = {account["id"]: account["balance"] for account in response.get_json()["accounts"]}
+        assert balances[account_id_2] == 1011
+
+    def test_account_delete_changes_the_etag(self, client: FlaskClient, admin_access_token: str, admin_account_id: str):
+        etag = _get(client, "/accounts/", admin_access_token).headers["ETag"]
+        response = client.delete(f"/accounts/{admin_account_id}", headers={"Authorization": f"Bearer {admin_access_token}"})
+        assert response.status_code == 200, response.get_data()
+
+        response = _get(client, "/accounts/", admin_access_token, etag)
+        assert response.status_code == 200
+        assert admin_account_id not in [account["id"] for account in response.get_json()["accounts"]]
+
+    def test_bill_filters_change_the_etag(self, client: FlaskClient, access_token: str, account_id: str):
+        response = client.post("/bills/", headers={"Authorization": f"Bearer {access_token}"}, json={"biller_name": "biller", "amount": 10, "due_date": "2025-01-01T00:00:00Z"})
+        assert response.status_code == 201
+        headers = {"Authorization": f"Bearer {access_token}"}
+        etag = client.get("/bills/", headers=headers, json={}).headers["ETag"]
+
+        response = client.get("/bills/", headers={**headers, "If-None-Match": etag}, json={"biller_name": "other"})
+        assert response.status_code == 200
+        assert response.get_json()["bills"] == []
+        assert response.headers["ETag"] != etag
+        assert client.get("/bills/", headers={**headers, "If-None-Match": response.headers["ETag"]}, json={"biller_name": "other"}).status_code == 304
+
+    def test_invalid_bill_filters_are_rejected(self, client: FlaskClient, access_token: str, account_id: str):
+        response = client.get("/bills/", headers={"Authorization": f"Bearer {access_token}"}, json={"amount_min": "many"})
+        assert response.status_code == 400
+        assert "ETag" not in response.headers
+
+    def test_etags_are_per_user(self, client: FlaskClient, access_token: str, access_token_2: str, account_id: str, account_id_2: str):
+        etag = _get(client, "/accounts/", access_token).headers["ETag"]
+        assert _get(client, "/accounts/", access_token_2, etag).status_code == 200
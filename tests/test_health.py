@@ -0,0 +1,59 @@
+import pytest
+from flask.testing import FlaskClient
+from db import circuit_breaker
+from routes import health
+from monitoring import track_queries
+
+@pytest.fixture(autouse=True)
+def fresh_checks():
+    health.database_check.clear()
+    health.tables_check.clear()
+
+def test_liveness_does_no_io(client: FlaskClient):
+    with track_queries() as stats:
+        response = client.get("/healthz")
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "alive"}
+    assert stats.count == 0
+
+def test_readiness(client: FlaskClient):
+    response = client.get("/readyz")
+    assert response.status_code == 200, response.get_json()
+    checks = response.get_json()["checks"]
+    assert checks["database"]["ok"] and checks["database"]["migration"] is None
+    assert checks["pool"] == {"ok": True}
+
+def test_readiness_is_cached(client: FlaskClient):
+    client.get("/readyz")
+    with track_queries() as stats:
+        for _ in range(3):
+            assert client.get("/readyz").status_code == 200
+    assert stats.count == 0
+
+def test_not_ready_while_the_breaker_is_open(client: FlaskClient):
+    for _ in range(circuit_breaker.failure_threshold):
+        circuit_breaker.record_failure()
+    try:
+        response = client.get("/readyz")
+    finally:
+        circuit_breaker.record_success()
+    assert response.status_code == 503
+    assert response.get_json()["checks"]["database"] == {"ok": False, "error": "the circuit breaker is open"}
+
+def test_not_ready_when_the_pool_is_saturated(client: FlaskClient, monkeypatch):
+    monkeypatch.setattr(health, "pool_status", lambda: {"size": 5, "checked_out": 15, "overflow": 10, "saturation": 1.0})
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.get_json()["checks"]["pool"]["ok"] is False
+
+def test_deep_check_is_for_admins(client: FlaskClient, access_token: str, admin_access_token: str):
+    assert client.get("/health/deep").status_code == 401
+    assert client.get("/health/deep", headers={"Authorization": f"Bearer {access_token}"}).status_code in (401, 403)
+
+    response = client.get("/health/deep", headers={"Authorization": f"Bearer {admin_access_token}"})
+    assert response.status_code == 200, response.get_json()
+    checks = response.get_json()["checks"]
+    assert checks["tables"] == {"ok": True, "unreadable": []}
+    assert checks["database"]["circuit_breaker"] == "closed"
+    assert checks["cache"] == {"ok": True, "enabled": False}
+    assert checks["admission"]["in_flight"] == 1
@@ -0,0 +1,103 @@
+import json
+from datetime import datetime, timezone, timedelta
+from typing import List, Generator
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from pydantic import TypeAdapter
+from db import DB, db_session, Users, Accounts, Transactions, TransactionEntries, TransactionCategories, Bills
+from db.bills import get_bills, get_bills_json
+from db.json_listings import sql_json_enabled
+from db.transactions import get_transactions, get_transactions_json, TransactionQuery
+from models import Bill, QueryBillsRequest
+from routes.transactions import transactions_adapter
+from shared.deadlines import DeadlineExceeded
+from shared.json_provider import json_stream_response
+
+on_postgres = pytest.mark.skipif(DB.get_engine().dialect.name != "postgresql", reason="the SQL JSON listings need PostgreSQL")
+
+def _sorted_json(value) -> str:
+    # compact, with the keys sorted like the app's JSON provider
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+@pytest.fixture
+def sql_json(monkeypatch):
+    monkeypatch.setattr("db.json_listings.sql_json_listings", True)
+
+def test_json_stream_response(app: Flask):
+    with app.test_request_context():
+        response = json_stream_response("bills", iter(['{"id":"1"}', ',{"id":"2"}']))
+        assert response.mimetype == "application/json"
+        assert response.is_streamed
+        assert response.get_data() == b'{"bills":[{"id":"1"},{"id":"2"}]}\n'
+
+def test_json_stream_response_without_items(app: Flask):
+    with app.test_request_context():
+        assert json_stream_response("bills", iter([])).get_data() == b'{"bills":[]}\n'
+
+def test_failed_listing_query_is_answered_before_streaming(client: FlaskClient, access_token: str, monkeypatch):
+    def failing_listing(query, current_user):
+        raise DeadlineExceeded()
+        yield
+    monkeypatch.setattr("routes.transactions.sql_json_enabled", lambda: True)
+    monkeypatch.setattr("routes.transactions.db_get_transactions_json", failing_listing)
+    response = client.get("/transactions/", headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == 503
+
+def test_disabled_by_default(app: Flask):
+    assert not sql_json_enabled()
+
+@pytest.mark.skipif(DB.get_engine().dialect.name == "postgresql", reason="checks the fallback of other databases")
+def test_falls_back_to_python(app: Flask, client: FlaskClient, access_token: str, account_id: str, sql_json):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    response = client.post("/transactions/deposit", headers=headers, json={"amount": 102, "account_id": account_id, "category": "test"})
+    assert response.status_code == 200, response.get_data()
+    deposit = response.get_json()["transaction"]
+
+    assert not sql_json_enabled()
+    response = client.get("/transactions/", headers=headers)
+    assert response.status_code == 200
+    assert response.get_json() == {"transactions": [deposit]}
+
+@on_postgres
+class TestPostgres:
+    @pytest.fixture
+    def user_id(self, app: Flask) -> Generator[str, None, None]:
+        user = Users(username="test_user", email="test@example.com", fullname="test user")
+        db_session.add(user)
+        db_session.flush()
+        sender, recipient = Accounts(user_id=user.id, balance=0), Accounts(user_id=user.id, balance=0)
+        db_session.add_all([sender, recipient])
+        db_session.flush()
+
+        timestamp = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        entries = [
+            ("deposit", [(sender, "credit")], timestamp),
+            ("withdraw", [(sender, "debit")], timestamp + timedelta(microseconds=120)),
+            ("transfer", [(sender, "debit"), (recipient, "credit")], timestamp),
+            # the sender isn't always the first entry
+            ("transfer", [(recipient, "credit"), (sender, "debit")], timestamp),
+        ]
+        for transaction_type, accounts, timestamp in entries:
+            transaction = Transactions(transaction_type=transaction_type, timestamp=timestamp)
+            db_session.add(transaction)
+            db_session.flush()
+            db_session.add_all([TransactionEntries(transaction_id=transaction.id, account_id=account.id, entry_type=entry_type, amount=100) for account, entry_type in accounts])
+            db_session.add(TransactionCategories(name='quoted "category"\n', transaction_id=transaction.id))
+
+        db_session.add_all([
+            Bills(user_id=user.id, account_id=sender.id, biller_name="ünïcode", due_date=timestamp, amount=10),
+            Bills(user_id=user.id, account_id=recipient.id, biller_name="biller", due_date=timestamp + timedelta(microseconds=6000), amount=20),
+        ])
+        db_session.commit()
+        yield str(user.id)
+        # the tables are dropped next, release the session's locks like the app's teardown does
+        db_session.remove()
+
+    def test_transactions_are_identical(self, user_id: str):
+        python = _sorted_json(transactions_adapter.dump_python(get_transactions(TransactionQuery(), user_id), mode="json"))
+        assert "[" + "".join(get_transactions_json(TransactionQuery(), user_id)) + "]" == python
+
+    def test_bills_are_identical(self, user_id: str):
+        python = _sorted_json(TypeAdapter(List[Bill]).dump_python(get_bills(user_id, QueryBillsRequest()), mode="json"))
+        assert "[" + "".join(get_bills_json(user_id, QueryBillsRequest())) + "]" == python
@@ -0,0 +1,48 @@
+import json
+from datetime import date, datetime, timezone
+from typing import List, Generator
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from pydantic import TypeAdapter
+from flask.testing import FlaskClient
+from models import Bill
+from shared.json_provider import FastJSONProvider, json_list_response
+
+PAYLOAD = {"b": [1, 2.5, None, True], "a": {"nested": "ünïcode"}, "date": date(2025, 1, 2)}
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def provider(request, monkeypatch) -> Generator[FastJSONProvider, None, None]:
+    if request.param == "stdlib":
+        monkeypatch.setattr("shared.json_provider.orjson", None)
+    # the provider only keeps a weak reference to its app
+    app = Flask(__name__)
+    yield FastJSONProvider(app)
+
+def test_dumps_matches_default_provider(provider: FastJSONProvider):
+    app = Flask(__name__)
+    expected = DefaultJSONProvider(app).dumps(PAYLOAD)
+    assert json.loads(provider.dumps(PAYLOAD)) == json.loads(expected)
+    # keys are sorted like the default provider
+    assert list(json.loads(provider.dumps(PAYLOAD)).keys()) == ["a", "b", "date"]
+
+def test_response(provider: FastJSONProvider):
+    response = provider.response(PAYLOAD)
+    assert response.mimetype == "application/json"
+    assert response.get_data().endswith(b"\n")
+    assert json.loads(response.get_data())["date"] == "Thu, 02 Jan 2025 00:00:00 GMT"
+
+def test_json_list_response(app: Flask):
+    bills = [Bill(id="1", account_id="2", biller_name="electricity", due_date=datetime(2025, 1, 2, tzinfo=timezone.utc), amount=10)]
+    with app.app_context():
+        response = json_list_response("bills", TypeAdapter(List[Bill]), bills)
+    assert response.status_code == 200
+    assert response.mimetype == "application/json"
+    assert json.loads(response.get_data()) == {"bills": [bill.model_dump(mode="json") for bill in bills]}
+    # sorted like the other responses
+    assert list(json.loads(response.get_data())["bills"][0]) == ["account_id", "amount", "biller_name", "due_date", "id"]
+
+def test_app_uses_fast_provider(app: Flask, client: FlaskClient):
+    assert isinstance(app.json, FastJSONProvider)
+    response = client.get("/")
+    assert response.get_json() == {"status": "OK", "database": "closed"}
@@ -0,0 +1,78 @@
+import json
+import logging
+import queue
+import pytest
+from flask.testing import FlaskClient
+from monitoring import JsonFormatter, LOG_RECORDS_DROPPED
+from monitoring.logs import _NonBlockingQueueHandler, _RequestIdFilter, _SamplingFilter
+
+def make_record(name="test", level=logging.INFO, msg="hello %s", args=("world",), **extra) -> logging.LogRecord:
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+@pytest.fixture
+def auth_records():
+    """The records of `auth_jwt`, queued like the app's handler does."""
+    handler = _NonBlockingQueueHandler(queue.Queue())
+    handler.addFilter(_RequestIdFilter())
+    logger = logging.getLogger("auth_jwt")
+    level = logger.level
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    yield handler.queue
+    logger.removeHandler(handler)
+    logger.setLevel(level)
+
+def test_json_formatter():
+    entry = json.loads(JsonFormatter().format(make_record(request_id="req-1", user_id="u1")))
+    assert entry["message"] == "hello world"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "test"
+    assert entry["request_id"] == "req-1"
+    assert entry["user_id"] == "u1"
+    assert "args" not in entry and "exception" not in entry
+
+def test_exceptions_are_kept_apart():
+    handler = _NonBlockingQueueHandler(queue.Queue())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logging.getLogger("test").addHandler(handler)
+        logging.getLogger("test").exception("failed")
+        logging.getLogger("test").removeHandler(handler)
+
+    entry = json.loads(JsonFormatter().format(handler.queue.get_nowait()))
+    assert entry["message"] == "failed"
+    assert "ValueError: boom" in entry["exception"]
+
+def test_full_queue_drops_records():
+    handler = _NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    before = LOG_RECORDS_DROPPED._value.get()
+    handler.handle(make_record())
+    handler.handle(make_record())
+    assert handler.queue.qsize() == 1
+    assert LOG_RECORDS_DROPPED._value.get() == before + 1
+
+def test_sampling():
+    sampling = _SamplingFilter({"auth_jwt": 0.0, "cache": 1.0})
+    assert not sampling.filter(make_record("auth_jwt.route"))
+    # never the warnings
+    assert sampling.filter(make_record("auth_jwt.route", logging.WARNING))
+    assert sampling.filter(make_record("cache.read_cache"))
+    assert sampling.filter(make_record("db"))
+
+def test_rejected_tokens_are_logged_with_the_request_id(client: FlaskClient, auth_records: queue.Queue):
+    response = client.get("/users/me", headers={"X-Request-ID": "req-42"})
+    assert response.status_code == 401
+
+    entry = json.loads(JsonFormatter().format(auth_records.get_nowait()))
+    assert entry["message"] == "rejected a request without a token"
+    assert entry["request_id"] == "req-42"
+    assert entry["path"] == "/users/me"
+
+def test_request_ids_are_generated(client: FlaskClient, auth_records: queue.Queue):
+    client.get("/users/me")
+    client.get("/users/me")
+    first, second = (auth_records.get_nowait().request_id for _ in range(2))
+    assert first and second and first != second
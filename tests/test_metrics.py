@@ -0,0 +1,50 @@
+from flask.testing import FlaskClient
+from prometheus_client import REGISTRY
+
+def sample(name: str, labels: dict) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_metrics_endpoint(client: FlaskClient):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "text/plain" in response.headers.get("content-type")
+    body = response.get_data(as_text=True)
+    assert "http_requests_total" in body
+    assert "http_request_duration_seconds" in body
+    assert "http_requests_in_flight" in body
+
+def test_request_is_counted_by_route(client: FlaskClient, access_token: str):
+    labels = {"blueprint": "users", "endpoint": "users.handle_me", "method": "GET", "status": "200"}
+    before = sample("http_requests_total", labels)
+    response = client.get("/users/me", headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == 200
+    assert sample("http_requests_total", labels) == before + 1
+
+    latency = {"blueprint": "users", "endpoint": "users.handle_me", "method": "GET"}
+    assert sample("http_request_duration_seconds_count", latency) >= 1
+
+def test_unmatched_routes_share_a_label(client: FlaskClient):
+    labels = {"blueprint": "", "endpoint": "unmatched", "method": "GET", "status": "404"}
+    before = sample("http_requests_total", labels)
+    client.get("/foo")
+    client.get("/bar")
+    assert sample("http_requests_total", labels) == before + 2
+
+def test_in_flight_returns_to_zero(client: FlaskClient):
+    client.get("/")
+    assert sample("http_requests_in_flight", {}) == 0
+
+def test_bcrypt_is_measured(client: FlaskClient, test_user):
+    before = sample("bcrypt_duration_seconds_count", {"operation": "check"})
+    client.post("/users/", json={"name": test_user.name, "email_address": test_user.email_address, "password": test_user.password})
+    client.post("/auth/login", json={"email": test_user.email_address, "password": test_user.password})
+    assert sample("bcrypt_duration_seconds_count", {"operation": "check"}) == before + 1
+    assert sample("bcrypt_operations_in_progress", {}) == 0
+
+def test_current_user_cache(client: FlaskClient, access_token: str, account_id: str):
+    hits = sample("cache_requests_total", {"cache": "current_user", "result": "hit"})
+    misses = sample("cache_requests_total", {"cache": "current_user", "result": "miss"})
+    response = client.get(f"/accounts/{account_id}", headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == 200
+    assert sample("cache_requests_total", {"cache": "current_user", "result": "miss"}) == misses + 1
+    assert sample("cache_requests_total", {"cache": "current_user", "result": "hit"}) == hits
@@ -0,0 +1,65 @@
+import os
+import re
+import time
+import threading
+import pytest
+from flask.testing import FlaskClient
+from monitoring import SamplingProfiler
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr("monitoring.profiling.profile_dir", str(tmp_path))
+    monkeypatch.setattr("monitoring.profiling.profile_interval_ms", 0.1)
+    return tmp_path
+
+def test_sampling_profiler():
+    def busy_wait():
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+
+    profiler = SamplingProfiler(threading.get_ident(), 0.001)
+    profiler.start()
+    busy_wait()
+    samples = profiler.stop()
+    assert sum(samples.values()) > 0
+    assert any(stack.endswith("test_profiling.busy_wait") for stack in samples)
+
+def test_admin_can_request_a_profile(client: FlaskClient, admin_access_token: str, profile_dir):
+    response = client.get("/users/me", headers={"Authorization": f"Bearer {admin_access_token}", "X-Profile": "1", "X-Request-ID": "req-1"})
+    assert response.status_code == 200, response.get_data()
+    profile_id = response.headers["X-Profile-Id"]
+    assert profile_id.endswith("-req-1")
+
+    dump = (profile_dir / f"{profile_id}.folded").read_text()
+    assert all(re.match(r"^\S.* \d+$", line) for line in dump.splitlines())
+
+def test_customer_cannot_request_a_profile(client: FlaskClient, access_token: str, profile_dir):
+    response = client.get("/users/me", headers={"Authorization": f"Bearer {access_token}", "X-Profile": "1"})
+    assert response.status_code == 200, response.get_data()
+    assert "X-Profile-Id" not in response.headers
+    assert list(profile_dir.iterdir()) == []
+
+def test_sample_rate(client: FlaskClient, profile_dir, monkeypatch):
+    monkeypatch.setattr("monitoring.profiling.profile_sample_rate", 1.0)
+    response = client.get("/", headers={"X-Request-ID": "../../etc/passwd"})
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+    assert "/" not in profile_id
+    assert (profile_dir / f"{profile_id}.folded").exists()
+
+def test_repeated_request_ids_keep_both_profiles(client: FlaskClient, profile_dir, monkeypatch):
+    monkeypatch.setattr("monitoring.profiling.profile_sample_rate", 1.0)
+    first = client.get("/", headers={"X-Request-ID": "req-1"}).headers["X-Profile-Id"]
+    second = client.get("/", headers={"X-Request-ID": "req-1"}).headers["X-Profile-Id"]
+    assert first != second
+    assert (profile_dir / f"{first}.folded").exists() and (profile_dir / f"{second}.folded").exists()
+
+def test_only_the_latest_profiles_are_kept(client: FlaskClient, profile_dir, monkeypatch):
+    monkeypatch.setattr("monitoring.profiling.profile_sample_rate", 1.0)
+    monkeypatch.setattr("monitoring.profiling.profile_max_files", 2)
+    for age, name in enumerate(("oldest", "older")):
+        (profile_dir / f"{name}.folded").write_text("")
+        os.utime(profile_dir / f"{name}.folded", (age, age))
+    profile_id = client.get("/").headers["X-Profile-Id"]
+    assert sorted(path.name for path in profile_dir.iterdir()) == sorted(["older.folded", f"{profile_id}.folded"])
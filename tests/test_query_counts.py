@@ -0,0 +1,152 @@
+from typing import List
+import pytest
+from flask.testing import FlaskClient
+from sqlalchemy.exc import DBAPIError
+from db import DB
+
+# The write endpoints build their responses from the instances they just flushed, so none of
+# them should issue a SELECT after COMMIT. The expected counts below are the minimum number of
+# statements each endpoint needs: one lookup per referenced row plus the writes themselves,
+# and one upsert of the data version of the users whose data changed (see db/versions.py).
+
+def _selects_after_write(statements: List[str]) -> List[str]:
+    first_write = next(i for i, s in enumerate(statements) if not s.lstrip().upper().startswith("SELECT"))
+    return [s for s in statements[first_write:] if s.lstrip().upper().startswith("SELECT")]
+
+class TestAccountWrites:
+    def test_create_account(self, client: FlaskClient, access_token: str, statements: List[str]):
+        statements.clear()
+        response = client.post("/accounts/", headers={"Authorization": f"Bearer {access_token}"}, json={"balance": 100})
+        assert response.status_code == 201, response.get_data()
+        # INSERT ... RETURNING id, created_at, updated_at, and the data version
+        assert len(statements) == 2, statements
+        assert response.get_json()["account"]["created_at"] is not None
+
+    def test_update_account(self, client: FlaskClient, access_token: str, account_id: str, statements: List[str]):
+        statements.clear()
+        response = client.put(f"/accounts/{account_id}", headers={"Authorization": f"Bearer {access_token}"}, json={"balance": 100})
+        assert response.status_code == 200, response.get_data()
+        assert len(statements) == 3, statements
+        assert _selects_after_write(statements) == []
+
+    def test_update_default_account(self, client: FlaskClient, access_token: str, statements: List[str]):
+        statements.clear()
+        response = client.put("/accounts/", headers={"Authorization": f"Bearer {access_token}"}, json={"balance": 100})
+        assert response.status_code == 200, response.get_data()
+        # the default account is looked up with a single join on the user
+        assert len(statements) == 3, statements
+        assert _selects_after_write(statements) == []
+
+class TestUserWrites:
+    def test_create_user(self, client: FlaskClient, statements: List[str]):
+        statements.clear()
+        response = client.post("/users/", json={"name": "foo", "email_address": "foo@example.com", "password": "password"})
+        assert response.status_code == 201, response.get_data()
+        # user, default account, credential and the default_account_id back-reference
+        assert len(statements) == 5, statements
+        assert _selects_after_write(statements) == []
+
+    def test_update_user(self, client: FlaskClient, access_token: str, statements: List[str]):
+        statements.clear()
+        response = client.put("/users/me", headers={"Authorization": f"Bearer {access_token}"}, json={"name": "updated", "email_address": "test@example.com"})
+        assert response.status_code == 200, response.get_data()
+        assert len(statements) == 3, statements
+        assert _selects_after_write(statements) == []
+
+class TestTransactionWrites:
+    def test_deposit(self, client: FlaskClient, access_token: str, account_id: str, statements: List[str]):
+        statements.clear()
+        response = client.post("/transactions/deposit", headers={"Authorization": f"Bearer {access_token}"}, json={"amount": 10, "account_id": account_id})
+        assert response.status_code == 200, response.get_data()
+        # current user, account, balance update, transaction RETURNING timestamp, category, entry
+        assert len(statements) == 7, statements
+        assert response.get_json()["transaction"]["timestamp"] is not None
+        assert _selects_after_write(statements) == []
+
+    def test_withdraw(self, client: FlaskClient, access_token: str, account_id: str, statements: List[str]):
+        statements.clear()
+        response = client.post("/transactions/withdraw", headers={"Authorization": f"Bearer {access_token}"}, json={"amount": 10, "account_id": account_id})
+        assert response.status_code == 200, response.get_data()
+        assert len(statements) == 7, statements
+        assert response.get_json()["transaction"]["timestamp"] is not None
+        assert _selects_after_write(statements) == []
+
+    def test_transfer(self, client: FlaskClient, access_token: str, account_id: str, account_id_2: str, statements: List[str]):
+        statements.clear()
+        response = client.post("/transactions/transfer", headers={"Authorization": f"Bearer {access_token}"}, json={"amount": 10, "account_id": account_id, "recipient_account_id": account_id_2})
+        assert response.status_code == 200, response.get_data()
+        # both accounts, their balance updates, the transaction, its category and both entries,
+        # and the data versions of both users in one upsert. The updates compute the balances in
+        # the database, one statement each. PostgreSQL inserts both entries in one statement
+        entries = 1 if DB.get_engine().dialect.name == "postgresql" else 2
+        assert len(statements) == 8 + entries, statements
+        assert response.get_json()["transaction"]["timestamp"] is not None
+        assert _selects_after_write(statements) == []
+
+class TestBudgetWrites:
+    def test_create_and_update_budget(self, client: FlaskClient, access_token: str, statements: List[str]):
+        statements.clear()
+        response = client.post("/budgets/", headers={"Authorization": f"Bearer {access_token}"}, json={"name": "budget", "amount": 10, "start_date": "2025-01-01T00:00:00Z", "end_date": "2025-02-01T00:00:00Z"})
+        assert response.status_code == 200, response.get_data()
+        assert len(statements) == 3, statements
+        budget_id = response.get_json()["budget"]["id"]
+
+        statements.clear()
+        response = client.put(f"/budgets/{budget_id}", headers={"Authorization": f"Bearer {access_token}"}, json={"name": "updated"})
+        assert response.status_code == 200, response.get_data()
+        assert len(statements) == 3, statements
+        assert _selects_after_write(statements) == []
+
+class TestBillWrites:
+    def test_create_and_update_bill(self, client: FlaskClient, access_token: str, statements: List[str]):
+        statements.clear()
+        response = client.post("/bills/", headers={"Authorization": f"Bearer {access_token}"}, json={"biller_name": "biller", "amount": 10, "due_date": "2025-01-01T00:00:00Z"})
+        assert response.status_code == 201, response.get_data()
+        assert len(statements) == 3, statements
+        bill_id = response.get_json()["bill"]["id"]
+
+        statements.clear()
+        response = client.put(f"/bills/{bill_id}", headers={"Authorization": f"Bearer {access_token}"}, json={"biller_name": "updated"})
+        assert response.status_code == 200, response.get_data()
+        assert len(statements) == 4, statements
+        assert _selects_after_write(statements) == []
+
+class TestReadBudgets:
+    def test_get_accounts(self, client: FlaskClient, access_token: str, account_id: str, query_budget):
+        # the data version, and the accounts selected directly without loading the user first
+        with query_budget(2):
+            response = client.get("/accounts/", headers={"Authorization": f"Bearer {access_token}"})
+        assert response.status_code == 200, response.get_data()
+
+    def test_get_me(self, client: FlaskClient, access_token: str, query_budget):
+        with query_budget(2):
+            response = client.get("/users/me", headers={"Authorization": f"Bearer {access_token}"})
+        assert response.status_code == 200, response.get_data()
+
+    def test_get_transactions(self, client: FlaskClient, access_token: str, account_id: str, query_budget):
+        for _ in range(5):
+            response = client.post("/transactions/deposit", headers={"Authorization": f"Bearer {access_token}"}, json={"amount": 10, "account_id": account_id})
+            assert response.status_code == 200, response.get_data()
+
+        # entries and categories are joined, so the count doesn't grow with the number of rows
+        with query_budget(2):
+            response = client.get("/transactions/", headers={"Authorization": f"Bearer {access_token}"})
+        assert response.status_code == 200, response.get_data()
+        assert len(response.get_json()["transactions"]) == 5
+
+class TestRequestInstrumentation:
+    def test_repeated_statements_are_reported(self, client: FlaskClient, access_token: str, account_id: str, account_id_2: str, monkeypatch, caplog):
+        monkeypatch.setattr("monitoring.queries.query_repeat_threshold", 2)
+        with caplog.at_level("WARNING", logger="monitoring.queries"):
+            # a transfer looks up both accounts with the same statement
+            response = client.post("/transactions/transfer", headers={"Authorization": f"Bearer {access_token}"}, json={"amount": 10, "account_id": account_id, "recipient_account_id": account_id_2})
+        assert response.status_code == 200, response.get_data()
+        assert any("executed 2 times" in record.getMessage() for record in caplog.records)
+
+    def test_failed_statements_leave_no_start_time(self, app):
+        with DB.get_engine().connect() as connection:
+            with pytest.raises(DBAPIError):
+                connection.exec_driver_sql("SELECT * FROM no_such_table")
+            connection.rollback()
+            connection.exec_driver_sql("SELECT 1")
+            assert connection.info.get("query_start_time") == []
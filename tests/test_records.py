@@ -0,0 +1,41 @@
+import dataclasses
+from datetime import datetime, timezone
+from typing import List
+import pytest
+from pydantic import TypeAdapter
+from db.records import AccountRecord, UserRecord, TransactionRecord
+from models import Transaction, UserInformation
+
+NOW = datetime(2025, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc)
+
+@pytest.fixture
+def user() -> UserRecord:
+    account = AccountRecord(id="1", user_id="7", balance=100, created_at=NOW, updated_at=NOW)
+    return UserRecord(name="test_user", fullname=None, email_address="test@example.com", roles=("customer",), default_account=account, accounts=(account,))
+
+def test_records_are_slotted_and_frozen(user: UserRecord):
+    assert not hasattr(user, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        user.name = "changed"
+
+def test_owns_account(user: UserRecord):
+    assert user.owns_account("1")
+    assert not user.owns_account("2")
+
+def test_user_to_model(user: UserRecord):
+    model = user.to_model()
+    assert isinstance(model, UserInformation)
+    assert model.roles == ["customer"]
+    assert model.default_account.model_dump() == model.accounts[0].model_dump() == {
+        "id": "1", "user_id": "7", "balance": 100, "created_at": NOW.isoformat(), "updated_at": NOW.isoformat(),
+    }
+
+@pytest.mark.parametrize("recipient_id", [None, "2"])
+def test_transaction_serializes_like_the_model(recipient_id):
+    record = TransactionRecord(id="1", account_id="3", transaction_type="transfer", amount=10, timestamp=NOW, recipient_id=recipient_id, category="test")
+    assert TypeAdapter(List[TransactionRecord]).dump_json([record]) == TypeAdapter(List[Transaction]).dump_json([record.to_model()])
+
+def test_naive_timestamp_serializes_like_the_model():
+    # SQLite doesn't keep the timezone
+    record = TransactionRecord(id="1", account_id="3", transaction_type="deposit", amount=10, timestamp=NOW.replace(tzinfo=None), category="test")
+    assert TypeAdapter(List[TransactionRecord]).dump_json([record]) == TypeAdapter(List[Transaction]).dump_json([record.to_model()])
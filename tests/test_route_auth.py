@@ -81,6 +81,14 @@ def test_refresh_token_success(app):
         decoded = decode_token(data["access_token"])
         assert decoded["sub"] == "foo"
 
+def test_refresh_token_from_login(client, test_user):
+    create_user(test_user)
+    tokens = client.post("/auth/login", json={"email": test_user.email_address, "password": test_user.password}).get_json()
+
+    # the user ids are integers, the refresh token must still carry a string subject
+    response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200, response.get_data()
+
 def test_refresh_token_invalid(app):
     client = app.test_client()
     
@@ -0,0 +1,63 @@
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient, FlaskCliRunner
+from sqlalchemy import text
+from db import DB
+from db.seed import SeedPlan, seed, zipf_cum_weights
+
+PLAN = SeedPlan(users=20, accounts_per_user=3, transactions=2000, batch_size=500)
+
+def table(statement: str) -> list:
+    with DB.get_engine().connect() as connection:
+        return [tuple(row) for row in connection.execute(text(statement))]
+
+def test_zipf_weights():
+    weights = zipf_cum_weights(4, 1.0)
+    assert weights == pytest.approx([1, 1.5, 1.5 + 1 / 3, 1.5 + 1 / 3 + 0.25])
+    assert zipf_cum_weights(3, 0.0) == [1, 2, 3]
+
+def test_seed(app: Flask):
+    rows = seed(PLAN)
+    assert rows["users"] == 20
+    assert rows["accounts"] == 60
+    assert rows["transactions"] == 2000
+    assert rows["transaction_categories"] == 2000
+    assert rows["transaction_entries"] > 2000
+    assert rows["budgets"] == 40 and rows["bills"] == 60
+
+    # the balances are the sum of the ledger, and never went negative
+    mismatched = table("""
+        SELECT accounts.id FROM accounts LEFT JOIN transaction_entries ON transaction_entries.account_id = accounts.id
+        GROUP BY accounts.id, accounts.balance
+        HAVING accounts.balance != COALESCE(SUM(CASE WHEN entry_type = 'credit' THEN amount ELSE -amount END), 0)
+    """)
+    assert mismatched == []
+    assert table("SELECT COUNT(*) FROM accounts WHERE balance < 0") == [(0,)]
+    assert table("SELECT COUNT(*) FROM users WHERE default_account_id IS NULL") == [(0,)]
+
+def test_activity_is_skewed(app: Flask):
+    seed(PLAN)
+    counts = [count for count, in table("SELECT COUNT(*) FROM transaction_entries GROUP BY account_id ORDER BY 1 DESC")]
+    # a tenth of the accounts get more than half of the entries
+    assert sum(counts[:6]) > sum(counts) / 2
+
+def test_seed_is_deterministic(app: Flask):
+    seed(PLAN)
+    first = table("SELECT account_id, amount, entry_type FROM transaction_entries ORDER BY entry_id")
+    again = seed(PLAN)
+    # appended after the existing rows, with the same values
+    second = table(f"SELECT account_id - 60, amount, entry_type FROM transaction_entries WHERE entry_id > {len(first)} ORDER BY entry_id")
+    assert again["transaction_entries"] == len(first)
+    assert second == first
+
+def test_seeded_users_can_log_in(app: Flask, client: FlaskClient, runner: FlaskCliRunner):
+    result = runner.invoke(args=["seed", "--users", "2", "--transactions", "50", "--seed", "7"])
+    assert result.exit_code == 0, result.output
+    assert "transactions: 50 rows" in result.output
+
+    user_id, = table("SELECT MAX(id) FROM users")[0]
+    response = client.post("/auth/login", json={"email": f"seed{user_id}@example.com", "password": "password"})
+    assert response.status_code == 200, response.get_data()
+    me = client.get("/accounts/", headers={"Authorization": f"Bearer {response.get_json()['access_token']}"})
+    assert me.status_code == 200, me.get_data()
+    assert len(me.get_json()["accounts"]) == 2
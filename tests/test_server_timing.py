@@ -0,0 +1,51 @@
+import re
+import time
+from typing import Dict
+from flask.testing import FlaskClient
+from app import create_app
+from monitoring import PhaseTimer
+
+def parse(header: str) -> Dict[str, float]:
+    return {name: float(duration) for name, duration in re.findall(r"(\w+);dur=([\d.]+)", header)}
+
+def test_nested_phases_are_exclusive():
+    timer = PhaseTimer()
+    timer.start("auth")
+    time.sleep(0.01)
+    timer.start("db")
+    time.sleep(0.02)
+    timer.end("db")
+    timer.end("auth")
+    assert 0.01 <= timer.durations["auth"] < 0.02
+    assert timer.durations["db"] >= 0.02
+    # a phase that isn't the current one isn't ended
+    timer.end("validation")
+    assert "validation" not in timer.durations
+
+def test_phases_of_a_request(client: FlaskClient, access_token: str, account_id: str):
+    response = client.post("/transactions/deposit", headers={"Authorization": f"Bearer {access_token}"}, json={"amount": 10, "account_id": account_id})
+    assert response.status_code == 200, response.get_data()
+
+    header = response.headers["Server-Timing"]
+    phases = parse(header)
+    assert {"auth", "db", "validation", "serialization", "total"} <= set(phases)
+    # each duration is rounded to 0.01ms
+    assert sum(duration for name, duration in phases.items() if name != "total") <= phases["total"] + 0.05
+    assert re.search(r'db;dur=[\d.]+;desc="\d+ queries"', header)
+
+def test_statement_count(client: FlaskClient, access_token: str):
+    response = client.get("/users/me", headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == 200, response.get_data()
+    assert 'desc="2 queries"' in response.headers["Server-Timing"]
+
+def test_request_id(client: FlaskClient):
+    response = client.get("/", headers={"X-Request-ID": "req-7"})
+    assert response.headers["X-Request-ID"] == "req-7"
+    generated = client.get("/").headers["X-Request-ID"]
+    assert generated and generated != client.get("/").headers["X-Request-ID"]
+
+def test_server_timing_can_be_disabled(monkeypatch):
+    monkeypatch.setattr("monitoring.timing.server_timing", False)
+    response = create_app().test_client().get("/")
+    assert "Server-Timing" not in response.headers
+    assert "X-Request-ID" in response.headers
@@ -0,0 +1,99 @@
+import threading
+import pytest
+from typing import List
+from cache import single_flight
+from cache.single_flight import _Flight, _flights
+from db.versions import _listeners
+
+@pytest.fixture
+def waiting(monkeypatch) -> threading.Semaphore:
+    """Released by every call that starts waiting for a running flight."""
+    waiting = threading.Semaphore(0)
+
+    class Done(threading.Event):
+        def wait(self, timeout=None):
+            waiting.release()
+            return super().wait(timeout)
+
+    init = _Flight.__init__
+    def counted_init(self):
+        init(self)
+        self.done = Done()
+    monkeypatch.setattr(_Flight, "__init__", counted_init)
+    return waiting
+
+def _wait_for_waiters(waiting: threading.Semaphore, count: int):
+    for _ in range(count):
+        assert waiting.acquire(timeout=5), f"expected {count} waiting calls"
+
+def _run(target, count: int) -> List[threading.Thread]:
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_the_result(self, waiting: threading.Semaphore):
+        release, calls, results = threading.Event(), [], []
+
+        @single_flight("user_id")
+        def read(user_id: str, limit: int = 10) -> List[int]:
+            calls.append(user_id)
+            if (user_id, limit) == ("1", 10):
+                release.wait(5)
+            return [1, 2]
+
+        threads = _run(lambda: results.append(read("1")), 5)
+        _wait_for_waiters(waiting, 4)
+        # other users and other arguments run their own queries
+        assert read("2") == [1, 2]
+        assert read("1", limit=5) == [1, 2]
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert calls == ["1", "2", "1"]
+        assert len(results) == 5 and all(result is results[0] for result in results)
+        assert not _flights
+
+    def test_exceptions_are_shared(self, waiting: threading.Semaphore):
+        release, errors = threading.Event(), []
+
+        @single_flight("user_id")
+        def read(user_id: str):
+            release.wait(5)
+            raise LookupError(user_id)
+
+        def call():
+            with pytest.raises(LookupError) as e:
+                read("1")
+            errors.append(e.value)
+
+        threads = _run(call, 3)
+        _wait_for_waiters(waiting, 2)
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert len(errors) == 3 and all(error is errors[0] for error in errors)
+
+    def test_calls_after_a_write_start_a_new_flight(self, waiting: threading.Semaphore):
+        release, calls = threading.Event(), []
+
+        @single_flight("user_id")
+        def read(user_id: str) -> int:
+            calls.append(user_id)
+            if len(calls) == 1:
+                release.wait(5)
+            return len(calls)
+
+        threads = _run(lambda: read(1), 2)
+        _wait_for_waiters(waiting, 1)
+        for listener in _listeners:
+            listener({1})
+        # the flight that started before the write isn't joined anymore
+        assert read(1) == 2
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert calls == [1, 1]
+        assert not _flights
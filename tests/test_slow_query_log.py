@@ -0,0 +1,60 @@
+import json
+import pytest
+from typing import List
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy.exc import DBAPIError
+from db import DB
+from monitoring.slow_queries import redact
+
+@pytest.fixture
+def slow_query_records(monkeypatch, caplog) -> List[dict]:
+    # every statement is "slow" with a zero threshold
+    monkeypatch.setattr("monitoring.slow_queries.slow_query_threshold_ms", 0)
+    monkeypatch.setattr("monitoring.slow_queries.slow_query_sample_rate", 1.0)
+    caplog.set_level("WARNING", logger="monitoring.slow_queries")
+    return caplog
+
+def test_redact():
+    assert redact(("secret", 10, None)) == ["<str>", "<int>", None]
+    assert redact({"email": "foo@example.com"}) == {"email": "<str>"}
+
+def test_slow_bills_query_is_logged(client: FlaskClient, access_token: str, slow_query_records):
+    slow_query_records.clear()
+    response = client.get("/bills/", headers={"Authorization": f"Bearer {access_token}"}, json={})
+    assert response.status_code == 200, response.get_data()
+
+    records = [json.loads(record.getMessage()) for record in slow_query_records.records]
+    bills = [record for record in records if "FROM bills" in record["statement"]]
+    assert len(bills) == 1
+    assert bills[0]["duration_ms"] >= 0
+    assert bills[0]["plan"], "the plan of a SELECT should be captured"
+    # positional on SQLite, named on PostgreSQL
+    parameters = bills[0]["parameters"]
+    assert list(parameters.values() if isinstance(parameters, dict) else parameters) == ["<str>"]
+
+def test_writes_are_not_explained(client: FlaskClient, slow_query_records):
+    slow_query_records.clear()
+    response = client.post("/users/", json={"name": "foo", "email_address": "foo@example.com", "password": "secret-password"})
+    assert response.status_code == 201, response.get_data()
+
+    records = [json.loads(record.getMessage()) for record in slow_query_records.records]
+    assert len(records) > 0
+    assert all(record["plan"] is None for record in records)
+    assert all("secret-password" not in record.getMessage() and "foo@example.com" not in record.getMessage() for record in slow_query_records.records)
+
+def test_sampling(client: FlaskClient, access_token: str, slow_query_records, monkeypatch):
+    monkeypatch.setattr("monitoring.slow_queries.slow_query_sample_rate", 0.0)
+    slow_query_records.clear()
+    response = client.get("/bills/", headers={"Authorization": f"Bearer {access_token}"}, json={})
+    assert response.status_code == 200, response.get_data()
+    assert slow_query_records.records == []
+
+def test_failed_statements_leave_no_start_time(app: Flask):
+    with DB.get_engine().connect() as connection:
+        for _ in range(3):
+            with pytest.raises(DBAPIError):
+                connection.exec_driver_sql("SELECT * FROM no_such_table")
+            connection.rollback()
+        connection.exec_driver_sql("SELECT 1")
+        assert connection.info.get("slow_query_start_time") == []
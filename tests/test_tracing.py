@@ -0,0 +1,79 @@
+import json
+import pytest
+from typing import Generator
+from flask.testing import FlaskClient
+from monitoring import InMemoryExporter, FileExporter, set_exporter, get_exporter, span
+
+@pytest.fixture
+def exporter() -> Generator[InMemoryExporter, None, None]:
+    previous = get_exporter()
+    exporter = InMemoryExporter()
+    set_exporter(exporter)
+    yield exporter
+    set_exporter(previous)
+
+def test_transfer_spans(client: FlaskClient, access_token: str, account_id: str, account_id_2: str, exporter: InMemoryExporter):
+    exporter.clear()
+    response = client.post("/transactions/transfer", headers={"Authorization": f"Bearer {access_token}"}, json={"amount": 10, "account_id": account_id, "recipient_account_id": account_id_2})
+    assert response.status_code == 200, response.get_data()
+
+    spans = {span.name: span for span in exporter.spans}
+    for name in ["jwt_required", "load_current_user", "db.users.get_user_record", "db.transactions.transfer", "serialize", "POST /transactions/transfer"]:
+        assert name in spans, exporter.names()
+
+    root = spans["POST /transactions/transfer"]
+    assert root.parent_id is None
+    assert root.attributes["status"] == 200
+    assert all(span.trace_id == root.trace_id for span in exporter.spans)
+    assert spans["load_current_user"].parent_id == root.span_id
+    assert spans["db.users.get_user_record"].parent_id == spans["load_current_user"].span_id
+    # the root span finishes last
+    assert exporter.spans[-1] is root
+    assert response.headers["traceparent"] == f"00-{root.trace_id}-{root.span_id}-01"
+
+def test_incoming_traceparent_is_continued(client: FlaskClient, exporter: InMemoryExporter):
+    trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+    response = client.get("/", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+    assert response.status_code == 200
+
+    root = exporter.spans[-1]
+    assert root.trace_id == trace_id
+    assert root.parent_id == parent_id
+    assert response.headers["traceparent"].startswith(f"00-{trace_id}-")
+
+def test_malformed_traceparent_starts_a_new_trace(client: FlaskClient, exporter: InMemoryExporter):
+    response = client.get("/", headers={"traceparent": "garbage"})
+    assert response.status_code == 200
+    assert exporter.spans[-1].parent_id is None
+
+def test_span_records_errors(exporter: InMemoryExporter):
+    with pytest.raises(ValueError):
+        with span("failing"):
+            raise ValueError("boom")
+    assert exporter.spans[-1].attributes["error"] == "ValueError"
+
+def test_disabled_tracing(client: FlaskClient):
+    previous = get_exporter()
+    set_exporter(None)
+    try:
+        response = client.get("/")
+        assert response.status_code == 200
+        assert "traceparent" not in response.headers
+    finally:
+        set_exporter(previous)
+
+def test_file_exporter(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    previous = get_exporter()
+    set_exporter(FileExporter(str(path)))
+    try:
+        with span("outer"):
+            with span("inner", key="value"):
+                pass
+    finally:
+        set_exporter(previous)
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["inner", "outer"]
+    assert lines[0]["parent_id"] == lines[1]["span_id"]
+    assert lines[0]["attributes"] == {"key": "value"}
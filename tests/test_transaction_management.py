@@ -1,9 +1,14 @@
 from typing import List
+from urllib.parse import quote
 from flask.testing import FlaskClient
 from models import Transaction, Account
 from pytest import fail
 from fixtures.transactions import deposit, withdraw, transfer, transactions
 from auth_jwt import create_access_token
+from sqlalchemy import delete, select, update
+from db import db_session, Accounts, TransactionCategories
+from db import transactions as db_transactions
+from models import DepositRequest
 
 
 class TestWithdraw:
@@ -701,70 +706,70 @@ class TestGetTransactions:
             - Response contains transactions within specified range
             - Number of transactions matches expected count
         """
-        response = client.get(f"/transactions?range_from={transactions[0].timestamp.isoformat()}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
+        response = client.get(f"/transactions?range_from={quote(transactions[0].timestamp.isoformat())}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
         assert response.status_code == 200
         assert "application/json" in response.headers.get("content-type")        
         response_json = response.get_json()
         assert "transactions" in response_json
         assert len(response_json["transactions"]) == 3
 
-        response = client.get(f"/transactions?range_from={transactions[1].timestamp.isoformat()}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
+        response = client.get(f"/transactions?range_from={quote(transactions[1].timestamp.isoformat())}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
         assert response.status_code == 200
         assert "application/json" in response.headers.get("content-type")        
         response_json = response.get_json()
         assert "transactions" in response_json
         assert len(response_json["transactions"]) == 2
 
-        response = client.get(f"/transactions?range_from={transactions[2].timestamp.isoformat()}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
+        response = client.get(f"/transactions?range_from={quote(transactions[2].timestamp.isoformat())}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
         assert response.status_code == 200
         assert "application/json" in response.headers.get("content-type")        
         response_json = response.get_json()
         assert "transactions" in response_json
         assert len(response_json["transactions"]) == 1
 
-        response = client.get(f"/transactions?range_to={transactions[2].timestamp.isoformat()}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
+        response = client.get(f"/transactions?range_to={quote(transactions[2].timestamp.isoformat())}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
         assert response.status_code == 200
         assert "application/json" in response.headers.get("content-type")        
         response_json = response.get_json()
         assert "transactions" in response_json
         assert len(response_json["transactions"]) == 3
 
-        response = client.get(f"/transactions?range_to={transactions[1].timestamp.isoformat()}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
+        response = client.get(f"/transactions?range_to={quote(transactions[1].timestamp.isoformat())}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
         assert response.status_code == 200
         assert "application/json" in response.headers.get("content-type")
         response_json = response.get_json()
         assert "transactions" in response_json
         assert len(response_json["transactions"]) == 2
 
-        response = client.get(f"/transactions?range_to={transactions[0].timestamp.isoformat()}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
+        response = client.get(f"/transactions?range_to={quote(transactions[0].timestamp.isoformat())}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
         assert response.status_code == 200
         assert "application/json" in response.headers.get("content-type")
         response_json = response.get_json()
         assert "transactions" in response_json
         assert len(response_json["transactions"]) == 1
 
-        response = client.get(f"/transactions?range_from={transactions[0].timestamp.isoformat()}&&range_to={transactions[2].timestamp.isoformat()}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
+        response = client.get(f"/transactions?range_from={quote(transactions[0].timestamp.isoformat())}&&range_to={quote(transactions[2].timestamp.isoformat())}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
         assert response.status_code == 200
         assert "application/json" in response.headers.get("content-type")
         response_json = response.get_json()
         assert "transactions" in response_json
         assert len(response_json["transactions"]) == 3
 
-        response = client.get(f"/transactions?range_from={transactions[1].timestamp.isoformat()}&&range_to={transactions[2].timestamp.isoformat()}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
+        response = client.get(f"/transactions?range_from={quote(transactions[1].timestamp.isoformat())}&&range_to={quote(transactions[2].timestamp.isoformat())}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
         assert response.status_code == 200
         assert "application/json" in response.headers.get("content-type")
         response_json = response.get_json()
         assert "transactions" in response_json
         assert len(response_json["transactions"]) == 2
 
-        response = client.get(f"/transactions?range_from={transactions[0].timestamp.isoformat()}&&range_to={transactions[1].timestamp.isoformat()}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
+        response = client.get(f"/transactions?range_from={quote(transactions[0].timestamp.isoformat())}&&range_to={quote(transactions[1].timestamp.isoformat())}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
         assert response.status_code == 200
         assert "application/json" in response.headers.get("content-type")
         response_json = response.get_json()
         assert "transactions" in response_json
         assert len(response_json["transactions"]) == 2
 
-        response = client.get(f"/transactions?range_from={transactions[0].timestamp.isoformat()}&&range_to={transactions[0].timestamp.isoformat()}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
+        response = client.get(f"/transactions?range_from={quote(transactions[0].timestamp.isoformat())}&&range_to={quote(transactions[0].timestamp.isoformat())}", headers={"Authorization": f"Bearer {access_token}"}, follow_redirects=True)
         assert response.status_code == 200
         assert "application/json" in response.headers.get("content-type")
         response_json = response.get_json()
@@ -875,4 +880,69 @@ class TestGetTransaction:
         assert "application/json" in response.headers.get("content-type")
         response_json = response.get_json()
         assert "error" in response_json
-        assert "transaction not found" in response_json["error"]
\ No newline at end of file
+        assert "transaction not found" in response_json["error"]
+
+class TestBalances:
+    """Test suite for the balance updates of the postings."""
+
+    def balance(self, account_id: str) -> int:
+        db_session.remove()
+        try:
+            return db_session.scalar(select(Accounts.balance).where(Accounts.id == account_id))
+        finally:
+            db_session.remove()
+
+    def test_concurrent_posting_is_kept(self, account_id: str):
+        """A deposit adds to the balance in the database, not to the one it loaded.
+
+        Verifies:
+            - A posting committed after the account was loaded isn't overwritten
+        """
+        # loads the account, with its balance, into the session, which keeps it while it's referenced
+        account = db_session.get(Accounts, account_id)
+        # another posting, committed while this one runs
+        db_session.execute(update(Accounts).where(Accounts.id == account_id).values(balance=Accounts.balance + 50).execution_options(synchronize_session=False))
+        db_transactions.deposit(DepositRequest(account_id=account_id, amount=100))
+        del account
+        assert self.balance(account_id) == 1000 + 50 + 100
+
+    def test_transfer_to_the_same_account(self, client: FlaskClient, access_token: str, account_id: str):
+        """Test a transfer whose recipient is its sender.
+
+        Verifies:
+            - Response status code is 200
+            - The balance is unchanged
+            - The transfer is listed, under a new ETag
+        """
+        headers = {"Authorization": f"Bearer {access_token}"}
+        etag = client.get("/transactions/", headers=headers).headers["ETag"]
+
+        response = client.post("/transactions/transfer", headers=headers, json={"amount": 101, "account_id": account_id, "recipient_account_id": account_id})
+        assert response.status_code == 200
+        assert self.balance(account_id) == 1000
+
+        response = client.get("/transactions/", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert len(response.get_json()["transactions"]) == 1
+
+
+class TestTransactionsWithoutCategory:
+    """Test suite for the transactions stored without a category row."""
+
+    def test_listed(self, client: FlaskClient, access_token: str, deposit: Transaction):
+        """Test the listing of a transaction without a category.
+
+        Verifies:
+            - The transaction is still listed
+            - Its category is the default one
+        """
+        db_session.execute(delete(TransactionCategories).where(TransactionCategories.transaction_id == deposit.id))
+        db_session.commit()
+        db_session.remove()
+
+        response = client.get("/transactions/", headers={"Authorization": f"Bearer {access_token}"})
+        assert response.status_code == 200
+        transactions = response.get_json()["transactions"]
+        assert [transaction["id"] for transaction in transactions] == [deposit.id]
+        assert transactions[0]["category"] == "none"